@@ -0,0 +1,136 @@
+# fraud-ml-service/benchmarks/bench_batching.py
+"""
+Scoring throughput against p99 latency for micro-batch settings, CPU only.
+
+    python benchmarks/bench_batching.py --sizes 1,8,32,128 --waits 0,0.5,2,5 --concurrency 1,32,256
+    python benchmarks/bench_batching.py --model /models/fraud-v3.npz --workers 2
+
+Reports:
+- predict_proba microseconds per row for one call of each batch size (the
+  vectorization gain the batcher can harvest)
+- for every (max batch size, max wait, concurrency): scores/sec, p50/p95/p99
+  latency and mean batch size, with `concurrency` callers each awaiting
+  MicroBatcher.score for one transaction and sending the next when it
+  returns (closed loop). Batch size 1 is the unbatched baseline.
+
+The batcher runs in-process on one event loop, as in one uvicorn worker;
+HTTP parsing and serialization are not included.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from typing import List
+
+from common import bench_model, summarize
+
+import numpy as np
+
+
+def predict_us_per_row(model, sizes: List[int], repeat: int = 200) -> dict:
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in sizes:
+        X = rng.normal(size=(size, len(model.feature_names)))
+        model.predict_proba(X)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model.predict_proba(X)
+        results[str(size)] = round((time.perf_counter() - start) / repeat / size * 1e6, 3)
+    return results
+
+
+async def drive(model, max_batch_size: int, max_wait_ms: float, concurrency: int, args) -> dict:
+    from batcher import MicroBatcher
+
+    batcher = MicroBatcher(model.predict_proba, max_batch_size, max_wait_ms, args.workers, queue_depth=1 << 30)
+    batcher.start()
+    rows = np.random.default_rng(1).normal(size=(1024, len(model.feature_names)))
+    latencies: List[float] = []
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    deadline = measure_from + args.duration
+    batches_before = scored_before = 0
+
+    async def client_loop(offset: int):
+        i = offset
+        while True:
+            sent = time.perf_counter()
+            if sent >= deadline:
+                return
+            await batcher.score(rows[i % len(rows)])
+            if sent >= measure_from:
+                latencies.append(time.perf_counter() - sent)
+            i += 1
+
+    async def mark_warm():
+        nonlocal batches_before, scored_before
+        await asyncio.sleep(args.warmup)
+        batches_before, scored_before = batcher.batches, batcher.scored
+
+    await asyncio.gather(mark_warm(), *[client_loop(n) for n in range(concurrency)])
+    elapsed = time.perf_counter() - measure_from
+    batches = batcher.batches - batches_before
+    scored = batcher.scored - scored_before
+    await batcher.stop()
+    return {
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "concurrency": concurrency,
+        "scores_per_sec": round(len(latencies) / elapsed, 1),
+        "mean_batch_size": round(scored / batches, 2) if batches else 0.0,
+        **summarize(latencies),
+    }
+
+
+async def run(args) -> dict:
+    model = bench_model(args.model)
+    results = []
+    for concurrency in args.concurrency:
+        for size in args.sizes:
+            for wait in args.waits:
+                # With batches of one there is nothing to wait for
+                if size == 1 and wait != args.waits[0]:
+                    continue
+                result = await drive(model, size, 0.0 if size == 1 else wait, concurrency, args)
+                results.append(result)
+                print(
+                    f"c={concurrency} size={size} wait={result['max_wait_ms']}ms: "
+                    f"{result['scores_per_sec']}/s, p99 {result['p99_ms']} ms, batch {result['mean_batch_size']}",
+                    file=sys.stderr,
+                )
+    return {
+        "meta": {
+            "model": model.version,
+            "features": len(model.feature_names),
+            "workers": args.workers,
+            "duration_seconds": args.duration,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "predict_us_per_row": predict_us_per_row(model, sorted(set([1] + args.sizes))),
+        "results": results,
+    }
+
+
+def main():
+    ints = lambda v: [int(s) for s in v.split(",")]
+    floats = lambda v: [float(s) for s in v.split(",")]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=ints, default=[1, 8, 32, 128], help="max batch sizes")
+    parser.add_argument("--waits", type=floats, default=[0, 0.5, 2, 5], help="max waits in milliseconds")
+    parser.add_argument("--concurrency", type=ints, default=[1, 32, 256], help="callers in flight")
+    parser.add_argument("--workers", type=int, default=1, help="predict threads")
+    parser.add_argument("--duration", type=float, default=2, help="measured seconds per setting")
+    parser.add_argument("--warmup", type=float, default=0.5, help="unmeasured seconds before each setting")
+    parser.add_argument("--model", help="model artifact to score (default: the demo model)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
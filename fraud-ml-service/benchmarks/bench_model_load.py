@@ -0,0 +1,100 @@
+# fraud-ml-service/benchmarks/bench_model_load.py
+"""
+Model load time and per-worker memory, memory-mapped against copied arrays.
+
+    python benchmarks/bench_model_load.py --trees 2000 --depth 10 --workers 4
+    python benchmarks/bench_model_load.py --model /models/v7 --workers 8
+
+Writes a synthetic tree ensemble artifact (or uses --model), then for each
+mode starts --workers processes, like uvicorn workers, that load it at the
+same time. Once all of them have loaded, each reports its load time
+(prefault and warm-up included) and resident memory: rss, rss_anon
+(private), rss_file (file-backed) and pss (shared pages split between the
+processes mapping them). With mmap the arrays are file-backed and shared,
+so pss per worker falls as workers are added; copied arrays are private to
+every worker. Linux only for the memory figures.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from common import SRC_DIR
+
+
+def worker(path: str, mmap: bool, barrier, results) -> None:
+    sys.path.insert(0, SRC_DIR)
+    from store import ModelStore, memory_usage
+
+    barrier.wait()
+    store = ModelStore(path, mmap=mmap)
+    start = time.perf_counter()
+    asyncio.run(store.load())
+    elapsed = time.perf_counter() - start
+    # Measure only once every worker has the model mapped, so pss reflects the sharing
+    barrier.wait()
+    results.put({"load_seconds": round(elapsed, 4), **memory_usage()})
+    barrier.wait()
+
+
+def run(path: str, mmap: bool, workers: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, mmap, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    mb = 1024 * 1024
+    summary = {"mode": "mmap" if mmap else "copy", "workers": workers}
+    summary["load_seconds_max"] = max(sample["load_seconds"] for sample in samples)
+    for key in ("rss", "rss_anon", "rss_file", "pss"):
+        if all(key in sample for sample in samples):
+            summary[f"{key}_mb_mean"] = round(sum(sample[key] for sample in samples) / workers / mb, 1)
+    if "pss" in samples[0]:
+        summary["pss_mb_total"] = round(sum(sample["pss"] for sample in samples) / mb, 1)
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Artifact directory to load (default: a synthetic tree ensemble)")
+    parser.add_argument("--trees", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.model
+        if not path:
+            sys.path.insert(0, SRC_DIR)
+            from model import demo_trees, save_artifact
+
+            path = os.path.join(tmp, "bench")
+            save_artifact(demo_trees(args.trees, args.depth, version="bench"), path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"artifact: {path} ({size / 1024 / 1024:.1f} MB), {args.workers} workers")
+
+        # Loaded once first so both modes start from a warm page cache
+        run(path, True, 1)
+        results = [run(path, mmap, args.workers) for mmap in (True, False)]
+
+    for result in results:
+        print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"platform": platform.platform(), "artifact_bytes": size, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# fraud-ml-service/benchmarks/common.py
+"""
+Shared helpers for the fraud-ml-service benchmarks. They run in-process on
+CPU only and need no model volume: without --model they score the demo model.
+"""
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+# Make the service modules importable the same way uvicorn sees them
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def bench_model(path: Optional[str]) -> Any:
+    """
+    The model artifact at `path`, or the demo model
+    """
+    from model import demo_model, load_model
+
+    return load_model(path) if path else demo_model()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples`
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Latency summary in milliseconds for a list of durations in seconds
+    """
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
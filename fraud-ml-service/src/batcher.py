@@ -0,0 +1,194 @@
+# fraud-ml-service/src/batcher.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import BATCH_PREDICT_DURATION, BATCH_QUEUED, BATCH_SIZE, SCORE_DURATION, SCORES_REJECTED
+
+
+class BatcherSaturatedError(Exception):
+    """
+    Raised when the batch queue already holds its maximum number of requests
+    """
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching of single-transaction scores.
+
+    Each caller submits one feature row and awaits its own score. A collector
+    task takes the first waiting row, then keeps gathering rows until it has
+    `max_batch_size` of them or `max_wait_ms` have passed since the first
+    one, and runs one vectorized `predict` over the whole batch. Results are
+    scattered back to the callers' futures.
+
+    `predict` runs on `workers` threads (NumPy releases the GIL in its
+    kernels), so the event loop keeps accepting requests meanwhile. While
+    every worker is busy the collector waits, and requests pile up into a
+    bigger next batch: under load batches grow on their own, and a lone
+    request waits at most `max_wait_ms` before it is scored.
+
+    A request can name the predict function (model) that must score it,
+    e.g. the model version its features were vectorized for; a batch
+    spanning a model swap is split into one predict call per model.
+
+    Requests beyond `queue_depth` are rejected with BatcherSaturatedError.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        workers: int = 1,
+        queue_depth: int = 2048
+    ):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._collector: Optional[asyncio.Task] = None
+        # Rows taken off the queue for the batch being collected
+        self._collecting: List[Tuple[np.ndarray, asyncio.Future, Callable]] = []
+        self._batches: set = set()
+        self.batches = 0
+        self.scored = 0
+
+    def start(self) -> None:
+        """
+        Start collecting batches on the running event loop
+        """
+        if self._collector is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="predict")
+        self._collector = asyncio.create_task(self._collect_forever())
+
+    async def stop(self) -> None:
+        """
+        Stop collecting, let running batches finish and fail requests still
+        queued or in the batch being collected
+        """
+        if self._collector is None:
+            return
+        self._collector.cancel()
+        try:
+            await self._collector
+        except asyncio.CancelledError:
+            pass
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        pending, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+        BATCH_QUEUED.set(0)
+        self._executor.shutdown(wait=False)
+        self._collector = None
+
+    async def score(self, row: np.ndarray, predict: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> float:
+        """
+        Fraud probability of one feature row, scored as part of a batch by
+        `predict` (default: the batcher's)
+        """
+        if self._collector is None:
+            raise RuntimeError("Batcher is not started")
+        if self._queue.qsize() >= self.queue_depth:
+            SCORES_REJECTED.inc()
+            raise BatcherSaturatedError("Scoring queue is full")
+        future = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        self._queue.put_nowait((row, future, predict or self.predict))
+        BATCH_QUEUED.inc()
+        try:
+            return await future
+        finally:
+            SCORE_DURATION.observe(time.perf_counter() - start)
+
+    async def _collect_forever(self) -> None:
+        while True:
+            # Wait for a free worker first, so requests accumulate while all of them are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future, Callable]]:
+        # Kept on self, so stop() finds the rows if it cancels the collector mid-batch
+        batch = self._collecting = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        self._collecting = []
+        BATCH_QUEUED.dec(len(batch))
+        return batch
+
+    async def _run(self, batch: List[Tuple[np.ndarray, asyncio.Future, Callable]]) -> None:
+        try:
+            groups: Dict[Callable, List[Tuple[np.ndarray, asyncio.Future]]] = {}
+            for row, future, predict in batch:
+                # Callers that gave up (client disconnect, deadline) are not scored
+                if not future.done():
+                    groups.setdefault(predict, []).append((row, future))
+            for predict, live in groups.items():
+                await self._score_group(predict, live)
+        finally:
+            self._slots.release()
+
+    async def _score_group(self, predict: Callable, live: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        try:
+            X = np.stack([row for row, _ in live])
+            scores = await asyncio.get_running_loop().run_in_executor(self._executor, self._predict, predict, X)
+        except Exception as e:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), score in zip(live, scores.tolist()):
+            if not future.done():
+                future.set_result(score)
+        self.batches += 1
+        self.scored += len(live)
+        BATCH_SIZE.observe(len(live))
+
+    def _predict(self, predict: Callable, X: np.ndarray) -> np.ndarray:
+        start = time.perf_counter()
+        try:
+            return predict(X)[:, 1]
+        finally:
+            BATCH_PREDICT_DURATION.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "scored": self.scored,
+            "mean_batch_size": round(self.scored / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,41 @@
+# fraud-ml-service/src/config.py
+import os
+from typing import Optional
+
+class Settings:
+    """
+    Fraud ML service settings
+    """
+    # Model settings
+    MODEL_PATH: Optional[str] = os.getenv("MODEL_PATH") # Model on the mounted model volume: an artifact directory (or a symlink to one), .npz, or .joblib/.pkl
+    MODEL_WATCH_INTERVAL_SECONDS: float = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "10")) # Poll MODEL_PATH and hot-swap new versions; 0 disables
+    MODEL_MMAP: bool = os.getenv("MODEL_MMAP", "true").lower() == "true" # Map artifact arrays read-only (shared by all workers) instead of copying them
+    MODEL_PREFAULT: bool = os.getenv("MODEL_PREFAULT", "true").lower() == "true" # Touch every mapped page at load, before the version serves traffic
+    FRAUD_THRESHOLD: float = float(os.getenv("FRAUD_THRESHOLD", "0.5")) # Scores at or above are reported as fraud
+
+    # Micro-batching: concurrent score requests are gathered into one predict_proba call
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "64")) # Requests per batch
+    BATCH_MAX_WAIT_MS: float = float(os.getenv("BATCH_MAX_WAIT_MS", "2")) # Longest a request waits for others to join its batch
+    BATCH_WORKERS: int = int(os.getenv("BATCH_WORKERS", "1")) # Batches predicted at once; requests arriving meanwhile form the next batch
+    BATCH_QUEUE_DEPTH: int = int(os.getenv("BATCH_QUEUE_DEPTH", "2048")) # Requests allowed to wait before answering 503
+    BATCH_RETRY_AFTER_SECONDS: int = int(os.getenv("BATCH_RETRY_AFTER_SECONDS", "1"))
+
+    # gRPC (libs/api-contracts/transaction.proto), served next to the REST API
+    GRPC_ENABLED: bool = os.getenv("GRPC_ENABLED", "true").lower() == "true"
+    GRPC_PORT: int = int(os.getenv("GRPC_PORT", "50051"))
+    GRPC_MAX_CONCURRENT_RPCS: int = int(os.getenv("GRPC_MAX_CONCURRENT_RPCS", "0")) # 0 = unlimited; a stream counts as one
+    GRPC_SHUTDOWN_GRACE_SECONDS: float = float(os.getenv("GRPC_SHUTDOWN_GRACE_SECONDS", "5"))
+
+    # Service settings
+    SERVICE_NAME: str = os.getenv("SERVICE_NAME", "fraud-ml-service")
+    SERVICE_VERSION: str = os.getenv("SERVICE_VERSION", "1.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+
+    # Environment settings
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development") # e.g., development, staging, production
+
+    # Logging settings
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO") # e.g., DEBUG, INFO, WARNING, ERROR, CRITICAL
+
+settings = Settings()
@@ -0,0 +1,139 @@
+# fraud-ml-service/src/grpc_server.py
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+import grpc
+import numpy as np
+
+import transaction_pb2
+import transaction_pb2_grpc
+from batcher import BatcherSaturatedError, MicroBatcher
+from config import settings
+from store import ModelStore
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringError(Exception):
+    """
+    A transaction that can't be scored, with the status code to report it with
+    """
+
+    def __init__(self, code: grpc.StatusCode, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FraudScoringServicer(transaction_pb2_grpc.FraudScoringServicer):
+    """
+    gRPC fraud scoring. Uses the same model store and micro-batcher as the
+    REST API, so unary calls, stream messages and POST /score requests all
+    share batches.
+    """
+
+    def __init__(self, store: ModelStore, batcher: MicroBatcher):
+        self.store = store
+        self.batcher = batcher
+
+    async def _score(self, request) -> transaction_pb2.ScoreResponse:
+        # Vectorized for and scored by the same version, even if a swap happens meanwhile
+        current = self.store.current
+        if current is None:
+            raise ScoringError(grpc.StatusCode.UNAVAILABLE, "Model not loaded")
+        features = request.features
+        missing = [name for name in current.feature_names if name not in features]
+        if missing:
+            raise ScoringError(grpc.StatusCode.INVALID_ARGUMENT, f"Missing features: {', '.join(missing)}")
+        row = np.array([features[name] for name in current.feature_names], dtype=np.float64)
+        try:
+            score = await self.batcher.score(row, current.predict_proba)
+        except BatcherSaturatedError:
+            raise ScoringError(grpc.StatusCode.RESOURCE_EXHAUSTED, "Service is busy, please retry")
+        return transaction_pb2.ScoreResponse(
+            transaction_id=request.transaction_id,
+            request_id=request.request_id,
+            score=score,
+            is_fraud=score >= settings.FRAUD_THRESHOLD,
+            model_version=current.version,
+        )
+
+    async def ScoreTransaction(self, request, context):
+        # Past the call deadline grpc cancels this handler, and with it the queued score
+        try:
+            return await self._score(request)
+        except ScoringError as exc:
+            await context.abort(exc.code, exc.message)
+
+    async def ScoreTransactions(self, request_iterator, context):
+        """
+        Every incoming request is scored concurrently as soon as it arrives,
+        so requests of one stream join the same batches, and responses are
+        sent as their batches finish
+        """
+        responses: asyncio.Queue = asyncio.Queue()
+        pending = set()
+
+        async def score_one(request):
+            try:
+                if request.budget_ms > 0:
+                    # Timing out cancels the queued score, so the batcher skips it
+                    try:
+                        response = await asyncio.wait_for(self._score(request), request.budget_ms / 1000.0)
+                    except asyncio.TimeoutError:
+                        raise ScoringError(grpc.StatusCode.DEADLINE_EXCEEDED, "Budget exceeded before scoring")
+                else:
+                    response = await self._score(request)
+            except ScoringError as exc:
+                response = transaction_pb2.ScoreResponse(
+                    transaction_id=request.transaction_id,
+                    request_id=request.request_id,
+                    error=transaction_pb2.ScoreError(code=exc.code.value[0], message=exc.message),
+                )
+            except Exception as exc:
+                logger.exception("Scoring %s failed", request.transaction_id)
+                response = transaction_pb2.ScoreResponse(
+                    transaction_id=request.transaction_id,
+                    request_id=request.request_id,
+                    error=transaction_pb2.ScoreError(code=grpc.StatusCode.INTERNAL.value[0], message=str(exc)),
+                )
+            responses.put_nowait(response)
+
+        async def read():
+            try:
+                async for request in request_iterator:
+                    task = asyncio.create_task(score_one(request))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                # The client half-closed: answer what is in flight, then end the stream
+                if pending:
+                    await asyncio.wait(set(pending))
+            finally:
+                responses.put_nowait(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while (response := await responses.get()) is not None:
+                yield response
+            await reader
+        finally:
+            # The client went away or the call was cancelled
+            reader.cancel()
+            for task in list(pending):
+                task.cancel()
+
+
+async def start_grpc_server(
+    servicer: FraudScoringServicer, address: Optional[str] = None
+) -> Tuple[grpc.aio.Server, int]:
+    """
+    Start a grpc.aio server on the running event loop, next to the FastAPI app.
+    Returns the started server and the port it is bound to (0 for unix sockets).
+    """
+    server = grpc.aio.server(maximum_concurrent_rpcs=settings.GRPC_MAX_CONCURRENT_RPCS or None)
+    transaction_pb2_grpc.add_FraudScoringServicer_to_server(servicer, server)
+    port = server.add_insecure_port(address or f"{settings.HOST}:{settings.GRPC_PORT}")
+    await server.start()
+    logger.info("gRPC server listening on %s", address or f"port {port}")
+    return server, port
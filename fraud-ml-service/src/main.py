@@ -0,0 +1,156 @@
+# fraud-ml-service/src/main.py
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from contextlib import asynccontextmanager
+import uvicorn
+import asyncio
+import logging
+import os
+
+import numpy as np
+
+from batcher import BatcherSaturatedError, MicroBatcher
+from config import settings
+from grpc_server import FraudScoringServicer, start_grpc_server
+from model import demo_model
+from schemas import ModelInfo, ScoreRequest, ScoreResponse
+from store import ModelStore
+import metrics
+
+logger = logging.getLogger(__name__)
+
+model_store = ModelStore(
+    settings.MODEL_PATH,
+    fallback=demo_model,
+    mmap=settings.MODEL_MMAP,
+    prefault=settings.MODEL_PREFAULT,
+)
+readiness = {"model": False}
+background_tasks = set()
+grpc_server = None
+
+
+def predict(X: np.ndarray) -> np.ndarray:
+    return model_store.current.predict_proba(X)
+
+
+batcher = MicroBatcher(
+    predict,
+    max_batch_size=settings.BATCH_MAX_SIZE,
+    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+    workers=settings.BATCH_WORKERS,
+    queue_depth=settings.BATCH_QUEUE_DEPTH,
+)
+
+
+async def load():
+    model_store.path = settings.MODEL_PATH
+    if not settings.MODEL_PATH:
+        if settings.ENVIRONMENT != "development":
+            raise RuntimeError("MODEL_PATH is not set")
+        logger.warning("MODEL_PATH is not set; serving the demo model")
+    await model_store.load()
+    readiness["model"] = True
+
+
+def start_background_task(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global grpc_server
+    batcher.start()
+    await load()
+    if settings.MODEL_PATH and settings.MODEL_WATCH_INTERVAL_SECONDS > 0:
+        start_background_task(model_store.watch(settings.MODEL_WATCH_INTERVAL_SECONDS))
+    # Runs on the same event loop as the REST API and shares its batches
+    if settings.GRPC_ENABLED:
+        grpc_server, _ = await start_grpc_server(FraudScoringServicer(model_store, batcher))
+
+    yield
+
+    for task in list(background_tasks):
+        task.cancel()
+    if grpc_server is not None:
+        await grpc_server.stop(settings.GRPC_SHUTDOWN_GRACE_SECONDS)
+    await batcher.stop()
+    metrics.mark_process_dead()
+
+app = FastAPI(
+    title="Fraud ML Service",
+    description="Fraud scoring of single transactions, micro-batched for throughput",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+@app.exception_handler(BatcherSaturatedError)
+async def batcher_saturated_handler(request: Request, exc: BatcherSaturatedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service is busy, please retry"},
+        headers={"Retry-After": str(settings.BATCH_RETRY_AFTER_SECONDS)}
+    )
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "fraud-ml-service"}
+
+@app.get("/ready")
+async def readiness_check():
+    if not all(readiness.values()):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "starting", "checks": readiness}
+        )
+    return {"status": "ready", "checks": readiness}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    # Sync route: aggregating worker files in multiprocess mode does file I/O
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/model", response_model=ModelInfo)
+async def model_info():
+    model = model_store.current
+    if model is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Model not loaded")
+    return ModelInfo(
+        version=model.version, features=model.feature_names, batching=batcher.stats(), store=model_store.stats()
+    )
+
+@app.post("/score", response_model=ScoreResponse)
+async def score_transaction(request: ScoreRequest):
+    """
+    Fraud score of one transaction. Concurrent requests are scored together
+    in micro-batches (BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS).
+    """
+    # Vectorized for and scored by the same version, even if a swap happens meanwhile
+    current = model_store.current
+    if current is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Model not loaded")
+    missing = [name for name in current.feature_names if name not in request.features]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Missing features: {', '.join(missing)}"
+        )
+    row = np.array([request.features[name] for name in current.feature_names], dtype=np.float64)
+    score = await batcher.score(row, current.predict_proba)
+    return ScoreResponse(
+        transaction_id=request.transaction_id,
+        score=score,
+        is_fraud=score >= settings.FRAUD_THRESHOLD,
+        model_version=current.version,
+    )
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 8000)),
+        reload=True
+    )
@@ -0,0 +1,96 @@
+# fraud-ml-service/src/metrics.py
+"""
+Prometheus metrics for the fraud ML service.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers (it must exist before they start); /metrics
+then aggregates all of them. Without it the default in-process registry is used.
+"""
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Sub-millisecond buckets: a batched score should take a few milliseconds end to end
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+SCORE_DURATION = Histogram(
+    "score_duration_seconds",
+    "Time from a score request joining the batch queue to its result, including the wait for the batch",
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "inference_batch_size",
+    "Requests scored per predict_proba call",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+BATCH_PREDICT_DURATION = Histogram(
+    "inference_batch_predict_seconds",
+    "predict_proba time per batch",
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_QUEUED = Gauge(
+    "inference_queued_requests",
+    "Score requests waiting to join a batch",
+    multiprocess_mode="livesum",
+)
+SCORES_REJECTED = Counter(
+    "inference_rejected_total",
+    "Score requests answered 503 because the batch queue was full",
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "model_load_seconds",
+    "Time to load and warm up a model version in this worker",
+    ["version"],
+    multiprocess_mode="liveall",
+)
+MODEL_MEMORY_BYTES = Gauge(
+    "model_memory_bytes",
+    "Memory of a model version in this worker: mapped (artifact array bytes, shared through the page cache), "
+    "rss_anon and rss_file (growth of private and file-backed resident memory while loading it)",
+    ["version", "kind"],
+    multiprocess_mode="liveall",
+)
+MODEL_ACTIVE = Gauge(
+    "model_active",
+    "1 for the model version this worker is serving",
+    ["version"],
+    multiprocess_mode="liveall",
+)
+MODEL_SWAPS = Counter(
+    "model_swaps_total",
+    "Hot swaps to a new model version",
+)
+MODEL_RELOAD_FAILURES = Counter(
+    "model_reload_failures_total",
+    "New model versions that failed to load; the previous version keeps serving",
+)
+
+
+def render() -> bytes:
+    """
+    Current metrics in the Prometheus text format, aggregated across workers in multiprocess mode
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """
+    Drop this worker's live gauges from the shared directory; call on shutdown
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,444 @@
+# fraud-ml-service/src/model.py
+"""
+Fraud models and model artifacts.
+
+A model scores a 2-D float array of transactions, one row per transaction
+with columns in `feature_names` order, through predict_proba, which returns
+an (n, 2) array whose second column is the fraud probability, as
+scikit-learn classifiers do. Scoring many rows in one call costs little more
+than scoring one, which is what the micro-batcher relies on.
+
+Artifacts on the model volume:
+- a directory holding model.json (kind, version, features, scalars) and one
+  .npy file per array: weights for a LogisticModel, or the flattened trees
+  of a TreeEnsembleModel. Arrays are memory-mapped read-only, so every
+  worker process on a node shares one page-cache copy and loading costs no
+  parsing or copying. Written by save_artifact.
+- .npz: a LogisticModel saved with LogisticModel.save (loaded into memory)
+- .joblib / .pkl: any fitted estimator with predict_proba and
+  feature_names_in_ (needs joblib; only load artifacts you trust)
+
+    python src/model.py demo models/demo-v1            # synthetic tree ensemble artifact for local runs
+    python src/model.py export fraud.joblib models/v7  # convert a scikit-learn GBM/forest to an artifact
+"""
+import json
+import os
+import shutil
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MANIFEST = "model.json"
+
+# Features of the demo model, and of the transaction-service feature vector
+DEMO_FEATURES = [
+    "amount",
+    "hour_of_day",
+    "merchant_risk",
+    "is_foreign",
+    "account_age_days",
+    "tx_count_1h",
+    "amount_sum_24h",
+    "distinct_merchants_24h",
+]
+
+
+class LogisticModel:
+    """
+    Logistic regression over standardized features, in plain NumPy
+    """
+
+    kind = "logistic"
+    array_fields = ("weights", "mean", "scale")
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        weights: np.ndarray,
+        bias: float,
+        mean: Optional[np.ndarray] = None,
+        scale: Optional[np.ndarray] = None,
+        version: str = "unversioned"
+    ):
+        n_features = len(feature_names)
+        self.feature_names = list(feature_names)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        self.version = version
+        if not (self.weights.shape == self.mean.shape == self.scale.shape == (n_features,)):
+            raise ValueError("weights, mean and scale need one value per feature")
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        z = ((X - self.mean) / self.scale) @ self.weights + self.bias
+        fraud = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1.0 - fraud, fraud])
+
+    def params(self) -> Dict[str, Any]:
+        return {"bias": self.bias}
+
+    @classmethod
+    def from_arrays(cls, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> "LogisticModel":
+        return cls(manifest["feature_names"], arrays["weights"], manifest["bias"], arrays["mean"], arrays["scale"],
+                   version=manifest["version"])
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            kind="logistic",
+            version=self.version,
+            feature_names=np.array(self.feature_names),
+            weights=self.weights,
+            bias=self.bias,
+            mean=self.mean,
+            scale=self.scale,
+        )
+
+
+class TreeEnsembleModel:
+    """
+    A binary tree ensemble (gradient boosting or random forest) as flat arrays.
+
+    All nodes of all trees live in one set of parallel arrays, indexed
+    globally: `feature`, `threshold`, `left` and `right` per node, `value`
+    per node (used at leaves), and `roots`, the root node of each tree.
+    Leaves point to themselves, so scoring walks every row down every tree
+    at once for exactly `max_depth` vectorized steps, without branches.
+
+    aggregation "logit_sum": fraud probability = sigmoid(base_score + sum of leaf values)
+    aggregation "mean": fraud probability = mean of leaf values
+    With float32_inputs, features are rounded to float32 before the
+    comparisons, as scikit-learn trees do, so exported models score the same.
+    """
+
+    kind = "tree_ensemble"
+    array_fields = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        aggregation: str = "logit_sum",
+        base_score: float = 0.0,
+        float32_inputs: bool = False,
+        version: str = "unversioned"
+    ):
+        if aggregation not in ("logit_sum", "mean"):
+            raise ValueError(f"Unknown aggregation: {aggregation}")
+        self.feature_names = list(feature_names)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation
+        self.base_score = float(base_score)
+        self.float32_inputs = bool(float32_inputs)
+        self.version = version
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if self.float32_inputs:
+            X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        leaves = self.value[node]
+        if self.aggregation == "mean":
+            fraud = leaves.mean(axis=1)
+        else:
+            fraud = 1.0 / (1.0 + np.exp(-(self.base_score + leaves.sum(axis=1))))
+        return np.column_stack([1.0 - fraud, fraud])
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "max_depth": self.max_depth,
+            "aggregation": self.aggregation,
+            "base_score": self.base_score,
+            "float32_inputs": self.float32_inputs,
+        }
+
+    @classmethod
+    def from_arrays(cls, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> "TreeEnsembleModel":
+        return cls(
+            manifest["feature_names"],
+            *[arrays[name] for name in cls.array_fields],
+            max_depth=manifest["max_depth"],
+            aggregation=manifest["aggregation"],
+            base_score=manifest["base_score"],
+            float32_inputs=manifest["float32_inputs"],
+            version=manifest["version"],
+        )
+
+    @classmethod
+    def from_trees(
+        cls,
+        feature_names: Sequence[str],
+        trees: List[Dict[str, np.ndarray]],
+        version: str,
+        **params: Any
+    ) -> "TreeEnsembleModel":
+        """
+        Flatten trees given as scikit-learn style node arrays: children_left
+        and children_right (-1 at leaves), feature, threshold and value per node
+        """
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        max_depth, offset = 0, 0
+        for tree in trees:
+            n_nodes = len(tree["children_left"])
+            is_leaf = tree["children_left"] < 0
+            own = np.arange(offset, offset + n_nodes)
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree["feature"]))
+            threshold.append(np.where(is_leaf, 0.0, tree["threshold"]))
+            left.append(np.where(is_leaf, own, tree["children_left"] + offset))
+            right.append(np.where(is_leaf, own, tree["children_right"] + offset))
+            value.append(tree["value"])
+            max_depth = max(max_depth, _depth(tree["children_left"], tree["children_right"]))
+            offset += n_nodes
+        return cls(
+            feature_names,
+            np.concatenate(feature).astype(np.int32),
+            np.concatenate(threshold).astype(np.float64),
+            np.concatenate(left).astype(np.int32),
+            np.concatenate(right).astype(np.int32),
+            np.concatenate(value).astype(np.float64),
+            np.array(roots, dtype=np.int32),
+            max_depth=max_depth,
+            version=version,
+            **params,
+        )
+
+    @classmethod
+    def from_sklearn(cls, estimator: Any, version: str) -> "TreeEnsembleModel":
+        """
+        Convert a fitted binary GradientBoostingClassifier (log loss, prior or
+        zero init) or RandomForestClassifier/ExtraTreesClassifier
+        """
+        feature_names = [str(name) for name in estimator.feature_names_in_]
+        if len(estimator.classes_) != 2:
+            raise ValueError("Only binary classifiers can be converted")
+        if hasattr(estimator, "learning_rate"):
+            if estimator.loss not in ("log_loss", "deviance"):
+                raise ValueError(f"Unsupported gradient boosting loss: {estimator.loss}")
+            trees = [{
+                "children_left": tree.tree_.children_left,
+                "children_right": tree.tree_.children_right,
+                "feature": tree.tree_.feature,
+                "threshold": tree.tree_.threshold,
+                "value": tree.tree_.value[:, 0, 0] * estimator.learning_rate,
+            } for tree in estimator.estimators_[:, 0]]
+            if estimator.init_ == "zero":
+                base_score = 0.0
+            else:
+                prior = estimator.init_.class_prior_[1]
+                base_score = float(np.log(prior / (1.0 - prior)))
+            return cls.from_trees(feature_names, trees, version, aggregation="logit_sum",
+                                  base_score=base_score, float32_inputs=True)
+        trees = []
+        for tree in estimator.estimators_:
+            counts = tree.tree_.value[:, 0, :]
+            trees.append({
+                "children_left": tree.tree_.children_left,
+                "children_right": tree.tree_.children_right,
+                "feature": tree.tree_.feature,
+                "threshold": tree.tree_.threshold,
+                "value": counts[:, 1] / counts.sum(axis=1),
+            })
+        return cls.from_trees(feature_names, trees, version, aggregation="mean", float32_inputs=True)
+
+
+class EstimatorModel:
+    """
+    A fitted scikit-learn compatible estimator loaded with joblib
+    """
+
+    def __init__(self, estimator: Any, feature_names: Sequence[str], version: str):
+        self.estimator = estimator
+        self.feature_names = list(feature_names)
+        self.version = version
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.estimator.predict_proba(X)
+
+
+MODEL_KINDS = {cls.kind: cls for cls in (LogisticModel, TreeEnsembleModel)}
+
+
+def _depth(children_left: np.ndarray, children_right: np.ndarray) -> int:
+    # Walk down one level at a time from the root
+    depth, level = 0, np.array([0])
+    while True:
+        level = np.concatenate([children_left[level], children_right[level]])
+        level = level[level >= 0]
+        if not level.size:
+            return depth
+        depth += 1
+
+
+def _version_from_path(path: str) -> str:
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+def model_arrays(model: Any) -> Dict[str, np.ndarray]:
+    """
+    The arrays of an artifact-backed model, by name; empty for other models
+    """
+    return {name: getattr(model, name) for name in getattr(model, "array_fields", ())}
+
+
+def save_artifact(model: Any, directory: str) -> None:
+    """
+    Write `model` as a memory-mappable artifact directory. The files are
+    written to a temporary sibling first and renamed into place, so a
+    watcher never sees half an artifact.
+    """
+    if not hasattr(model, "array_fields"):
+        raise ValueError(f"{type(model).__name__} can't be saved as an artifact")
+    directory = os.path.normpath(directory)
+    tmp = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {}
+    for name, array in model_arrays(model).items():
+        # Contiguous, so the mapped file can be used as is
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+        arrays[name] = {"dtype": str(array.dtype), "shape": list(array.shape)}
+    manifest = {
+        "kind": model.kind,
+        "version": model.version,
+        "feature_names": model.feature_names,
+        "arrays": arrays,
+        **model.params(),
+    }
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(tmp, directory)
+
+
+def load_artifact(directory: str, mmap: bool = True) -> Any:
+    """
+    Load an artifact directory; with `mmap` the arrays are read-only views of the mapped files
+    """
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    cls = MODEL_KINDS.get(manifest["kind"])
+    if cls is None:
+        raise ValueError(f"Unknown model kind in {directory}: {manifest['kind']}")
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        array = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"{directory}: {name}.npy doesn't match the manifest")
+        arrays[name] = array
+    return cls.from_arrays(manifest, arrays)
+
+
+def load_model(path: str, mmap: bool = True) -> Any:
+    """
+    Load the model artifact at `path`
+    """
+    if os.path.isdir(path):
+        return load_artifact(path, mmap)
+    extension = os.path.splitext(path)[1]
+    if extension == ".npz":
+        with np.load(path) as data:
+            kind = str(data["kind"])
+            if kind != "logistic":
+                raise ValueError(f"Unknown model kind in {path}: {kind}")
+            return LogisticModel(
+                [str(name) for name in data["feature_names"]],
+                data["weights"],
+                float(data["bias"]),
+                data["mean"],
+                data["scale"],
+                version=str(data["version"]),
+            )
+    if extension in (".joblib", ".pkl"):
+        import joblib
+        estimator = joblib.load(path)
+        feature_names = getattr(estimator, "feature_names_in_", None)
+        if feature_names is None:
+            raise ValueError(f"{path}: the estimator must be fitted with named features (feature_names_in_)")
+        return EstimatorModel(estimator, [str(name) for name in feature_names], _version_from_path(path))
+    raise ValueError(f"Unsupported model artifact: {path}")
+
+
+def vectorize(features: List[Dict[str, float]], feature_names: Sequence[str]) -> np.ndarray:
+    """
+    One row per feature dict, columns in `feature_names` order; missing features are NaN
+    """
+    X = np.full((len(features), len(feature_names)), np.nan)
+    for i, row in enumerate(features):
+        X[i] = [row.get(name, np.nan) for name in feature_names]
+    return X
+
+
+def demo_model(version: str = "demo") -> LogisticModel:
+    """
+    A hand-weighted model over DEMO_FEATURES, for local runs, tests and benchmarks
+    """
+    return LogisticModel(
+        DEMO_FEATURES,
+        weights=[0.9, 0.2, 1.4, 0.8, -0.6, 0.7, 0.5, 0.6],
+        bias=-4.0,
+        mean=[120.0, 12.0, 0.2, 0.1, 400.0, 1.0, 300.0, 2.0],
+        scale=[250.0, 7.0, 0.2, 0.3, 365.0, 2.0, 600.0, 2.0],
+        version=version,
+    )
+
+
+def demo_trees(n_trees: int = 200, depth: int = 6, version: str = "demo-trees", seed: int = 0) -> TreeEnsembleModel:
+    """
+    A random, complete boosted ensemble over DEMO_FEATURES with the size
+    and scoring cost of a real one, for benchmarks and local runs
+    """
+    rng = np.random.default_rng(seed)
+    scale = np.array([250.0, 7.0, 0.2, 0.3, 365.0, 2.0, 600.0, 2.0])
+    n_internal, n_nodes = 2 ** depth - 1, 2 ** (depth + 1) - 1
+    trees = []
+    for _ in range(n_trees):
+        nodes = np.arange(n_nodes)
+        internal = nodes < n_internal
+        feature = rng.integers(0, len(DEMO_FEATURES), n_nodes)
+        trees.append({
+            "children_left": np.where(internal, 2 * nodes + 1, -1),
+            "children_right": np.where(internal, 2 * nodes + 2, -1),
+            "feature": np.where(internal, feature, -2),
+            "threshold": np.where(internal, rng.normal(size=n_nodes) * scale[feature], -2.0),
+            "value": np.where(internal, 0.0, rng.normal(scale=0.05, size=n_nodes)),
+        })
+    return TreeEnsembleModel.from_trees(DEMO_FEATURES, trees, version, aggregation="logit_sum", base_score=-3.0)
+
+
+if __name__ == "__main__":
+    usage = "usage: python src/model.py demo <path.npz | artifact dir> | export <model file> <artifact dir>"
+    if len(sys.argv) == 3 and sys.argv[1] == "demo":
+        target = sys.argv[2]
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        if target.endswith(".npz"):
+            demo_model(_version_from_path(target)).save(target)
+        else:
+            save_artifact(demo_trees(version=_version_from_path(target)), target)
+    elif len(sys.argv) == 4 and sys.argv[1] == "export":
+        source, target = sys.argv[2], sys.argv[3]
+        loaded = load_model(source, mmap=False)
+        if isinstance(loaded, EstimatorModel):
+            loaded = TreeEnsembleModel.from_sklearn(loaded.estimator, _version_from_path(target))
+        else:
+            loaded.version = _version_from_path(target)
+        save_artifact(loaded, target)
+    else:
+        sys.exit(usage)
+    print(f"wrote {sys.argv[-1]}")
@@ -0,0 +1,24 @@
+# fraud-ml-service/src/schemas.py
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+
+class ScoreRequest(BaseModel):
+    transaction_id: str
+    # Feature name -> value; every feature of the loaded model is required
+    features: Dict[str, float] = Field(..., min_length=1)
+
+
+class ScoreResponse(BaseModel):
+    transaction_id: str
+    score: float  # Fraud probability
+    is_fraud: bool  # score >= FRAUD_THRESHOLD
+    model_version: str
+
+
+class ModelInfo(BaseModel):
+    version: str
+    features: list
+    batching: dict
+    store: dict
@@ -0,0 +1,181 @@
+# fraud-ml-service/src/store.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from metrics import MODEL_ACTIVE, MODEL_LOAD_SECONDS, MODEL_MEMORY_BYTES, MODEL_RELOAD_FAILURES, MODEL_SWAPS
+from model import MANIFEST, load_model, model_arrays
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 4096
+
+
+def memory_usage() -> Dict[str, int]:
+    """
+    Resident memory of this process in bytes: rss, rss_anon (private) and
+    rss_file (file-backed, e.g. mapped model arrays, shared between
+    processes), plus pss, the resident memory with shared pages divided
+    among the processes mapping them. Linux only; empty elsewhere.
+    """
+    usage = {}
+    fields = {"VmRSS:": "rss", "RssAnon:": "rss_anon", "RssFile:": "rss_file"}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    usage[fields[parts[0]]] = int(parts[1]) * 1024
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    usage["pss"] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return usage
+
+
+def prefault(model: Any) -> None:
+    """
+    Read one byte per page of every mapped array, so the first requests
+    don't stall on page faults; pages already in the page cache (another
+    worker loaded the same version) are only mapped, not read from disk
+    """
+    for array in model_arrays(model).values():
+        if array.nbytes:
+            np.frombuffer(array, dtype=np.uint8)[::PAGE_SIZE].sum()
+
+
+class ModelStore:
+    """
+    The model version being served, and hot swaps to new ones.
+
+    `path` is the artifact on the model volume, typically a symlink such as
+    /models/current -> v7 that deployments repoint atomically (ln -s v8
+    current.tmp && mv -T current.tmp current). watch() polls it; when the
+    target or its manifest changes, the new version is loaded, prefaulted
+    and warmed up off the event loop, and then replaces `current` in one
+    assignment. Requests hold on to the model they were vectorized for
+    until scored, so in-flight requests finish on the old version, which is
+    released (and unmapped) once the last of them is done; its stats and
+    metric series are dropped at the swap. A version that fails to load is
+    logged and the current one keeps serving.
+    """
+
+    def __init__(self, path: Optional[str], fallback: Optional[Callable[[], Any]] = None, mmap: bool = True,
+                 prefault: bool = True):
+        self.path = path
+        self.fallback = fallback
+        self.mmap = mmap
+        self.prefault = prefault
+        self.current: Optional[Any] = None
+        self.signature: Optional[Tuple] = None
+        self.failed_signature: Optional[Tuple] = None
+        self.versions: Dict[str, Dict[str, Any]] = {}
+
+    def _signature(self) -> Tuple:
+        target = os.path.realpath(self.path)
+        manifest = os.path.join(target, MANIFEST) if os.path.isdir(target) else target
+        stat = os.stat(manifest)
+        return target, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, signature: Optional[Tuple]) -> Any:
+        before = memory_usage()
+        start = time.perf_counter()
+        model = load_model(signature[0], self.mmap) if signature else self.fallback()
+        if self.prefault:
+            prefault(model)
+        # The first predict pays for lazy initialization
+        model.predict_proba(np.zeros((1, len(model.feature_names))))
+        elapsed = time.perf_counter() - start
+        after = memory_usage()
+
+        mapped = sum(array.nbytes for array in model_arrays(model).values())
+        stats = {"load_seconds": round(elapsed, 4), "mapped_bytes": mapped, "loaded_at": time.time()}
+        MODEL_LOAD_SECONDS.labels(model.version).set(elapsed)
+        MODEL_MEMORY_BYTES.labels(model.version, "mapped").set(mapped)
+        for kind in ("rss_anon", "rss_file"):
+            if kind in after:
+                growth = max(0, after[kind] - before.get(kind, 0))
+                stats[f"{kind}_bytes"] = growth
+                MODEL_MEMORY_BYTES.labels(model.version, kind).set(growth)
+        self.versions[model.version] = stats
+        return model
+
+    async def load(self) -> Any:
+        """
+        Load the version at `path` (or the fallback model when there is no
+        path) and start serving it
+        """
+        signature = self._signature() if self.path else None
+        model = await asyncio.to_thread(self._load, signature)
+        self._swap(model, signature)
+        return model
+
+    async def reload(self) -> bool:
+        """
+        Swap to the version at `path` if it changed; returns whether it did
+        """
+        signature = self._signature()
+        # A version that failed to load is retried only once it changes again
+        if signature in (self.signature, self.failed_signature):
+            return False
+        try:
+            model = await asyncio.to_thread(self._load, signature)
+        except Exception:
+            self.failed_signature = signature
+            raise
+        self._swap(model, signature)
+        MODEL_SWAPS.inc()
+        return True
+
+    def _swap(self, model: Any, signature: Optional[Tuple]) -> None:
+        previous, self.current, self.signature = self.current, model, signature
+        if previous is not None and previous.version != model.version:
+            self._retire(previous.version)
+        MODEL_ACTIVE.labels(model.version).set(1)
+        logger.info("Serving model %s (%.3fs to load)", model.version, self.versions[model.version]["load_seconds"])
+
+    def _retire(self, version: str) -> None:
+        """
+        Forget a version that is no longer served, so a long-running worker
+        doesn't keep stats and metric series for every version it has seen.
+        With PROMETHEUS_MULTIPROC_DIR the series stay in this worker's file
+        until it exits; prometheus_client can't remove them there.
+        """
+        self.versions.pop(version, None)
+        for metric, labels in [
+            (MODEL_ACTIVE, (version,)),
+            (MODEL_LOAD_SECONDS, (version,)),
+            *[(MODEL_MEMORY_BYTES, (version, kind)) for kind in ("mapped", "rss_anon", "rss_file")],
+        ]:
+            try:
+                metric.remove(*labels)
+            except KeyError:
+                pass
+
+    async def watch(self, interval: float) -> None:
+        """
+        Poll `path` every `interval` seconds and swap to new versions, until cancelled
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception:
+                MODEL_RELOAD_FAILURES.inc()
+                logger.warning("Loading the new model at %s failed; still serving %s", self.path,
+                               self.current.version if self.current else None, exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "target": self.signature[0] if self.signature else None,
+            "mmap": self.mmap,
+            "versions": self.versions,
+            "memory": memory_usage(),
+        }
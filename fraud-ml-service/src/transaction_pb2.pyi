@@ -0,0 +1,49 @@
+from google.protobuf.internal import containers as _containers
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from typing import ClassVar as _ClassVar, Mapping as _Mapping, Optional as _Optional, Union as _Union
+
+DESCRIPTOR: _descriptor.FileDescriptor
+
+class ScoreRequest(_message.Message):
+    __slots__ = ["transaction_id", "features", "request_id", "budget_ms"]
+    class FeaturesEntry(_message.Message):
+        __slots__ = ["key", "value"]
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: float
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[float] = ...) -> None: ...
+    TRANSACTION_ID_FIELD_NUMBER: _ClassVar[int]
+    FEATURES_FIELD_NUMBER: _ClassVar[int]
+    REQUEST_ID_FIELD_NUMBER: _ClassVar[int]
+    BUDGET_MS_FIELD_NUMBER: _ClassVar[int]
+    transaction_id: str
+    features: _containers.ScalarMap[str, float]
+    request_id: int
+    budget_ms: float
+    def __init__(self, transaction_id: _Optional[str] = ..., features: _Optional[_Mapping[str, float]] = ..., request_id: _Optional[int] = ..., budget_ms: _Optional[float] = ...) -> None: ...
+
+class ScoreResponse(_message.Message):
+    __slots__ = ["transaction_id", "request_id", "score", "is_fraud", "model_version", "error"]
+    TRANSACTION_ID_FIELD_NUMBER: _ClassVar[int]
+    REQUEST_ID_FIELD_NUMBER: _ClassVar[int]
+    SCORE_FIELD_NUMBER: _ClassVar[int]
+    IS_FRAUD_FIELD_NUMBER: _ClassVar[int]
+    MODEL_VERSION_FIELD_NUMBER: _ClassVar[int]
+    ERROR_FIELD_NUMBER: _ClassVar[int]
+    transaction_id: str
+    request_id: int
+    score: float
+    is_fraud: bool
+    model_version: str
+    error: ScoreError
+    def __init__(self, transaction_id: _Optional[str] = ..., request_id: _Optional[int] = ..., score: _Optional[float] = ..., is_fraud: bool = ..., model_version: _Optional[str] = ..., error: _Optional[_Union[ScoreError, _Mapping]] = ...) -> None: ...
+
+class ScoreError(_message.Message):
+    __slots__ = ["code", "message"]
+    CODE_FIELD_NUMBER: _ClassVar[int]
+    MESSAGE_FIELD_NUMBER: _ClassVar[int]
+    code: int
+    message: str
+    def __init__(self, code: _Optional[int] = ..., message: _Optional[str] = ...) -> None: ...
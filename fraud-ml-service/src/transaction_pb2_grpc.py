@@ -0,0 +1,104 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+
+import transaction_pb2 as transaction__pb2
+
+
+class FraudScoringStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.ScoreTransaction = channel.unary_unary(
+                '/transaction.v1.FraudScoring/ScoreTransaction',
+                request_serializer=transaction__pb2.ScoreRequest.SerializeToString,
+                response_deserializer=transaction__pb2.ScoreResponse.FromString,
+                )
+        self.ScoreTransactions = channel.stream_stream(
+                '/transaction.v1.FraudScoring/ScoreTransactions',
+                request_serializer=transaction__pb2.ScoreRequest.SerializeToString,
+                response_deserializer=transaction__pb2.ScoreResponse.FromString,
+                )
+
+
+class FraudScoringServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def ScoreTransaction(self, request, context):
+        """INVALID_ARGUMENT if a feature of the served model is missing,
+        RESOURCE_EXHAUSTED when the scoring queue is full, UNAVAILABLE before the model is loaded
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ScoreTransactions(self, request_iterator, context):
+        """Many scores in flight over one long-lived stream. One response per request,
+        in completion order rather than request order, matched by request_id.
+        A request that can't be scored gets a response with `error` set; the stream stays open.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_FraudScoringServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'ScoreTransaction': grpc.unary_unary_rpc_method_handler(
+                    servicer.ScoreTransaction,
+                    request_deserializer=transaction__pb2.ScoreRequest.FromString,
+                    response_serializer=transaction__pb2.ScoreResponse.SerializeToString,
+            ),
+            'ScoreTransactions': grpc.stream_stream_rpc_method_handler(
+                    servicer.ScoreTransactions,
+                    request_deserializer=transaction__pb2.ScoreRequest.FromString,
+                    response_serializer=transaction__pb2.ScoreResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'transaction.v1.FraudScoring', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class FraudScoring(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def ScoreTransaction(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/transaction.v1.FraudScoring/ScoreTransaction',
+            transaction__pb2.ScoreRequest.SerializeToString,
+            transaction__pb2.ScoreResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ScoreTransactions(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/transaction.v1.FraudScoring/ScoreTransactions',
+            transaction__pb2.ScoreRequest.SerializeToString,
+            transaction__pb2.ScoreResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
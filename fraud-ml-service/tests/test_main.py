@@ -0,0 +1,412 @@
+# fraud-ml-service/tests/test_main.py
+import asyncio
+import os
+import time
+
+import grpc
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from main import app
+from batcher import BatcherSaturatedError, MicroBatcher
+from config import settings
+from grpc_server import FraudScoringServicer, start_grpc_server
+from metrics import MODEL_ACTIVE
+from model import (
+    DEMO_FEATURES,
+    LogisticModel,
+    TreeEnsembleModel,
+    demo_model,
+    demo_trees,
+    load_model,
+    save_artifact,
+)
+from store import ModelStore
+from transaction_pb2 import ScoreRequest
+from transaction_pb2_grpc import FraudScoringStub
+
+FEATURES = {
+    "amount": 950.0,
+    "hour_of_day": 3,
+    "merchant_risk": 0.8,
+    "is_foreign": 1,
+    "account_age_days": 12,
+    "tx_count_1h": 6,
+    "amount_sum_24h": 4200.0,
+    "distinct_merchants_24h": 5,
+}
+
+
+class CountingModel:
+    """
+    Demo model that records the size of every predict_proba call
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.model = demo_model()
+        self.feature_names = self.model.feature_names
+        self.version = self.model.version
+        self.delay = delay
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        time.sleep(self.delay)
+        return self.model.predict_proba(X)
+
+
+def rows(n: int) -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(n, len(DEMO_FEATURES))) * 100
+
+
+class TestMicroBatcher:
+    """
+    Micro-batcher tests
+    """
+
+    def run(self, coro_fn, **kwargs):
+        async def runner():
+            batcher = MicroBatcher(**kwargs)
+            batcher.start()
+            try:
+                return await coro_fn(batcher)
+            finally:
+                await batcher.stop()
+        return asyncio.run(runner())
+
+    def test_concurrent_scores_share_batches(self):
+        """Test that concurrent requests are scored together and each gets its own score"""
+        model = CountingModel()
+        X = rows(100)
+
+        async def score_all(batcher):
+            return await asyncio.gather(*[batcher.score(row) for row in X])
+
+        scores = self.run(score_all, predict=model.predict_proba, max_batch_size=32, max_wait_ms=5)
+        assert np.allclose(scores, model.model.predict_proba(X)[:, 1])
+        assert sum(model.calls) == 100
+        assert max(model.calls) == 32
+        assert len(model.calls) <= 5
+
+    def test_lone_request_waits_at_most_max_wait(self):
+        """Test that a single request is flushed after max_wait_ms"""
+        model = CountingModel()
+
+        async def score_one(batcher):
+            start = time.perf_counter()
+            await batcher.score(rows(1)[0])
+            return time.perf_counter() - start
+
+        elapsed = self.run(score_one, predict=model.predict_proba, max_batch_size=64, max_wait_ms=20)
+        assert model.calls == [1]
+        assert 0.015 < elapsed < 0.5
+
+    def test_requests_queue_while_worker_busy(self):
+        """Test that requests arriving during a slow predict form the next batch"""
+        model = CountingModel(delay=0.05)
+
+        async def score_staggered(batcher):
+            first = asyncio.ensure_future(batcher.score(rows(1)[0]))
+            await asyncio.sleep(0.01)
+            rest = [batcher.score(row) for row in rows(10)]
+            await asyncio.gather(first, *rest)
+
+        self.run(score_staggered, predict=model.predict_proba, max_batch_size=64, max_wait_ms=0)
+        assert model.calls == [1, 10]
+
+    def test_predict_error_reaches_every_caller(self):
+        """Test that a failing predict fails all requests of its batch, and the batcher keeps going"""
+        def broken(X):
+            raise ValueError("model exploded")
+
+        async def score_twice(batcher):
+            results = await asyncio.gather(*[batcher.score(row) for row in rows(3)], return_exceptions=True)
+            assert all(isinstance(result, ValueError) for result in results)
+            batcher.predict = demo_model().predict_proba
+            return await batcher.score(rows(1)[0])
+
+        assert 0.0 <= self.run(score_twice, predict=broken, max_wait_ms=1) <= 1.0
+
+    def test_full_queue_rejected(self):
+        """Test that requests beyond the queue depth are shed"""
+        model = CountingModel(delay=0.05)
+
+        async def flood(batcher):
+            return await asyncio.gather(*[batcher.score(row) for row in rows(20)], return_exceptions=True)
+
+        results = self.run(flood, predict=model.predict_proba, max_batch_size=2, max_wait_ms=0, queue_depth=4)
+        assert any(isinstance(result, BatcherSaturatedError) for result in results)
+        assert any(isinstance(result, float) for result in results)
+
+    def test_stop_fails_requests_being_collected(self):
+        """Test that stopping mid-collection resolves the requests already taken into the batch"""
+        model = CountingModel()
+
+        async def stop_mid_batch():
+            batcher = MicroBatcher(model.predict_proba, max_batch_size=64, max_wait_ms=5000)
+            batcher.start()
+            pending = [asyncio.ensure_future(batcher.score(row)) for row in rows(2)]
+            await asyncio.sleep(0.05)  # Both rows are in the batch, which waits for more
+            await batcher.stop()
+            return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+
+        results = asyncio.run(stop_mid_batch())
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert model.calls == []
+
+    def test_batch_split_by_model_version(self):
+        """Test that requests pinned to different model versions are each scored by their own model"""
+        old, new = CountingModel(), CountingModel()
+        new.model = demo_trees(n_trees=5, depth=3)
+        X = rows(8)
+
+        async def score_mixed(batcher):
+            return await asyncio.gather(*[
+                batcher.score(row, (old if i % 2 else new).predict_proba) for i, row in enumerate(X)
+            ])
+
+        scores = self.run(score_mixed, predict=old.predict_proba, max_batch_size=8, max_wait_ms=5)
+        assert old.calls == [4] and new.calls == [4]
+        assert np.allclose(scores[1::2], old.model.predict_proba(X[1::2])[:, 1])
+        assert np.allclose(scores[0::2], new.model.predict_proba(X[0::2])[:, 1])
+
+
+class TestScoringApi:
+    """
+    Scoring API tests
+    """
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(settings, "MODEL_PATH", None)
+        monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+        monkeypatch.setattr(settings, "GRPC_ENABLED", False)
+        with TestClient(app) as client:
+            yield client
+
+    def test_health_and_ready(self, client):
+        """Test health and readiness once the model is loaded"""
+        assert client.get("/health").json() == {"status": "healthy", "service": "fraud-ml-service"}
+        assert client.get("/ready").status_code == 200
+
+    def test_score_transaction(self, client):
+        """Test scoring a transaction against the loaded model"""
+        response = client.post("/score", json={"transaction_id": "tx-1", "features": FEATURES})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["transaction_id"] == "tx-1"
+        assert data["model_version"] == "demo"
+        expected = demo_model().predict_proba(np.array([[FEATURES[name] for name in DEMO_FEATURES]]))[0, 1]
+        assert data["score"] == pytest.approx(expected)
+        assert data["is_fraud"] == (expected >= settings.FRAUD_THRESHOLD)
+
+    def test_score_requires_every_feature(self, client):
+        """Test that a request missing model features is rejected"""
+        features = {name: value for name, value in FEATURES.items() if name != "merchant_risk"}
+        response = client.post("/score", json={"transaction_id": "tx-1", "features": features})
+        assert response.status_code == 422
+        assert "merchant_risk" in response.json()["detail"]
+
+    def test_model_info(self, client):
+        """Test the model endpoint reports the version, features and batching stats"""
+        client.post("/score", json={"transaction_id": "tx-1", "features": FEATURES})
+        data = client.get("/model").json()
+        assert data["version"] == "demo"
+        assert data["features"] == DEMO_FEATURES
+        assert data["batching"]["scored"] >= 1
+
+
+class TestScoringGrpc:
+    """
+    gRPC scoring tests
+    """
+
+    def run(self, scenario, model=demo_model):
+        """Serve `model` over gRPC on a free port and run `scenario(stub, batcher)`"""
+        async def main():
+            store = ModelStore(None, fallback=model)
+            await store.load()
+            batcher = MicroBatcher(store.current.predict_proba, max_batch_size=32, max_wait_ms=5)
+            batcher.start()
+            server, port = await start_grpc_server(FraudScoringServicer(store, batcher), "127.0.0.1:0")
+            try:
+                async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+                    return await scenario(FraudScoringStub(channel), batcher)
+            finally:
+                await server.stop(None)
+                await batcher.stop()
+
+        return asyncio.run(main())
+
+    def test_score_transaction(self):
+        """Test scoring one transaction with the unary call"""
+        async def scenario(stub, batcher):
+            return await stub.ScoreTransaction(ScoreRequest(transaction_id="tx-1", features=FEATURES))
+
+        response = self.run(scenario)
+        expected = demo_model().predict_proba(np.array([[FEATURES[name] for name in DEMO_FEATURES]]))[0, 1]
+        assert response.transaction_id == "tx-1"
+        assert response.score == pytest.approx(expected)
+        assert response.model_version == "demo"
+        assert not response.HasField("error")
+
+    def test_score_transaction_requires_every_feature(self):
+        """Test that a transaction missing model features fails with INVALID_ARGUMENT"""
+        async def scenario(stub, batcher):
+            features = {name: value for name, value in FEATURES.items() if name != "merchant_risk"}
+            with pytest.raises(grpc.aio.AioRpcError) as exc_info:
+                await stub.ScoreTransaction(ScoreRequest(transaction_id="tx-1", features=features))
+            return exc_info.value
+
+        error = self.run(scenario)
+        assert error.code() == grpc.StatusCode.INVALID_ARGUMENT
+        assert "merchant_risk" in error.details()
+
+    def test_stream_scores_every_request(self):
+        """Test that a stream answers every request by request_id, with errors in-band"""
+        X = rows(20)
+
+        async def scenario(stub, batcher):
+            async def requests():
+                for i, row in enumerate(X):
+                    features = dict(zip(DEMO_FEATURES, row))
+                    if i == 7:
+                        del features["amount"]
+                    yield ScoreRequest(transaction_id=f"tx-{i}", features=features, request_id=i + 1)
+
+            return [response async for response in stub.ScoreTransactions(requests())]
+
+        responses = {response.request_id: response for response in self.run(scenario)}
+        assert sorted(responses) == list(range(1, 21))
+        assert responses[8].error.code == grpc.StatusCode.INVALID_ARGUMENT.value[0]
+        expected = demo_model().predict_proba(X)[:, 1]
+        for i in range(20):
+            if i != 7:
+                assert responses[i + 1].transaction_id == f"tx-{i}"
+                assert responses[i + 1].score == pytest.approx(expected[i])
+
+    def test_stream_drops_requests_past_their_budget(self):
+        """Test that a stream request still queued when its budget runs out is answered without scoring"""
+        async def scenario(stub, batcher):
+            async def requests():
+                yield ScoreRequest(transaction_id="busy", features=FEATURES, request_id=1)
+                await asyncio.sleep(0.05)
+                yield ScoreRequest(transaction_id="late", features=FEATURES, request_id=2, budget_ms=20)
+
+            responses = [response async for response in stub.ScoreTransactions(requests())]
+            return {response.transaction_id: response for response in responses}, batcher.scored
+
+        responses, scored = self.run(scenario, model=lambda: CountingModel(delay=0.2))
+        assert not responses["busy"].HasField("error")
+        assert responses["late"].error.code == grpc.StatusCode.DEADLINE_EXCEEDED.value[0]
+        assert scored == 1
+
+
+class TestModelArtifacts:
+    """
+    Model artifact tests
+    """
+
+    def test_logistic_model_round_trips_through_npz(self, tmp_path):
+        """Test that a saved model loads back with the same scores"""
+        path = str(tmp_path / "model-v1.npz")
+        demo_model("v1").save(path)
+        loaded = load_model(path)
+        assert isinstance(loaded, LogisticModel)
+        assert loaded.version == "v1"
+        assert loaded.feature_names == DEMO_FEATURES
+        X = rows(10)
+        assert np.allclose(loaded.predict_proba(X), demo_model().predict_proba(X))
+
+    def test_unknown_artifact_rejected(self, tmp_path):
+        """Test that unsupported artifact types fail loudly"""
+        with pytest.raises(ValueError):
+            load_model(str(tmp_path / "model.onnx"))
+
+    def test_tree_ensemble_artifact_is_memory_mapped(self, tmp_path):
+        """Test that an artifact directory loads as read-only mapped arrays with the same scores"""
+        model = demo_trees(n_trees=20, depth=4, version="v2")
+        save_artifact(model, str(tmp_path / "v2"))
+        loaded = load_model(str(tmp_path / "v2"))
+        assert isinstance(loaded, TreeEnsembleModel)
+        assert loaded.version == "v2"
+        assert isinstance(loaded.threshold, np.memmap)
+        assert not loaded.threshold.flags.writeable
+        X = rows(50)
+        assert np.allclose(loaded.predict_proba(X), model.predict_proba(X))
+        assert not isinstance(load_model(str(tmp_path / "v2"), mmap=False).threshold, np.memmap)
+
+    @pytest.mark.parametrize("estimator", ["gradient_boosting", "random_forest"])
+    def test_sklearn_export_matches_estimator(self, tmp_path, estimator):
+        """Test that scikit-learn tree ensembles export to artifacts with identical scores"""
+        ensemble = pytest.importorskip("sklearn.ensemble")
+        X = rows(400)
+        y = (X[:, 0] + X[:, 2] * 0.5 > 20).astype(int)
+        if estimator == "gradient_boosting":
+            fitted = ensemble.GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=0).fit(X, y)
+        else:
+            fitted = ensemble.RandomForestClassifier(n_estimators=20, max_depth=5, random_state=0).fit(X, y)
+        fitted.feature_names_in_ = np.array(DEMO_FEATURES, dtype=object)
+        save_artifact(TreeEnsembleModel.from_sklearn(fitted, "v3"), str(tmp_path / "v3"))
+        loaded = load_model(str(tmp_path / "v3"))
+        assert loaded.feature_names == DEMO_FEATURES
+        assert np.allclose(loaded.predict_proba(X), fitted.predict_proba(X))
+
+
+class TestModelStore:
+    """
+    Model hot-swap tests
+    """
+
+    def publish(self, tmp_path, version):
+        """Save a version and repoint the `current` symlink at it atomically"""
+        save_artifact(demo_trees(n_trees=10, depth=3, version=version, seed=len(version)), str(tmp_path / version))
+        os.symlink(version, tmp_path / "current.tmp")
+        os.replace(tmp_path / "current.tmp", tmp_path / "current")
+
+    def test_reload_swaps_to_new_version(self, tmp_path):
+        """Test that repointing the symlink swaps the served version, and unchanged paths don't reload"""
+        self.publish(tmp_path, "v1")
+        store = ModelStore(str(tmp_path / "current"))
+
+        async def swap():
+            await store.load()
+            first = store.current
+            assert not await store.reload()
+            self.publish(tmp_path, "v2")
+            assert await store.reload()
+            return first
+
+        first = asyncio.run(swap())
+        assert first.version == "v1"
+        assert store.current.version == "v2"
+        assert store.stats()["target"] == str(tmp_path / "v2")
+        # The retired version's stats and metric series are dropped
+        assert set(store.versions) == {"v2"}
+        assert REGISTRY.get_sample_value("model_active", {"version": "v1"}) is None
+        assert REGISTRY.get_sample_value("model_load_seconds", {"version": "v1"}) is None
+        assert REGISTRY.get_sample_value("model_memory_bytes", {"version": "v1", "kind": "mapped"}) is None
+        assert MODEL_ACTIVE.labels("v2")._value.get() == 1
+        # The old version still scores for requests that were pinned to it
+        assert first.predict_proba(rows(2)).shape == (2, 2)
+
+    def test_broken_version_keeps_current_serving(self, tmp_path):
+        """Test that a version that fails to load is not retried and the current one keeps serving"""
+        self.publish(tmp_path, "v1")
+        store = ModelStore(str(tmp_path / "current"))
+        os.makedirs(tmp_path / "v2")
+        with open(tmp_path / "v2" / "model.json", "w") as f:
+            f.write('{"kind": "logistic", "version": "v2"')
+
+        async def swap():
+            await store.load()
+            os.symlink("v2", tmp_path / "current.tmp")
+            os.replace(tmp_path / "current.tmp", tmp_path / "current")
+            with pytest.raises(ValueError):
+                await store.reload()
+            return await store.reload()
+
+        assert asyncio.run(swap()) is False
+        assert store.current.version == "v1"
@@ -0,0 +1,261 @@
+# notification-service/benchmarks/bench_dispatch.py
+"""
+Alert delivery during a fraud wave, against local SMTP and webhook
+stand-ins, for three ways of sending:
+- naive: one SMTP connection or HTTP client per alert, as fastapi-mail's
+  FastMail.send_message does, at most --naive-concurrency at once
+- pooled: the dispatcher with digests off (ALERT_DIGEST_WINDOW_SECONDS=0),
+  over persistent connections; alerts that are waiting for the same
+  recipient when claimed still share a message
+- digest: the dispatcher with per-recipient digests
+
+    python benchmarks/bench_dispatch.py --alerts 5000 --seconds 5
+
+Flags arrive evenly over `--seconds` for `--recipients` email recipients
+and as many webhook URLs, picked with a skew (a few analysts and
+integrations get most alerts). The stand-ins wait `--rtt-ms` before every
+reply, as a server across a network would. Reports, per mode, the time
+until every alert was received, messages and connections the stand-ins
+saw, and the delay from submitting an alert to the stand-in receiving it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+import aiosmtplib
+import httpx
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+from alert_queue import AlertQueue  # noqa: E402
+from backends import SmtpBackend, SmtpPool, WebhookBackend, render_email  # noqa: E402
+from dispatcher import Alert, AlertDispatcher  # noqa: E402
+
+TRANSACTION_LINE = re.compile(rb"^Transaction (\S+) flagged", re.MULTILINE)
+
+
+class StandIn:
+    """
+    Counts connections and messages, and when each transaction's alert arrived
+    """
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.connections = 0
+        self.messages = 0
+        self.received = {}
+        self.server = None
+        self.port = 0
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        try:
+            await self.handle(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def reply(self, writer, data: bytes) -> None:
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+        writer.write(data)
+        await writer.drain()
+
+    def receive(self, transaction_ids) -> None:
+        now = time.perf_counter()
+        self.messages += 1
+        for transaction_id in transaction_ids:
+            self.received[transaction_id] = now
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class SmtpStandIn(StandIn):
+    """
+    Just enough ESMTP for aiosmtplib: no STARTTLS or AUTH, accepts every message
+    """
+
+    async def handle(self, reader, writer):
+        await self.reply(writer, b"220 standin ESMTP\r\n")
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command == b"EHLO":
+                await self.reply(writer, b"250-standin\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                await self.reply(writer, b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.receive(match.decode() for match in TRANSACTION_LINE.findall(data))
+                await self.reply(writer, b"250 OK queued\r\n")
+            elif command == b"QUIT":
+                await self.reply(writer, b"221 Bye\r\n")
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                await self.reply(writer, b"250 OK\r\n")
+
+
+class WebhookStandIn(StandIn):
+    """
+    HTTP/1.1 with keep-alive; answers every POST with 204
+    """
+
+    async def handle(self, reader, writer):
+        while head := await reader.readuntil(b"\r\n\r\n"):
+            length = int(re.search(rb"content-length: *(\d+)", head, re.IGNORECASE).group(1))
+            body = json.loads(await reader.readexactly(length))
+            self.receive(alert["transaction_id"] for alert in body["alerts"])
+            await self.reply(writer, b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n")
+            if b"connection: close" in head.lower():
+                return
+
+
+def make_wave(args):
+    rng = np.random.default_rng(0)
+    recipients = (rng.zipf(1.5, args.alerts) - 1) % args.recipients
+    channels = rng.integers(0, 2, args.alerts)
+    wave = []
+    for i in range(args.alerts):
+        if channels[i]:
+            wave.append(Alert("email", f"analyst{recipients[i]}@example.com", f"tx-{i}", 0.97, {"amount": 120.0}))
+        else:
+            wave.append(Alert("webhook", f"/hooks/{recipients[i]}", f"tx-{i}", 0.97, {"amount": 120.0}))
+    return wave
+
+
+async def replay(wave, args, deliver) -> dict:
+    # Submit the wave in ticks of 10 ms, like flags coming from many transactions
+    submitted = {}
+    per_tick = max(1, round(len(wave) / (args.seconds * 100)))
+    start = time.perf_counter()
+    for offset in range(0, len(wave), per_tick):
+        tick = start + offset / per_tick / 100
+        delay = tick - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        batch = wave[offset:offset + per_tick]
+        now = time.perf_counter()
+        for alert in batch:
+            submitted[alert.transaction_id] = now
+        await deliver(batch)
+    return submitted
+
+
+async def naive(wave, args, smtp: StandIn, webhook: StandIn):
+    limit = asyncio.Semaphore(args.naive_concurrency)
+    tasks = set()
+
+    async def send(alert):
+        async with limit:
+            if alert.channel == "email":
+                message = render_email("alerts@example.com", alert.recipient, [alert.payload()])
+                await aiosmtplib.send(message, hostname="127.0.0.1", port=smtp.port, start_tls=False)
+            else:
+                async with httpx.AsyncClient() as client:
+                    body = {"alerts": [alert.payload()], "count": 1, "digest": False}
+                    (await client.post(f"http://127.0.0.1:{webhook.port}{alert.recipient}", json=body)).raise_for_status()
+
+    async def deliver(batch):
+        for alert in batch:
+            task = asyncio.create_task(send(alert))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    submitted = await replay(wave, args, deliver)
+    while tasks:
+        await asyncio.gather(*list(tasks))
+    return submitted
+
+
+async def dispatched(wave, args, smtp: StandIn, webhook: StandIn, digest_window: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            SmtpBackend(SmtpPool("127.0.0.1", smtp.port, start_tls=False, size=args.smtp_pool), "alerts@example.com"),
+            WebhookBackend(concurrency=args.webhook_concurrency),
+        ]
+        for alert in wave:
+            if alert.channel == "webhook":
+                alert.recipient = f"http://127.0.0.1:{webhook.port}{alert.recipient}"
+        dispatcher = AlertDispatcher(AlertQueue(os.path.join(tmp, "alerts.db")), backends,
+                                     digest_window=digest_window, poll_interval=0.05)
+        await dispatcher.start()
+        tasks = set()
+
+        async def deliver(batch):
+            # The scoring path hands alerts off without waiting for the commit
+            task = asyncio.create_task(dispatcher.submit(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        submitted = await replay(wave, args, deliver)
+        await asyncio.gather(*list(tasks))
+        while len(smtp.received) + len(webhook.received) < len(wave):
+            await asyncio.sleep(0.01)
+        await dispatcher.close()
+        return submitted
+
+
+async def bench(mode, wave, args) -> dict:
+    smtp, webhook = SmtpStandIn(args.rtt_ms / 1000), WebhookStandIn(args.rtt_ms / 1000)
+    await smtp.start()
+    await webhook.start()
+    start = time.perf_counter()
+    if mode == "naive":
+        submitted = await naive(wave, args, smtp, webhook)
+    else:
+        submitted = await dispatched(wave, args, smtp, webhook, args.digest_window if mode == "digest" else 0.0)
+    received = {**smtp.received, **webhook.received}
+    seconds = max(received.values()) - start
+    await smtp.stop()
+    await webhook.stop()
+    delays = np.array([received[tx] - submitted[tx] for tx in submitted]) * 1000
+    return {
+        "seconds": round(seconds, 2),
+        "alerts_per_second": round(len(wave) / seconds),
+        "emails": smtp.messages,
+        "smtp_connections": smtp.connections,
+        "webhook_calls": webhook.messages,
+        "webhook_connections": webhook.connections,
+        "delay_p50_ms": round(float(np.percentile(delays, 50)), 1),
+        "delay_p99_ms": round(float(np.percentile(delays, 99)), 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Spread the wave over this long")
+    parser.add_argument("--recipients", type=int, default=20, help="Email recipients, and as many webhook URLs")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Stand-in delay before every reply")
+    parser.add_argument("--digest-window", type=float, default=1.0)
+    parser.add_argument("--smtp-pool", type=int, default=4)
+    parser.add_argument("--webhook-concurrency", type=int, default=20)
+    parser.add_argument("--naive-concurrency", type=int, default=64)
+    parser.add_argument("--modes", default="naive,pooled,digest")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        results[mode] = asyncio.run(bench(mode, make_wave(args), args))
+        print(mode, json.dumps(results[mode]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"platform": platform.platform(), "args": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# notification-service/src/alert_queue.py
+"""
+Durable local queue of alerts waiting for delivery, in SQLite.
+
+An alert is accepted only once it is committed, so alerts survive a crash
+or restart until they are delivered (then deleted) or given up on (then
+kept with state 'dead' for inspection). Concurrent put() calls share one
+commit: while a commit runs, new alerts gather and go in the next one, so
+a burst of flags costs a handful of fsyncs rather than one per alert.
+"""
+import asyncio
+import contextlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    due_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_due ON alerts (state, due_at);
+"""
+
+# (channel, recipient, payload)
+QueueItem = Tuple[str, str, Dict[str, Any]]
+
+
+class QueuedAlert:
+    """
+    An alert row claimed for delivery
+    """
+
+    __slots__ = ("id", "channel", "recipient", "payload", "created_at", "attempts")
+
+    def __init__(self, id: int, channel: str, recipient: str, payload: str, created_at: float, attempts: int):
+        self.id = id
+        self.channel = channel
+        self.recipient = recipient
+        self.payload = json.loads(payload)
+        self.created_at = created_at
+        self.attempts = attempts
+
+
+class AlertQueue:
+    """
+    Alerts are 'pending' until due_at, 'sending' while claimed by the
+    dispatcher, and 'dead' once given up on. Alerts left 'sending' by a
+    crash are pending again on open().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db: Optional[aiosqlite.Connection] = None
+        self._waiting: List[Tuple[List[Tuple[str, str, str]], asyncio.Future]] = []
+        self._committer: Optional[asyncio.Task] = None
+
+    async def open(self) -> None:
+        self.db = await aiosqlite.connect(self.path)
+        # WAL: commits append to the log, and reads don't block the writer.
+        # FULL: every commit is fsynced, so an accepted alert survives power loss
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute("PRAGMA synchronous=FULL")
+        await self.db.executescript(SCHEMA)
+        await self.db.execute("UPDATE alerts SET state = 'pending' WHERE state = 'sending'")
+        await self.db.commit()
+
+    async def close(self) -> None:
+        if self._committer is not None:
+            await asyncio.gather(self._committer, return_exceptions=True)
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    async def put(self, items: Sequence[QueueItem]) -> None:
+        """
+        Add alerts; returns once they are committed
+        """
+        # Encoded here, so a payload that isn't JSON fails this caller only
+        rows = [(channel, recipient, json.dumps(payload)) for channel, recipient, payload in items]
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((rows, future))
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.create_task(self._commit_waiting())
+        await future
+
+    async def _commit_waiting(self) -> None:
+        while self._waiting:
+            batch, self._waiting = self._waiting, []
+            now = time.time()
+            try:
+                await self.db.executemany(
+                    "INSERT INTO alerts (channel, recipient, payload, created_at, due_at) VALUES (?, ?, ?, ?, ?)",
+                    [(*row, now, now) for rows, _ in batch for row in rows],
+                )
+                await self.db.commit()
+            except Exception as exc:
+                # The connection is shared: without the rollback, the next commit
+                # by a send would keep the rows inserted before the failure
+                with contextlib.suppress(Exception):
+                    await self.db.rollback()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def claim(self, limit: int, now: Optional[float] = None) -> List[QueuedAlert]:
+        """
+        Mark up to `limit` due alerts as sending and return them, oldest first
+        """
+        now = time.time() if now is None else now
+        async with self.db.execute(
+            "SELECT id, channel, recipient, payload, created_at, attempts FROM alerts "
+            "WHERE state = 'pending' AND due_at <= ? ORDER BY due_at, id LIMIT ?",
+            (now, limit),
+        ) as cursor:
+            alerts = [QueuedAlert(*row) for row in await cursor.fetchall()]
+        if alerts:
+            await self._update("UPDATE alerts SET state = 'sending' WHERE id IN ({})", [a.id for a in alerts])
+        return alerts
+
+    async def _execute(self, sql: str, ids: Sequence[int], params: Sequence[Any] = ()) -> None:
+        # SQLite caps bound parameters per statement (999 on older builds)
+        for start in range(0, len(ids), 500):
+            chunk = list(ids[start:start + 500])
+            await self.db.execute(sql.format(", ".join("?" * len(chunk))), [*params, *chunk])
+
+    async def _update(self, sql: str, ids: Sequence[int], params: Sequence[Any] = ()) -> None:
+        await self._execute(sql, ids, params)
+        await self.db.commit()
+
+    async def release(self, releases: Sequence[Tuple[Sequence[int], float]]) -> None:
+        """
+        Put claimed alerts back without counting an attempt, each
+        (ids, due_at) pair due at its due_at, in one commit
+        """
+        for ids, due_at in releases:
+            await self._execute("UPDATE alerts SET state = 'pending', due_at = ? WHERE id IN ({})", ids, [due_at])
+        await self.db.commit()
+
+    async def delete(self, ids: Sequence[int]) -> None:
+        """
+        Drop delivered alerts
+        """
+        await self._update("DELETE FROM alerts WHERE id IN ({})", ids)
+
+    async def retry(self, ids: Sequence[int], due_at: float, error: str, max_attempts: int) -> int:
+        """
+        Count a failed attempt and retry at `due_at`; alerts that reached
+        `max_attempts` become dead instead. Returns how many did.
+        """
+        await self._update(
+            "UPDATE alerts SET attempts = attempts + 1, last_error = ?, due_at = ?, "
+            "state = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END WHERE id IN ({})",
+            ids, [error, due_at, max_attempts],
+        )
+        dead = 0
+        for start in range(0, len(ids), 500):
+            chunk = list(ids[start:start + 500])
+            async with self.db.execute(
+                f"SELECT COUNT(*) FROM alerts WHERE state = 'dead' AND id IN ({', '.join('?' * len(chunk))})", chunk
+            ) as cursor:
+                dead += (await cursor.fetchone())[0]
+        return dead
+
+    async def bury(self, ids: Sequence[int], error: str) -> None:
+        """
+        Give up on alerts, keeping them as dead letters
+        """
+        await self._update(
+            "UPDATE alerts SET attempts = attempts + 1, last_error = ?, state = 'dead' WHERE id IN ({})", ids, [error]
+        )
+
+    async def next_due(self) -> Optional[float]:
+        async with self.db.execute("SELECT MIN(due_at) FROM alerts WHERE state = 'pending'") as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def counts(self) -> Dict[str, int]:
+        async with self.db.execute("SELECT state, COUNT(*) FROM alerts GROUP BY state") as cursor:
+            return {state: count for state, count in await cursor.fetchall()}
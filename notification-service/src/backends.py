@@ -0,0 +1,270 @@
+# notification-service/src/backends.py
+"""
+Delivery backends for alerts: email over pooled SMTP connections, and
+webhooks over keep-alive HTTP connections.
+
+A backend sends one message per call, for one recipient and one or more
+alerts (a digest), and raises DeliveryError when it can't. Connections
+are opened on demand and kept, so a burst of alerts costs a handful of
+SMTP handshakes (and STARTTLS and AUTH) or TCP/TLS setups rather than
+one per alert.
+"""
+import asyncio
+import logging
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+import aiosmtplib
+import httpx
+
+from config import settings
+from metrics import SMTP_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Webhook statuses worth retrying; any other 4xx won't get better
+RETRYABLE_STATUSES = {408, 425, 429}
+
+
+class DeliveryError(Exception):
+    """
+    A message that couldn't be sent. Retryable errors are tried again
+    later, at `retry_after` seconds at the soonest when the server asked.
+    """
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class SmtpConnection:
+    __slots__ = ("client", "sent")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.sent = 0
+
+
+class SmtpPool:
+    """
+    Up to `size` persistent SMTP connections. Connections are handed out
+    last-in first-out, so a light load keeps reusing one warm connection
+    while a burst opens the rest; each is replaced after `max_messages`.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        timeout: float = 10.0,
+        size: int = 4,
+        max_messages: int = 100,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.size = max(1, size)
+        self.max_messages = max(1, max_messages)
+        self.opened = 0
+        # None stands for a slot without a connection yet
+        self._slots: asyncio.LifoQueue = asyncio.LifoQueue()
+        for _ in range(self.size):
+            self._slots.put_nowait(None)
+
+    async def _connect(self) -> SmtpConnection:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            timeout=self.timeout,
+            # None: upgrade when the server offers STARTTLS
+            start_tls=None if self.start_tls else False,
+        )
+        await client.connect()
+        if self.username:
+            try:
+                await client.login(self.username, self.password or "")
+            except Exception:
+                client.close()
+                raise
+        self.opened += 1
+        SMTP_CONNECTIONS.inc()
+        return SmtpConnection(client)
+
+    @staticmethod
+    async def _discard(connection: SmtpConnection) -> None:
+        try:
+            await connection.client.quit()
+        except Exception:
+            connection.client.close()
+
+    async def send(self, message: EmailMessage) -> None:
+        connection = await self._slots.get()
+        try:
+            while True:
+                reused = connection is not None
+                if connection is None:
+                    connection = await self._connect()
+                try:
+                    await connection.client.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    connection.client.close()
+                    connection = None
+                    # The server dropped an idle connection: once more on a new one
+                    if reused:
+                        continue
+                    raise
+                except Exception:
+                    await self._discard(connection)
+                    connection = None
+                    raise
+                connection.sent += 1
+                if connection.sent >= self.max_messages:
+                    await self._discard(connection)
+                    connection = None
+                return
+        finally:
+            self._slots.put_nowait(connection)
+
+    async def close(self) -> None:
+        while not self._slots.empty():
+            connection = self._slots.get_nowait()
+            if connection is not None:
+                await self._discard(connection)
+
+
+def render_email(sender: str, recipient: str, alerts: List[Dict[str, Any]]) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    if len(alerts) == 1:
+        message["Subject"] = f"Fraud alert: transaction {alerts[0]['transaction_id']}"
+    else:
+        message["Subject"] = f"Fraud alert digest: {len(alerts)} flagged transactions"
+    lines = []
+    for alert in alerts:
+        line = f"Transaction {alert['transaction_id']} flagged with score {alert['score']:.3f}"
+        details = ", ".join(f"{key}={value}" for key, value in alert.get("details", {}).items())
+        lines.append(f"{line} ({details})" if details else line)
+    message.set_content("\n".join(lines) + "\n")
+    return message
+
+
+class SmtpBackend:
+    """
+    Alert emails; one email per digest, sent over the SMTP pool. The pool
+    size is also the number of emails sent at once.
+    """
+
+    channel = "email"
+
+    def __init__(self, pool: SmtpPool, sender: str):
+        self.pool = pool
+        self.sender = sender
+        self.concurrency = pool.size
+
+    @classmethod
+    def from_settings(cls) -> "SmtpBackend":
+        pool = SmtpPool(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USERNAME,
+            password=settings.SMTP_PASSWORD,
+            start_tls=settings.SMTP_STARTTLS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+            size=settings.SMTP_POOL_SIZE,
+            max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+        )
+        return cls(pool, settings.SMTP_FROM_EMAIL or f"{settings.SERVICE_NAME}@localhost")
+
+    async def send(self, recipient: str, alerts: List[Dict[str, Any]]) -> None:
+        message = render_email(self.sender, recipient, alerts)
+        try:
+            await self.pool.send(message)
+        except aiosmtplib.SMTPRecipientsRefused as exc:
+            # Refused for good (5xx) unless one of the refusals is temporary
+            retryable = any(refusal.code < 500 for refusal in exc.recipients)
+            raise DeliveryError(f"Recipient refused: {exc}", retryable=retryable) from exc
+        except aiosmtplib.SMTPAuthenticationError as exc:
+            # Credentials are configuration: keep the alerts until they are fixed
+            raise DeliveryError(f"SMTP authentication failed: {exc}") from exc
+        except aiosmtplib.SMTPResponseException as exc:
+            raise DeliveryError(f"SMTP {exc.code}: {exc.message}", retryable=exc.code < 500) from exc
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as exc:
+            raise DeliveryError(f"SMTP error: {exc!r}") from exc
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pool_size": self.pool.size, "connections_opened": self.pool.opened}
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    # Only the delta-seconds form; an HTTP date falls back to the backoff
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+class WebhookBackend:
+    """
+    Alert webhooks: the recipient is the URL, and each digest is one JSON
+    POST over a shared client that keeps up to `concurrency` connections
+    alive.
+    """
+
+    channel = "webhook"
+
+    def __init__(
+        self,
+        concurrency: int = 20,
+        timeout: float = 5.0,
+        keepalive_expiry: float = 60.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+    @classmethod
+    def from_settings(cls) -> "WebhookBackend":
+        return cls(
+            concurrency=settings.WEBHOOK_CONCURRENCY,
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            keepalive_expiry=settings.WEBHOOK_KEEPALIVE_SECONDS,
+        )
+
+    async def send(self, recipient: str, alerts: List[Dict[str, Any]]) -> None:
+        body = {"alerts": alerts, "count": len(alerts), "digest": len(alerts) > 1}
+        try:
+            response = await self.client.post(recipient, json=body)
+        except httpx.TransportError as exc:
+            raise DeliveryError(f"Webhook call failed: {exc!r}") from exc
+        if response.is_success:
+            return
+        status = response.status_code
+        retryable = status in RETRYABLE_STATUSES or status >= 500
+        raise DeliveryError(
+            f"Webhook answered {status}", retryable=retryable, retry_after=retry_after_seconds(response)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"concurrency": self.concurrency}
+
+    async def close(self) -> None:
+        await self.client.aclose()
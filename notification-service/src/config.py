@@ -0,0 +1,46 @@
+# notification-service/src/config.py
+import os
+from typing import Optional
+
+class Settings:
+    """
+    Notification service settings
+    """
+    # Email settings (same variables as user-service)
+    SMTP_HOST: Optional[str] = os.getenv("SMTP_HOST")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USERNAME: Optional[str] = os.getenv("SMTP_USERNAME")
+    SMTP_PASSWORD: Optional[str] = os.getenv("SMTP_PASSWORD") # Store sensitive data like this in environment variables or secrets management
+    SMTP_FROM_EMAIL: Optional[str] = os.getenv("SMTP_FROM_EMAIL")
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true" # Upgrade with STARTTLS when the server offers it
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "4")) # Persistent SMTP connections, and so emails sent at once
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")) # Reconnect after this many, many servers cap it
+    SMTP_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+
+    # Webhook settings
+    WEBHOOK_CONCURRENCY: int = int(os.getenv("WEBHOOK_CONCURRENCY", "20")) # Webhook calls at once, over as many keep-alive connections
+    WEBHOOK_TIMEOUT_SECONDS: float = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "5"))
+    WEBHOOK_KEEPALIVE_SECONDS: float = float(os.getenv("WEBHOOK_KEEPALIVE_SECONDS", "60")) # Idle keep-alive connections are closed after this
+
+    # Alert dispatching
+    ALERT_QUEUE_PATH: str = os.getenv("ALERT_QUEUE_PATH", "alerts.db") # SQLite file; alerts survive restarts until delivered
+    ALERT_DIGEST_WINDOW_SECONDS: float = float(os.getenv("ALERT_DIGEST_WINDOW_SECONDS", "60")) # After a message to a recipient, further alerts wait this long and go out as one digest; 0 = no digests
+    ALERT_DIGEST_MAX_ALERTS: int = int(os.getenv("ALERT_DIGEST_MAX_ALERTS", "500")) # Alerts per digest
+    ALERT_MAX_ATTEMPTS: int = int(os.getenv("ALERT_MAX_ATTEMPTS", "8")) # Then the alerts are kept as dead letters
+    ALERT_RETRY_BASE_SECONDS: float = float(os.getenv("ALERT_RETRY_BASE_SECONDS", "1")) # Backoff doubles per attempt, with jitter
+    ALERT_RETRY_MAX_SECONDS: float = float(os.getenv("ALERT_RETRY_MAX_SECONDS", "300"))
+    ALERT_POLL_INTERVAL_SECONDS: float = float(os.getenv("ALERT_POLL_INTERVAL_SECONDS", "1")) # Longest wait for alerts coming due; new alerts wake the dispatcher at once
+
+    # Service settings
+    SERVICE_NAME: str = os.getenv("SERVICE_NAME", "notification-service")
+    SERVICE_VERSION: str = os.getenv("SERVICE_VERSION", "1.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+
+    # Environment settings
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development") # e.g., development, staging, production
+
+    # Logging settings
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO") # e.g., DEBUG, INFO, WARNING, ERROR, CRITICAL
+
+settings = Settings()
@@ -0,0 +1,292 @@
+# notification-service/src/dispatcher.py
+"""
+Alert dispatcher: queues flagged-transaction alerts durably and delivers
+them through the email and webhook backends.
+
+Alerts are coalesced per recipient. The first alert to a recipient goes
+out at once; alerts for the same recipient in the following
+ALERT_DIGEST_WINDOW_SECONDS wait and go out together as one digest when
+the window ends, so a fraud wave costs a recipient one message per window
+rather than one per flagged transaction.
+
+Every backend sends at most `backend.concurrency` messages at once. A
+failed message is retried with exponential backoff and jitter, honouring
+Retry-After, until ALERT_MAX_ATTEMPTS; permanent failures and alerts out
+of attempts are kept in the queue as dead letters. Delivery is at least
+once: alerts being sent when the process dies are sent again on restart.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from alert_queue import AlertQueue, QueuedAlert
+from backends import DeliveryError, SmtpBackend, WebhookBackend
+from config import settings
+from metrics import (
+    ALERTS_DEAD,
+    ALERTS_DELIVERED,
+    ALERTS_QUEUED,
+    DELIVERY_DELAY,
+    MESSAGES_SENT,
+    QUEUE_DEPTH,
+    SEND_DURATION,
+    SEND_FAILURES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Alert:
+    channel: str  # "email" or "webhook"
+    recipient: str  # Email address or webhook URL
+    transaction_id: str
+    score: float
+    details: Dict[str, Any] = field(default_factory=dict)  # e.g. amount, user_id, rules that fired
+
+    def payload(self) -> Dict[str, Any]:
+        return {"transaction_id": self.transaction_id, "score": self.score, "details": self.details}
+
+
+class AlertDispatcher:
+    """
+    Use as `await dispatcher.start()` ... `await dispatcher.close()`;
+    submit() returns once the alerts are in the durable queue.
+    """
+
+    def __init__(
+        self,
+        queue: AlertQueue,
+        backends: Sequence[Any],
+        digest_window: float = 60.0,
+        digest_max: int = 500,
+        max_attempts: int = 8,
+        retry_base: float = 1.0,
+        retry_max: float = 300.0,
+        poll_interval: float = 1.0,
+        claim_size: int = 1000,
+    ):
+        self.queue = queue
+        self.backends = {backend.channel: backend for backend in backends}
+        self.digest_window = digest_window
+        self.digest_max = max(1, digest_max)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.claim_size = claim_size
+        self.limits = {channel: asyncio.Semaphore(backend.concurrency) for channel, backend in self.backends.items()}
+        # Claim no more than the backends can work through soon
+        self.max_in_flight = 2 * sum(backend.concurrency for backend in backends)
+        # When the last message to each (channel, recipient) started
+        self.last_sent: Dict[Tuple[str, str], float] = {}
+        self._pruned_at = 0.0
+        self._depth_at = 0.0
+        self._sending: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @classmethod
+    def from_settings(cls) -> "AlertDispatcher":
+        backends: List[Any] = [WebhookBackend.from_settings()]
+        if settings.SMTP_HOST:
+            backends.append(SmtpBackend.from_settings())
+        else:
+            logger.warning("SMTP_HOST is not set, email alerts will be kept as dead letters")
+        return cls(
+            AlertQueue(settings.ALERT_QUEUE_PATH),
+            backends,
+            digest_window=settings.ALERT_DIGEST_WINDOW_SECONDS,
+            digest_max=settings.ALERT_DIGEST_MAX_ALERTS,
+            max_attempts=settings.ALERT_MAX_ATTEMPTS,
+            retry_base=settings.ALERT_RETRY_BASE_SECONDS,
+            retry_max=settings.ALERT_RETRY_MAX_SECONDS,
+            poll_interval=settings.ALERT_POLL_INTERVAL_SECONDS,
+        )
+
+    async def start(self) -> None:
+        await self.queue.open()
+        self._runner = asyncio.create_task(self.run())
+
+    async def submit(self, alerts: Sequence[Alert]) -> None:
+        """
+        Queue alerts for delivery; returns once they are durably stored
+        """
+        if not alerts:
+            return
+        await self.queue.put([(alert.channel, alert.recipient, alert.payload()) for alert in alerts])
+        for alert in alerts:
+            ALERTS_QUEUED.labels(alert.channel).inc()
+        self._wake.set()
+
+    async def run(self) -> None:
+        while not self._closing:
+            self._wake.clear()
+            # Woken by submit() and as sends finish
+            timeout = self.poll_interval
+            if len(self._sending) < self.max_in_flight:
+                try:
+                    now = time.time()
+                    alerts = await self.queue.claim(self.claim_size, now)
+                    if alerts:
+                        await self._dispatch(alerts, now)
+                        continue
+                    next_due = await self.queue.next_due()
+                    if next_due is not None:
+                        timeout = min(timeout, max(0.0, next_due - time.time()))
+                    await self._update_depth()
+                except Exception:
+                    logger.exception("Dispatching alerts failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self, alerts: List[QueuedAlert], now: float) -> None:
+        """
+        Send the alerts claimed at `now`. Windows are judged at the claim
+        time too: judged later, an alert claimed just before its recipient's
+        window ends would go out alone and start a new window, leaving the
+        digest due at the end of the old one waiting another window.
+        """
+        groups: Dict[Tuple[str, str], List[QueuedAlert]] = defaultdict(list)
+        for alert in alerts:
+            groups[(alert.channel, alert.recipient)].append(alert)
+        self._prune(now)
+        releases = []
+        for key, group in groups.items():
+            channel = key[0]
+            backend = self.backends.get(channel)
+            if backend is None:
+                await self.queue.bury([alert.id for alert in group], f"No backend for channel {channel!r}")
+                ALERTS_DEAD.labels(channel).inc(len(group))
+                continue
+            last = self.last_sent.get(key)
+            if self.digest_window > 0 and last is not None and now - last < self.digest_window:
+                # Within the recipient's window: wait for the digest at its end
+                releases.append(([alert.id for alert in group], last + self.digest_window))
+                continue
+            batch, rest = group[:self.digest_max], group[self.digest_max:]
+            if rest:
+                releases.append(([alert.id for alert in rest], now + self.digest_window))
+            self.last_sent[key] = now
+            task = asyncio.create_task(self._send(backend, key[1], batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sent)
+        if releases:
+            await self.queue.release(releases)
+
+    def _sent(self, task: asyncio.Task) -> None:
+        self._sending.discard(task)
+        self._wake.set()
+
+    def _prune(self, now: float) -> None:
+        # Forget recipients whose window has ended, at most once per window
+        if now - self._pruned_at < max(self.digest_window, 1.0):
+            return
+        self._pruned_at = now
+        self.last_sent = {key: sent for key, sent in self.last_sent.items() if now - sent < self.digest_window}
+
+    async def _update_depth(self) -> None:
+        now = time.monotonic()
+        if now - self._depth_at < self.poll_interval:
+            return
+        self._depth_at = now
+        counts = await self.queue.counts()
+        QUEUE_DEPTH.set(counts.get("pending", 0) + counts.get("sending", 0))
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Seconds before retrying alerts that failed `attempts` times before
+        """
+        return min(self.retry_max, self.retry_base * 2 ** attempts) * random.uniform(0.5, 1.0)
+
+    async def _send(self, backend: Any, recipient: str, alerts: List[QueuedAlert]) -> None:
+        channel = backend.channel
+        ids = [alert.id for alert in alerts]
+        try:
+            async with self.limits[channel]:
+                start = time.perf_counter()
+                try:
+                    await backend.send(recipient, [alert.payload for alert in alerts])
+                except DeliveryError as exc:
+                    error = exc
+                except Exception as exc:
+                    logger.exception("Sending %s alert to %s failed", channel, recipient)
+                    error = DeliveryError(repr(exc))
+                else:
+                    error = None
+                SEND_DURATION.labels(channel).observe(time.perf_counter() - start)
+
+            if error is None:
+                await self.queue.delete(ids)
+                now = time.time()
+                ALERTS_DELIVERED.labels(channel).inc(len(alerts))
+                MESSAGES_SENT.labels(channel, "digest" if len(alerts) > 1 else "single").inc()
+                for alert in alerts:
+                    DELIVERY_DELAY.labels(channel).observe(now - alert.created_at)
+                return
+
+            SEND_FAILURES.labels(channel, str(error.retryable).lower()).inc()
+            if not error.retryable:
+                logger.warning("Giving up on %d %s alerts to %s: %s", len(alerts), channel, recipient, error)
+                await self.queue.bury(ids, str(error))
+                ALERTS_DEAD.labels(channel).inc(len(alerts))
+                return
+            delay = self.backoff(max(alert.attempts for alert in alerts))
+            if error.retry_after is not None:
+                delay = max(delay, error.retry_after)
+            dead = await self.queue.retry(ids, time.time() + delay, str(error), self.max_attempts)
+            if dead:
+                logger.warning("Giving up on %d %s alerts to %s after %d attempts: %s",
+                               dead, channel, recipient, self.max_attempts, error)
+                ALERTS_DEAD.labels(channel).inc(dead)
+        except Exception:
+            # Left 'sending' in the queue, so they are sent again after a restart
+            logger.exception("Recording the outcome of %d %s alerts failed", len(alerts), channel)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no alert is due or being sent; True if that happened
+        within `timeout`. Alerts held back for a digest or a retry later
+        than now don't count.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            next_due = await self.queue.next_due()
+            if not self._sending and (next_due is None or next_due > time.time()):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._wake.set()
+            await asyncio.sleep(0.01)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._sending),
+            "recipients_in_window": len(self.last_sent),
+            "backends": {channel: backend.stats() for channel, backend in self.backends.items()},
+        }
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Stop claiming alerts and give in-flight sends `timeout` seconds to
+        finish; alerts still sending after that are sent again on restart
+        """
+        self._closing = True
+        self._wake.set()
+        if self._runner is not None:
+            await asyncio.gather(self._runner, return_exceptions=True)
+        if self._sending:
+            _, unfinished = await asyncio.wait(set(self._sending), timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        for backend in self.backends.values():
+            await backend.close()
+        await self.queue.close()
@@ -0,0 +1,54 @@
+# notification-service/src/metrics.py
+"""
+Prometheus metrics for the notification service.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+SEND_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DELIVERY_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+ALERTS_QUEUED = Counter(
+    "alerts_queued_total",
+    "Alerts accepted into the durable queue",
+    ["channel"],
+)
+ALERTS_DELIVERED = Counter(
+    "alerts_delivered_total",
+    "Alerts delivered, alone or in a digest",
+    ["channel"],
+)
+ALERTS_DEAD = Counter(
+    "alerts_dead_total",
+    "Alerts given up on after ALERT_MAX_ATTEMPTS or a permanent error, kept as dead letters",
+    ["channel"],
+)
+MESSAGES_SENT = Counter(
+    "alert_messages_sent_total",
+    "Emails or webhook calls sent; a digest is one message",
+    ["channel", "kind"],
+)
+SEND_FAILURES = Counter(
+    "alert_send_failures_total",
+    "Failed sends, by whether they are retried",
+    ["channel", "retryable"],
+)
+SEND_DURATION = Histogram(
+    "alert_send_seconds",
+    "Time to send one email or webhook call, connection setup included",
+    ["channel"],
+    buckets=SEND_BUCKETS,
+)
+DELIVERY_DELAY = Histogram(
+    "alert_delivery_delay_seconds",
+    "Time from an alert being queued to its delivery, digest wait and retries included",
+    ["channel"],
+    buckets=DELIVERY_BUCKETS,
+)
+QUEUE_DEPTH = Gauge(
+    "alert_queue_depth",
+    "Alerts waiting in the durable queue",
+)
+SMTP_CONNECTIONS = Counter(
+    "smtp_connections_opened_total",
+    "SMTP connections opened by the pool",
+)
@@ -0,0 +1,8 @@
+# notification-service/tests/conftest.py
+import os
+import sys
+
+# The dispatcher imports its modules top-level (`from backends import DeliveryError`),
+# as it does when run from src/. Tests import them the same way so every module is
+# loaded once; `src.backends.DeliveryError` is a different class from the one it catches.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,268 @@
+# notification-service/tests/test_dispatcher.py
+import asyncio
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+
+from alert_queue import AlertQueue
+from backends import DeliveryError, WebhookBackend, render_email
+from dispatcher import Alert, AlertDispatcher
+
+
+class FakeBackend:
+    """Records messages; fails with the queued errors first"""
+
+    def __init__(self, channel="webhook", concurrency=4, delay=0.0, errors=()):
+        self.channel = channel
+        self.concurrency = concurrency
+        self.delay = delay
+        self.errors = list(errors)
+        self.messages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send(self, recipient, alerts):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+            self.messages.append((recipient, [alert["transaction_id"] for alert in alerts]))
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {}
+
+    async def close(self):
+        pass
+
+
+def alerts(n, recipient="https://hooks.example.com/risk", channel="webhook", start=0):
+    return [Alert(channel, recipient, f"tx-{i}", 0.97, {"amount": 120.0}) for i in range(start, start + n)]
+
+
+def run(backends, scenario, path, **kwargs):
+    async def main():
+        kwargs.setdefault("poll_interval", 0.02)
+        dispatcher = AlertDispatcher(AlertQueue(str(path)), backends, **kwargs)
+        await dispatcher.start()
+        try:
+            return await scenario(dispatcher)
+        finally:
+            await dispatcher.close()
+
+    return asyncio.run(main())
+
+
+class TestAlertDispatcher:
+
+    def test_alerts_within_window_go_out_as_one_digest(self, tmp_path):
+        """Test that the first alert goes out at once and the next 50 as one digest after the window"""
+        backend = FakeBackend()
+
+        async def scenario(dispatcher):
+            await dispatcher.submit(alerts(1))
+            assert await dispatcher.drain(timeout=2)
+            assert backend.messages == [("https://hooks.example.com/risk", ["tx-0"])]
+            await dispatcher.submit(alerts(50, start=1))
+            await dispatcher.submit(alerts(1, recipient="https://hooks.example.com/other", start=99))
+            assert await dispatcher.drain(timeout=2)
+            # The other recipient isn't held back by the first one's window
+            assert backend.messages[-1] == ("https://hooks.example.com/other", ["tx-99"])
+            await asyncio.sleep(0.3)
+            assert await dispatcher.drain(timeout=2)
+            return await dispatcher.queue.counts()
+
+        counts = run([backend], scenario, tmp_path / "alerts.db", digest_window=0.25)
+        assert len(backend.messages) == 3
+        recipient, digest = backend.messages[2]
+        assert recipient == "https://hooks.example.com/risk"
+        assert digest == [f"tx-{i}" for i in range(1, 51)]
+        assert counts == {}
+
+    def test_window_is_judged_at_claim_time(self, tmp_path):
+        """Test that an alert claimed just before its recipient's window ends waits for the digest"""
+        backend = FakeBackend()
+
+        async def main():
+            dispatcher = AlertDispatcher(AlertQueue(str(tmp_path / "alerts.db")), [backend], digest_window=1.0)
+            await dispatcher.queue.open()
+            await dispatcher.submit(alerts(1))
+            claimed_at = time.time()
+            claimed = await dispatcher.queue.claim(10, claimed_at)
+            dispatcher.last_sent[("webhook", "https://hooks.example.com/risk")] = claimed_at - 0.999
+            await asyncio.sleep(0.01)  # The window ends while the claim is dispatched
+            await dispatcher._dispatch(claimed, claimed_at)
+            due = await dispatcher.queue.next_due()
+            await dispatcher.close()
+            return claimed_at, due
+
+        claimed_at, due = asyncio.run(main())
+        assert backend.messages == []
+        assert due == pytest.approx(claimed_at + 0.001)
+
+    def test_digest_size_is_capped(self, tmp_path):
+        """Test that a backlog larger than digest_max is split over several digests"""
+        backend = FakeBackend()
+
+        async def scenario(dispatcher):
+            await dispatcher.submit(alerts(25))
+            await asyncio.sleep(0.4)
+            assert await dispatcher.drain(timeout=2)
+
+        run([backend], scenario, tmp_path / "alerts.db", digest_window=0.1, digest_max=10)
+        assert [len(ids) for _, ids in backend.messages] == [10, 10, 5]
+
+    def test_retryable_failure_is_retried(self, tmp_path):
+        """Test that failed sends are retried with backoff until they succeed"""
+        backend = FakeBackend(errors=[DeliveryError("503"), DeliveryError("timeout")])
+
+        async def scenario(dispatcher):
+            await dispatcher.submit(alerts(2))
+            await asyncio.sleep(0.2)
+            assert await dispatcher.drain(timeout=2)
+            return await dispatcher.queue.counts()
+
+        counts = run([backend], scenario, tmp_path / "alerts.db", digest_window=0, retry_base=0.01, retry_max=0.05)
+        assert backend.messages == [("https://hooks.example.com/risk", ["tx-0", "tx-1"])]
+        assert counts == {}
+
+    def test_failures_end_as_dead_letters(self, tmp_path):
+        """Test that permanent failures and alerts out of attempts are kept as dead"""
+        backend = FakeBackend(errors=[DeliveryError("410 Gone", retryable=False)] + [DeliveryError("503")] * 3)
+
+        async def scenario(dispatcher):
+            await dispatcher.submit(alerts(1))
+            assert await dispatcher.drain(timeout=2)
+            await dispatcher.submit(alerts(1, recipient="https://hooks.example.com/flaky", start=1))
+            await asyncio.sleep(0.3)
+            assert await dispatcher.drain(timeout=2)
+            async with dispatcher.queue.db.execute(
+                "SELECT recipient, attempts, last_error FROM alerts WHERE state = 'dead' ORDER BY id"
+            ) as cursor:
+                return await cursor.fetchall()
+
+        dead = run([backend], scenario, tmp_path / "alerts.db", digest_window=0, max_attempts=3, retry_base=0.01)
+        assert dead == [
+            ("https://hooks.example.com/risk", 1, "410 Gone"),
+            ("https://hooks.example.com/flaky", 3, "503"),
+        ]
+        assert backend.messages == []
+
+    def test_queued_alerts_survive_restart(self, tmp_path):
+        """Test that alerts queued or in flight when the process stops are sent after a restart"""
+        path = tmp_path / "alerts.db"
+
+        async def crash():
+            queue = AlertQueue(str(path))
+            await queue.open()
+            await queue.put([("webhook", "https://hooks.example.com/risk", alert.payload()) for alert in alerts(3)])
+            await queue.claim(1)  # Sending when the process died
+            await queue.db.close()
+
+        asyncio.run(crash())
+        backend = FakeBackend()
+
+        async def scenario(dispatcher):
+            await asyncio.sleep(0.1)
+            assert await dispatcher.drain(timeout=2)
+
+        run([backend], scenario, path, digest_window=0)
+        assert sorted(ids for _, batch in backend.messages for ids in batch) == ["tx-0", "tx-1", "tx-2"]
+
+    def test_unencodable_alert_fails_only_its_submit(self, tmp_path):
+        """Test that an alert whose details aren't JSON is rejected without holding up other submits"""
+        backend = FakeBackend()
+
+        async def scenario(dispatcher):
+            bad = Alert("webhook", "https://hooks.example.com/risk", "tx-bad", 0.97, {"at": datetime.now()})
+            results = await asyncio.wait_for(
+                asyncio.gather(dispatcher.submit([bad]), dispatcher.submit(alerts(1)), return_exceptions=True), 2
+            )
+            assert await dispatcher.drain(timeout=2)
+            return results
+
+        results = run([backend], scenario, tmp_path / "alerts.db", digest_window=0)
+        assert isinstance(results[0], TypeError)
+        assert results[1] is None
+        assert backend.messages == [("https://hooks.example.com/risk", ["tx-0"])]
+
+    def test_failed_put_is_rolled_back(self, tmp_path):
+        """Test that rows inserted before a put fails are not committed by a later write"""
+        async def main():
+            queue = AlertQueue(str(tmp_path / "alerts.db"))
+            await queue.open()
+            payload = alerts(1)[0].payload()
+            with pytest.raises(sqlite3.IntegrityError):
+                await queue.put([("webhook", "https://hooks.example.com/risk", payload), ("webhook", None, payload)])
+            await queue.delete([])  # Commits, as a send finishing would
+            counts = await queue.counts()
+            await queue.close()
+            return counts
+
+        assert asyncio.run(main()) == {}
+
+    def test_concurrency_is_bounded_per_backend(self, tmp_path):
+        """Test that each backend never has more than its concurrency of sends in flight"""
+        webhooks = FakeBackend(concurrency=3, delay=0.02)
+        email = FakeBackend(channel="email", concurrency=1, delay=0.02)
+
+        async def scenario(dispatcher):
+            batch = []
+            for i in range(20):
+                batch += alerts(1, recipient=f"https://hooks.example.com/{i}", start=i)
+                batch += alerts(1, recipient=f"analyst{i}@example.com", channel="email", start=i)
+            await dispatcher.submit(batch)
+            await asyncio.sleep(0.05)
+            assert await dispatcher.drain(timeout=5)
+
+        run([webhooks, email], scenario, tmp_path / "alerts.db")
+        assert (len(webhooks.messages), len(email.messages)) == (20, 20)
+        assert webhooks.max_in_flight == 3
+        assert email.max_in_flight == 1
+
+
+class TestBackends:
+
+    def test_webhook_classifies_responses(self):
+        """Test that the webhook backend posts a digest and tells retryable errors from permanent ones"""
+        requests = []
+        statuses = {"/ok": 204, "/busy": 429, "/down": 503, "/gone": 410}
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            headers = {"Retry-After": "7"} if request.url.path == "/busy" else {}
+            return httpx.Response(statuses[request.url.path], headers=headers)
+
+        async def main():
+            backend = WebhookBackend(transport=httpx.MockTransport(handler))
+            payloads = [alert.payload() for alert in alerts(2)]
+            errors = {}
+            for path in statuses:
+                try:
+                    await backend.send(f"https://hooks.example.com{path}", payloads)
+                except DeliveryError as exc:
+                    errors[path] = (exc.retryable, exc.retry_after)
+            await backend.close()
+            return errors
+
+        errors = asyncio.run(main())
+        assert errors == {"/busy": (True, 7.0), "/down": (True, None), "/gone": (False, None)}
+        assert requests[0]["count"] == 2 and requests[0]["digest"] is True
+        assert requests[0]["alerts"][1]["transaction_id"] == "tx-1"
+
+    @pytest.mark.parametrize("count, subject", [
+        (1, "Fraud alert: transaction tx-0"),
+        (3, "Fraud alert digest: 3 flagged transactions"),
+    ])
+    def test_email_subject(self, count, subject):
+        """Test single alert and digest email subjects"""
+        message = render_email("alerts@example.com", "analyst@example.com", [a.payload() for a in alerts(count)])
+        assert message["Subject"] == subject
+        assert message.get_content().count("flagged with score 0.970") == count
@@ -0,0 +1,113 @@
+# transaction-service/benchmarks/bench_features.py
+"""
+Velocity feature store: update and read cost, memory per user, snapshot
+and restore time, for the in-process windows.
+
+    python benchmarks/bench_features.py --users 100000 --transactions 1000000
+
+Replays `--transactions` transactions spread over `--hours` hours of
+simulated time, from users drawn with a skew (a few users make many
+transactions, as with real traffic) over `--merchants` merchants, then
+reports:
+- record_local and read_local microseconds per call (p50/p99 and mean)
+- traced memory per user once all windows are filled
+- snapshot and restore seconds and the snapshot file size
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+from features import VelocityStore  # noqa: E402
+
+T0 = 1_700_000_000.0
+
+
+def micros(samples) -> dict:
+    samples = np.asarray(samples) * 1e6
+    return {
+        "mean_us": round(float(samples.mean()), 2),
+        "p50_us": round(float(np.percentile(samples, 50)), 2),
+        "p99_us": round(float(np.percentile(samples, 99)), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--merchants", type=int, default=20000)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    users = [f"user-{i}" for i in (rng.zipf(1.3, args.transactions) % args.users)]
+    merchants = [f"merchant-{i}" for i in rng.integers(0, args.merchants, args.transactions)]
+    amounts = rng.lognormal(3.5, 1.2, args.transactions).round(2).tolist()
+    timestamps = (T0 + np.sort(rng.uniform(0, args.hours * 3600, args.transactions))).tolist()
+
+    def replay(timed: bool):
+        store = VelocityStore(max_users=args.users * 2)
+        now = [T0]
+        store.clock = lambda: now[0]
+        record, read = [], []
+        perf = time.perf_counter
+        for i in range(args.transactions):
+            now[0] = timestamps[i]
+            start = perf()
+            store.record_local(users[i], amounts[i], merchants[i])
+            if timed:
+                record.append(perf() - start)
+            if i % 10 == 0:
+                start = perf()
+                store.read_local(users[i])
+                if timed:
+                    read.append(perf() - start)
+        return store, record, read
+
+    store, record, read = replay(timed=True)
+    # Memory in a second pass: tracing slows every allocation down
+    tracemalloc.start()
+    traced_store, _, _ = replay(timed=False)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_store
+    perf = time.perf_counter
+
+    results = {
+        "users": len(store),
+        "transactions": args.transactions,
+        "record": micros(record),
+        "read": micros(read),
+        "bytes_per_user": round(traced / max(1, len(store))),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "velocity.json")
+        start = perf()
+        store.snapshot(path)
+        results["snapshot_seconds"] = round(perf() - start, 3)
+        results["snapshot_mb"] = round(os.path.getsize(path) / 1024 / 1024, 1)
+        restored = VelocityStore(max_users=args.users * 2)
+        restored.clock = store.clock
+        start = perf()
+        restored.restore(path)
+        results["restore_seconds"] = round(perf() - start, 3)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"platform": platform.platform(), "args": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
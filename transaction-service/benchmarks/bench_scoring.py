@@ -0,0 +1,142 @@
+# transaction-service/benchmarks/bench_scoring.py
+"""
+End-to-end fraud scoring: FraudScoringClient -> gRPC -> fraud-ml-service
+(micro-batcher and model), both services in this process, CPU only.
+
+    python benchmarks/bench_scoring.py --concurrency 1,16,64,256 --calls 5000
+    python benchmarks/bench_scoring.py --trees 300 --budget-ms 5 --concurrency 256
+
+The fraud-ml-service gRPC server runs on a unix socket on the same event
+loop as the client, so there is no network and no TCP stack, but HTTP/2
+framing, protobuf and both services' code are all included. For each
+client mode:
+- unary: one ScoreTransaction call per score
+- stream:N: scores multiplexed over N long-lived ScoreTransactions streams
+and each concurrency (callers each awaiting one score, then sending the
+next), reports scores/sec, p50/p95/p99 latency, fallbacks to the rules and
+the mean micro-batch size on the server. Scores that miss --budget-ms are
+decided by the rules; keep it large to measure the model path alone.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FRAUD_SRC_DIR = os.path.join(ROOT, "fraud-ml-service", "src")
+SRC_DIR = os.path.join(ROOT, "transaction-service", "src")
+
+# Both services import their own `config` and `metrics`; load fraud-ml-service
+# first, then drop its copies so transaction-service imports its own
+sys.path.insert(0, FRAUD_SRC_DIR)
+from batcher import MicroBatcher  # noqa: E402
+from grpc_server import FraudScoringServicer, start_grpc_server  # noqa: E402
+from model import DEMO_FEATURES, demo_model, demo_trees  # noqa: E402
+from store import ModelStore  # noqa: E402
+
+for name in ("config", "metrics"):
+    del sys.modules[name]
+sys.path[0] = SRC_DIR
+from fraud_client import FraudScoringClient  # noqa: E402
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+async def measure(client: FraudScoringClient, features: List[dict], calls: int, concurrency: int) -> dict:
+    latencies = []
+    fallbacks = {}
+    remaining = iter(range(calls))
+
+    async def caller():
+        for i in remaining:
+            start = time.perf_counter()
+            decision = await client.score(f"tx-{i}", features[i % len(features)])
+            latencies.append(time.perf_counter() - start)
+            if decision.fallback_reason:
+                fallbacks[decision.fallback_reason] = fallbacks.get(decision.fallback_reason, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[caller() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "scores_per_sec": round(calls / elapsed),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "fallbacks": fallbacks,
+    }
+
+
+async def run(args) -> List[dict]:
+    store = ModelStore(None, fallback=lambda: demo_trees(args.trees, args.depth) if args.trees else demo_model())
+    await store.load()
+    # Spread like the demo model's training data
+    demo = demo_model()
+    X = demo.mean + demo.scale * np.random.default_rng(0).normal(size=(1000, len(DEMO_FEATURES)))
+    features = [dict(zip(DEMO_FEATURES, map(float, row))) for row in X]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        target = f"unix:{os.path.join(tmp, 'fraud.sock')}"
+        for mode in args.modes.split(","):
+            for concurrency in [int(value) for value in args.concurrency.split(",")]:
+                # A fresh server and batcher per run, so batch stats are per run
+                batcher = MicroBatcher(
+                    store.current.predict_proba, max_batch_size=args.batch_size, max_wait_ms=args.wait_ms
+                )
+                batcher.start()
+                server, _ = await start_grpc_server(FraudScoringServicer(store, batcher), target)
+                client = FraudScoringClient(
+                    target,
+                    budget_ms=args.budget_ms,
+                    use_stream=mode.startswith("stream"),
+                    streams=int(mode.split(":")[1]) if ":" in mode else 1,
+                )
+                try:
+                    await measure(client, features, min(200, args.calls), concurrency)  # warm-up
+                    batches_before, scored_before = batcher.batches, batcher.scored
+                    result = await measure(client, features, args.calls, concurrency)
+                    batches = batcher.batches - batches_before
+                    result["mean_batch"] = round((batcher.scored - scored_before) / batches, 1) if batches else 0
+                finally:
+                    await client.close()
+                    await server.stop(None)
+                    await batcher.stop()
+                result = {"mode": mode, "concurrency": concurrency, **result}
+                print(json.dumps(result))
+                results.append(result)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="unary,stream:1,stream:4")
+    parser.add_argument("--concurrency", default="1,16,64,256")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--wait-ms", type=float, default=1.0)
+    parser.add_argument("--trees", type=int, default=0, help="Score a synthetic tree ensemble (default: the demo logistic model)")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"platform": platform.platform(), "args": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# transaction-service/src/config.py
+import os
+from typing import Optional
+
+class Settings:
+    """
+    Transaction service settings
+    """
+    # Fraud scoring (libs/api-contracts/transaction.proto, served by fraud-ml-service)
+    FRAUD_GRPC_TARGET: str = os.getenv("FRAUD_GRPC_TARGET", "dns:///fraud-ml-service-grpc:50051") # Headless service, so streams spread over pods
+    FRAUD_SCORE_BUDGET_MS: float = float(os.getenv("FRAUD_SCORE_BUDGET_MS", "50")) # Past this the rules decide instead of the model
+    FRAUD_USE_STREAM: bool = os.getenv("FRAUD_USE_STREAM", "true").lower() == "true" # ScoreTransactions streams; false = one ScoreTransaction call per score
+    FRAUD_STREAMS: int = int(os.getenv("FRAUD_STREAMS", "2")) # Long-lived streams per channel, used round robin
+    FRAUD_RULES_THRESHOLD: float = float(os.getenv("FRAUD_RULES_THRESHOLD", "0.5")) # Rule scores at or above are reported as fraud
+
+    # Velocity features (per-user transaction windows over 1 min / 1 h / 24 h)
+    VELOCITY_BACKEND: str = os.getenv("VELOCITY_BACKEND", "memory") # memory (per process) or redis (shared by replicas, needs REDIS_URL)
+    VELOCITY_MAX_USERS: int = int(os.getenv("VELOCITY_MAX_USERS", "500000")) # In-process users kept, least recently active dropped first
+    VELOCITY_MAX_MERCHANTS: int = int(os.getenv("VELOCITY_MAX_MERCHANTS", "256")) # Distinct merchants counted per user and window
+    VELOCITY_SNAPSHOT_PATH: Optional[str] = os.getenv("VELOCITY_SNAPSHOT_PATH") # In-process windows are restored from and saved to this file
+    VELOCITY_SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("VELOCITY_SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+    # Redis settings
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL") # e.g., redis://localhost:6379/0
+
+    # Service settings
+    SERVICE_NAME: str = os.getenv("SERVICE_NAME", "transaction-service")
+    SERVICE_VERSION: str = os.getenv("SERVICE_VERSION", "1.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+
+    # Environment settings
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development") # e.g., development, staging, production
+
+    # Logging settings
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO") # e.g., DEBUG, INFO, WARNING, ERROR, CRITICAL
+
+settings = Settings()
@@ -0,0 +1,439 @@
+# transaction-service/src/features.py
+"""
+Per-user velocity features for fraud scoring: transaction count, amount
+sum and distinct merchants over the last minute, hour and day, kept up to
+date incrementally as transactions are recorded, so scoring never queries
+transaction history.
+
+Each window is split into fixed buckets (1 s for the minute, 1 min for the
+hour, 15 min for the day). A user's window is a ring of the buckets that
+saw transactions, oldest first, plus running totals: recording adds to the
+newest bucket, and reading first drops the buckets that slid out of the
+window. Every bucket is added and dropped once, so both are O(1)
+amortized, and a window never holds more than its bucket count. Windows
+are bucket-aligned: "last hour" covers the current minute and the 59
+before it.
+
+Distinct merchants are counted per window with a reference count per
+merchant (how many of the window's buckets saw it), capped at
+`max_merchants` per window; past the cap, new merchants are not counted.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+from metrics import VELOCITY_EVICTIONS, VELOCITY_REDIS_ERRORS, VELOCITY_USERS
+
+logger = logging.getLogger(__name__)
+
+# (name, seconds, buckets)
+WINDOWS: Sequence[Tuple[str, int, int]] = (
+    ("1m", 60, 60),
+    ("1h", 3600, 60),
+    ("24h", 86400, 96),
+)
+
+SNAPSHOT_FORMAT = 1
+
+# Record a transaction and read a user's windows in one round trip.
+# KEYS[1]: hash of buckets, fields "<window>:c:<index>" and "<window>:a:<index>"
+# KEYS[2..]: per window, a sorted set of merchant -> last seen
+# ARGV: now, amount, merchant ("" for none), record (1/0), max merchants,
+#       then seconds and bucket count per window.
+# Returns count, amount sum and distinct merchants per window, as strings
+# since Lua numbers are truncated to integers on the way out. Needs Redis 6.2+
+# (ZADD GT)
+VELOCITY_SCRIPT = """
+local now = tonumber(ARGV[1])
+local amount = ARGV[2]
+local merchant = ARGV[3]
+local record = ARGV[4] == '1'
+local max_merchants = tonumber(ARGV[5])
+local windows = {}
+local ttl = 0
+for i = 0, (#ARGV - 5) / 2 - 1 do
+  local seconds = tonumber(ARGV[6 + 2 * i])
+  local width = seconds / tonumber(ARGV[7 + 2 * i])
+  local index = math.floor(now / width)
+  windows[i + 1] = {seconds = seconds, index = index, oldest = index - tonumber(ARGV[7 + 2 * i]) + 1, count = 0, amount = 0}
+  if seconds > ttl then ttl = seconds end
+  if record then
+    redis.call('HINCRBY', KEYS[1], (i + 1) .. ':c:' .. index, 1)
+    redis.call('HINCRBYFLOAT', KEYS[1], (i + 1) .. ':a:' .. index, amount)
+  end
+end
+local fields = redis.call('HGETALL', KEYS[1])
+local expired = {}
+for j = 1, #fields, 2 do
+  local w, kind, index = string.match(fields[j], '^(%d+):(%a):(%-?%d+)$')
+  local window = windows[tonumber(w)]
+  if window == nil or tonumber(index) < window.oldest then
+    expired[#expired + 1] = fields[j]
+  elseif kind == 'c' then
+    window.count = window.count + tonumber(fields[j + 1])
+  else
+    window.amount = window.amount + tonumber(fields[j + 1])
+  end
+end
+if #expired > 0 then redis.call('HDEL', KEYS[1], unpack(expired)) end
+if record then redis.call('EXPIRE', KEYS[1], ttl) end
+local result = {}
+for i, window in ipairs(windows) do
+  local key = KEYS[i + 1]
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', '(' .. (now - window.seconds))
+  if record and merchant ~= '' then
+    -- Past the cap new merchants are not counted, as in SlidingWindow.add; GT so
+    -- a late transaction doesn't move a merchant's last seen back
+    if redis.call('ZSCORE', key, merchant) or redis.call('ZCARD', key) < max_merchants then
+      redis.call('ZADD', key, 'GT', now, merchant)
+    end
+    redis.call('EXPIRE', key, window.seconds)
+  end
+  result[#result + 1] = tostring(window.count)
+  result[#result + 1] = tostring(window.amount)
+  result[#result + 1] = tostring(redis.call('ZCARD', key))
+end
+return result
+"""
+
+
+def merchant_digest(merchant: str) -> int:
+    # 8 bytes per merchant instead of the id string
+    return int.from_bytes(hashlib.blake2b(merchant.encode(), digest_size=8).digest(), "big")
+
+
+class SlidingWindow:
+    """
+    One user's aggregates over one window, in buckets of `seconds / buckets`
+    """
+
+    __slots__ = ("width", "size", "buckets", "count", "amount", "merchants")
+
+    def __init__(self, seconds: float, buckets: int):
+        self.width = seconds / buckets
+        self.size = buckets
+        # [bucket index, count, amount, merchant digests], oldest first. A
+        # list rather than a deque: it holds at most `size` buckets, and an
+        # empty deque alone costs 600 bytes
+        self.buckets: List[list] = []
+        self.count = 0
+        self.amount = 0.0
+        # merchant digest -> number of buckets it appears in
+        self.merchants: Dict[int, int] = {}
+
+    def expire(self, now: float) -> None:
+        oldest = int(now // self.width) - self.size + 1
+        buckets = self.buckets
+        expired = 0
+        while expired < len(buckets) and buckets[expired][0] < oldest:
+            _, count, amount, merchants = buckets[expired]
+            self.count -= count
+            self.amount -= amount
+            for merchant in merchants:
+                refs = self.merchants[merchant] - 1
+                if refs:
+                    self.merchants[merchant] = refs
+                else:
+                    del self.merchants[merchant]
+            expired += 1
+        if expired:
+            del buckets[:expired]
+        if not buckets:
+            # No float drift left behind by the subtractions
+            self.amount = 0.0
+
+    def add(self, ts: float, amount: float, merchant: Optional[int], max_merchants: int) -> None:
+        index = int(ts // self.width)
+        buckets = self.buckets
+        if buckets and buckets[-1][0] == index:
+            bucket = buckets[-1]
+        elif not buckets or buckets[-1][0] < index:
+            bucket = [index, 0, 0.0, set()]
+            buckets.append(bucket)
+        else:
+            # Late transaction: find or insert its bucket, unless it is already out of the window
+            if index <= buckets[-1][0] - self.size:
+                return
+            position = len(buckets)
+            while position and buckets[position - 1][0] > index:
+                position -= 1
+            if position and buckets[position - 1][0] == index:
+                bucket = buckets[position - 1]
+            else:
+                bucket = [index, 0, 0.0, set()]
+                buckets.insert(position, bucket)
+        bucket[1] += 1
+        bucket[2] += amount
+        self.count += 1
+        self.amount += amount
+        if merchant is not None and merchant not in bucket[3]:
+            refs = self.merchants.get(merchant, 0)
+            if refs or len(self.merchants) < max_merchants:
+                bucket[3].add(merchant)
+                self.merchants[merchant] = refs + 1
+
+    def dump(self) -> List[list]:
+        return [[index, count, amount, sorted(merchants)] for index, count, amount, merchants in self.buckets]
+
+    def load(self, buckets: List[list]) -> None:
+        for index, count, amount, merchants in buckets:
+            self.buckets.append([index, count, amount, set(merchants)])
+            self.count += count
+            self.amount += amount
+            for merchant in merchants:
+                self.merchants[merchant] = self.merchants.get(merchant, 0) + 1
+
+
+class VelocityStore:
+    """
+    Velocity windows per user.
+
+    Windows live in process: at most `max_users` users, dropped least
+    recently active first, and users with no transaction in the longest
+    window are dropped as the store goes. With a Redis client they live in
+    Redis instead, shared by every replica and expired by Redis; Redis
+    failures are logged and fall back to the in-process windows.
+
+    Timestamps are epoch seconds, so in-process windows survive a restart
+    through snapshot() and restore().
+    """
+
+    def __init__(
+        self,
+        windows: Sequence[Tuple[str, int, int]] = WINDOWS,
+        max_users: int = 500000,
+        max_merchants: int = 256,
+        redis: Any = None,
+        prefix: str = "transaction-service:velocity:"
+    ):
+        self.windows = [tuple(window) for window in windows]
+        self.ttl = max(seconds for _, seconds, _ in self.windows)
+        self.max_users = max_users
+        self.max_merchants = max_merchants
+        self.redis = redis
+        self.prefix = prefix
+        self.feature_names = [
+            f"{feature}_{name}" for name, _, _ in self.windows
+            for feature in ("tx_count", "amount_sum", "distinct_merchants")
+        ]
+        # user id -> (last transaction ts, windows); dict order is last transaction order
+        self._users: Dict[str, Tuple[float, List[SlidingWindow]]] = {}
+        self._script = redis.register_script(VELOCITY_SCRIPT) if redis is not None else None
+        self.redis_errors = 0
+        self.clock = time.time
+
+    @classmethod
+    def from_settings(cls) -> "VelocityStore":
+        redis = None
+        if settings.VELOCITY_BACKEND == "redis":
+            if not settings.REDIS_URL:
+                raise ValueError("VELOCITY_BACKEND=redis needs REDIS_URL")
+            from redis import asyncio as aioredis
+            redis = aioredis.from_url(settings.REDIS_URL)
+        return cls(max_users=settings.VELOCITY_MAX_USERS, max_merchants=settings.VELOCITY_MAX_MERCHANTS, redis=redis)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _evict(self, now: float) -> None:
+        users = self._users
+        cutoff = now - self.ttl
+        while users:
+            user_id = next(iter(users))
+            if users[user_id][0] >= cutoff:
+                break
+            del users[user_id]
+            VELOCITY_EVICTIONS.labels("ttl").inc()
+        while len(users) > self.max_users:
+            del users[next(iter(users))]
+            VELOCITY_EVICTIONS.labels("capacity").inc()
+
+    def _features(self, windows: Optional[List[SlidingWindow]], now: float) -> Dict[str, float]:
+        features = {}
+        for (name, _, _), window in zip(self.windows, windows or [None] * len(self.windows)):
+            if window is not None:
+                window.expire(now)
+            features[f"tx_count_{name}"] = window.count if window else 0
+            features[f"amount_sum_{name}"] = round(window.amount, 6) if window else 0.0
+            features[f"distinct_merchants_{name}"] = len(window.merchants) if window else 0
+        return features
+
+    def record_local(
+        self, user_id: str, amount: float, merchant: Optional[str] = None, ts: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        Add a transaction to the user's windows; returns the features
+        including it. `ts` defaults to now.
+        """
+        now = self.clock()
+        ts = now if ts is None else ts
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            windows = [SlidingWindow(seconds, buckets) for _, seconds, buckets in self.windows]
+            last = ts
+        else:
+            last, windows = entry
+            last = max(last, ts)
+        digest = merchant_digest(merchant) if merchant else None
+        for window in windows:
+            window.add(ts, amount, digest, self.max_merchants)
+        self._users[user_id] = (last, windows)
+        self._evict(now)
+        VELOCITY_USERS.set(len(self._users))
+        return self._features(windows, max(now, last))
+
+    def read_local(self, user_id: str, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        The user's features as of `now` (default: now), zero for unknown users
+        """
+        entry = self._users.get(user_id)
+        return self._features(entry[1] if entry else None, self.clock() if now is None else now)
+
+    async def _redis_call(self, user_id: str, record: bool, amount: float, merchant: Optional[str], now: float):
+        base = f"{self.prefix}{{{user_id}}}"
+        args = [repr(now), repr(float(amount)), merchant or "", int(record), self.max_merchants]
+        for _, seconds, buckets in self.windows:
+            args += [seconds, buckets]
+        values = await self._script(
+            keys=[f"{base}:b"] + [f"{base}:m:{name}" for name, _, _ in self.windows], args=args
+        )
+        features = {}
+        for i, (name, _, _) in enumerate(self.windows):
+            features[f"tx_count_{name}"] = int(float(values[3 * i]))
+            features[f"amount_sum_{name}"] = round(float(values[3 * i + 1]), 6)
+            features[f"distinct_merchants_{name}"] = int(float(values[3 * i + 2]))
+        return features
+
+    async def record(
+        self, user_id: str, amount: float, merchant: Optional[str] = None, ts: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        record_local(), against the shared windows in Redis when configured
+        """
+        if self._script is not None:
+            try:
+                return await self._redis_call(user_id, True, amount, merchant, self.clock() if ts is None else ts)
+            except Exception:
+                self.redis_errors += 1
+                VELOCITY_REDIS_ERRORS.inc()
+                logger.warning("Velocity features: Redis failed, using in-process windows", exc_info=True)
+        return self.record_local(user_id, amount, merchant, ts)
+
+    async def read(self, user_id: str) -> Dict[str, float]:
+        """
+        read_local(), against the shared windows in Redis when configured
+        """
+        if self._script is not None:
+            try:
+                return await self._redis_call(user_id, False, 0.0, None, self.clock())
+            except Exception:
+                self.redis_errors += 1
+                VELOCITY_REDIS_ERRORS.inc()
+                logger.warning("Velocity features: Redis failed, using in-process windows", exc_info=True)
+        return self.read_local(user_id)
+
+    def _payload(self, users: List[list]) -> Dict[str, Any]:
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "saved_at": self.clock(),
+            "windows": self.windows,
+            "max_merchants": self.max_merchants,
+            "users": users,
+        }
+
+    @staticmethod
+    def _write(path: str, payload: Dict[str, Any]) -> None:
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.write(json.dumps(payload, separators=(",", ":")))
+        os.replace(tmp, path)
+
+    def snapshot(self, path: str) -> int:
+        """
+        Write the in-process windows to `path` (atomically); returns the number of users written
+        """
+        users = [[user_id, last, [window.dump() for window in windows]]
+                 for user_id, (last, windows) in self._users.items()]
+        self._write(path, self._payload(users))
+        return len(users)
+
+    async def snapshot_async(self, path: str, chunk: int = 2000) -> int:
+        """
+        snapshot() without blocking the event loop: users are copied `chunk`
+        at a time, yielding in between, and the file is encoded and written
+        in a thread. Users recorded meanwhile are captured as of their copy.
+        """
+        users = []
+        for i, user_id in enumerate(list(self._users)):
+            entry = self._users.get(user_id)
+            if entry is not None:
+                users.append([user_id, entry[0], [window.dump() for window in entry[1]]])
+            if i % chunk == chunk - 1:
+                await asyncio.sleep(0)
+        await asyncio.to_thread(self._write, path, self._payload(users))
+        return len(users)
+
+    def restore(self, path: str) -> int:
+        """
+        Load windows written by snapshot(), skipping users idle for longer
+        than the longest window; returns the number of users restored.
+        A snapshot taken with different windows is ignored.
+        """
+        with open(path) as f:
+            payload = json.load(f)
+        if payload.get("format") != SNAPSHOT_FORMAT or [tuple(w) for w in payload["windows"]] != self.windows:
+            logger.warning("Velocity snapshot %s was taken with other windows; ignoring it", path)
+            return 0
+        cutoff = self.clock() - self.ttl
+        restored = 0
+        self._users.clear()
+        for user_id, last, dumped in payload["users"]:
+            if last < cutoff:
+                continue
+            windows = [SlidingWindow(seconds, buckets) for _, seconds, buckets in self.windows]
+            for window, buckets in zip(windows, dumped):
+                window.load(buckets)
+            self._users[user_id] = (last, windows)
+            restored += 1
+        self._evict(self.clock())
+        VELOCITY_USERS.set(len(self._users))
+        return restored
+
+    async def run_snapshots(self, path: str, interval: float) -> None:
+        """
+        Snapshot every `interval` seconds until cancelled, and once more on the way out
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    start = time.perf_counter()
+                    users = await self.snapshot_async(path)
+                    logger.info("Velocity snapshot: %d users in %.3fs", users, time.perf_counter() - start)
+                except Exception:
+                    logger.exception("Velocity snapshot to %s failed", path)
+        finally:
+            # Cancelled at shutdown: nothing else runs any more, so block for the last one
+            try:
+                self.snapshot(path)
+            except Exception:
+                logger.exception("Velocity snapshot to %s failed", path)
+
+    def clear(self) -> None:
+        self._users.clear()
+        VELOCITY_USERS.set(0)
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"users": len(self._users), "max_users": self.max_users}
+        if self.redis is not None:
+            stats["redis_errors"] = self.redis_errors
+        return stats
@@ -0,0 +1,236 @@
+# transaction-service/src/fraud_client.py
+"""
+Fraud scoring client for fraud-ml-service over gRPC.
+
+Every score gets a decision within its latency budget. The model's
+decision is used when it arrives in time; past the budget, or when
+fraud-ml-service can't be reached or refuses the transaction, the rules
+in rules.py decide instead, and the decision records why.
+
+All scores share one HTTP/2 channel. With `use_stream` they are sent as
+messages on a few long-lived ScoreTransactions streams, each carrying any
+number of in-flight scores matched up by request_id. That costs no
+per-call setup, and fraud-ml-service scores a stream's messages
+concurrently, so they share its micro-batches. Without it every score is
+its own ScoreTransaction call with a gRPC deadline.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import grpc
+
+import transaction_pb2
+import transaction_pb2_grpc
+from config import settings
+from metrics import FRAUD_FALLBACKS, FRAUD_SCORE_DURATION
+from rules import rule_score
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_OPTIONS = [
+    # With a dns:/// target naming every pod (headless service), streams spread over them
+    ("grpc.lb_policy_name", "round_robin"),
+    # Keep idle streams alive through load balancers and notice dead peers
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+
+@dataclass(frozen=True)
+class FraudDecision:
+    transaction_id: str
+    score: float
+    is_fraud: bool
+    source: str  # "model", or "rules" after a fallback
+    model_version: Optional[str] = None
+    fallback_reason: Optional[str] = None  # deadline, unavailable or error
+    rules: List[str] = field(default_factory=list)  # Rules that fired, for rule decisions
+
+
+class ScoreStreamClosed(Exception):
+    """
+    The stream a score was sent on ended before its response arrived
+    """
+
+
+class ScoreRejected(Exception):
+    """
+    fraud-ml-service answered a stream message with an error
+    """
+
+    def __init__(self, code: grpc.StatusCode, message: str):
+        super().__init__(f"{code.name}: {message}")
+        self.code = code
+
+
+STATUS_CODES = {code.value[0]: code for code in grpc.StatusCode}
+
+
+class ScoreStream:
+    """
+    One ScoreTransactions stream and the scores in flight on it
+    """
+
+    def __init__(self, stub: transaction_pb2_grpc.FraudScoringStub):
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+        self.waiting: Dict[int, asyncio.Future] = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+        self.call = stub.ScoreTransactions(self._requests())
+        self.reader = asyncio.create_task(self._read())
+
+    async def _requests(self):
+        while (request := await self.outgoing.get()) is not None:
+            yield request
+
+    async def _read(self):
+        error: Exception = ScoreStreamClosed("Stream ended")
+        try:
+            async for response in self.call:
+                future = self.waiting.pop(response.request_id, None)
+                # None if the caller gave up waiting
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except grpc.aio.AioRpcError as exc:
+            error = exc
+        finally:
+            self.closed = True
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.waiting.clear()
+
+    @property
+    def alive(self) -> bool:
+        # The call can be over before the reader has seen the end of it
+        return not self.closed and not self.call.done()
+
+    async def score(self, transaction_id: str, features: Dict[str, float], timeout: float):
+        if not self.alive:
+            # Nothing would answer; fail now so the caller falls back at once, not at its deadline
+            raise ScoreStreamClosed("Stream ended")
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.outgoing.put_nowait(transaction_pb2.ScoreRequest(
+            transaction_id=transaction_id, features=features, request_id=request_id, budget_ms=timeout * 1000.0
+        ))
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self.waiting.pop(request_id, None)
+        if response.HasField("error"):
+            raise ScoreRejected(STATUS_CODES.get(response.error.code, grpc.StatusCode.UNKNOWN), response.error.message)
+        return response
+
+    async def close(self) -> None:
+        # Half-close, so the server answers what is in flight and ends the stream
+        self.outgoing.put_nowait(None)
+        try:
+            await asyncio.wait_for(asyncio.shield(self.reader), 1.0)
+        except asyncio.TimeoutError:
+            self.call.cancel()
+            await asyncio.gather(self.reader, return_exceptions=True)
+
+
+class FraudScoringClient:
+    """
+    Fraud decisions from fraud-ml-service, with a rule-based fallback.
+
+    Use as `async with FraudScoringClient() as client:`, or call close().
+    """
+
+    def __init__(
+        self,
+        target: Optional[str] = None,
+        budget_ms: Optional[float] = None,
+        use_stream: Optional[bool] = None,
+        streams: Optional[int] = None,
+        rules_threshold: Optional[float] = None,
+        channel: Optional[grpc.aio.Channel] = None,
+    ):
+        self.target = target or settings.FRAUD_GRPC_TARGET
+        self.budget_ms = settings.FRAUD_SCORE_BUDGET_MS if budget_ms is None else budget_ms
+        self.use_stream = settings.FRAUD_USE_STREAM if use_stream is None else use_stream
+        self.rules_threshold = settings.FRAUD_RULES_THRESHOLD if rules_threshold is None else rules_threshold
+        self.channel = channel or grpc.aio.insecure_channel(self.target, options=CHANNEL_OPTIONS)
+        self.stub = transaction_pb2_grpc.FraudScoringStub(self.channel)
+        # Streams are opened on first use and reopened after they fail
+        self.streams: List[Optional[ScoreStream]] = [None] * max(1, streams or settings.FRAUD_STREAMS)
+        self.next_stream = itertools.cycle(range(len(self.streams)))
+
+    async def __aenter__(self) -> "FraudScoringClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _stream(self) -> ScoreStream:
+        index = next(self.next_stream)
+        stream = self.streams[index]
+        if stream is None or not stream.alive:
+            stream = self.streams[index] = ScoreStream(self.stub)
+        return stream
+
+    async def _model_score(self, transaction_id: str, features: Dict[str, float], timeout: float):
+        if self.use_stream:
+            return await self._stream().score(transaction_id, features, timeout)
+        return await self.stub.ScoreTransaction(
+            transaction_pb2.ScoreRequest(transaction_id=transaction_id, features=features), timeout=timeout
+        )
+
+    async def score(
+        self, transaction_id: str, features: Dict[str, float], budget_ms: Optional[float] = None
+    ) -> FraudDecision:
+        """
+        Fraud decision for one transaction within `budget_ms` (FRAUD_SCORE_BUDGET_MS by default)
+        """
+        start = time.perf_counter()
+        timeout = (self.budget_ms if budget_ms is None else budget_ms) / 1000.0
+        try:
+            response = await self._model_score(transaction_id, features, timeout)
+        except asyncio.TimeoutError:
+            reason = "deadline"
+        except ScoreRejected as exc:
+            logger.warning("fraud-ml-service rejected %s: %s", transaction_id, exc)
+            reason = "error"
+        except (grpc.aio.AioRpcError, ScoreStreamClosed) as exc:
+            code = exc.code() if isinstance(exc, grpc.aio.AioRpcError) else None
+            if code == grpc.StatusCode.DEADLINE_EXCEEDED:
+                reason = "deadline"
+            elif code in (grpc.StatusCode.INVALID_ARGUMENT, grpc.StatusCode.INTERNAL):
+                reason = "error"
+            else:
+                reason = "unavailable"
+            logger.debug("Fraud scoring of %s failed: %s", transaction_id, exc)
+        else:
+            FRAUD_SCORE_DURATION.labels("model").observe(time.perf_counter() - start)
+            return FraudDecision(
+                transaction_id=transaction_id,
+                score=response.score,
+                is_fraud=response.is_fraud,
+                source="model",
+                model_version=response.model_version,
+            )
+
+        score, fired = rule_score(features)
+        FRAUD_FALLBACKS.labels(reason).inc()
+        FRAUD_SCORE_DURATION.labels("rules").observe(time.perf_counter() - start)
+        return FraudDecision(
+            transaction_id=transaction_id,
+            score=score,
+            is_fraud=score >= self.rules_threshold,
+            source="rules",
+            fallback_reason=reason,
+            rules=fired,
+        )
+
+    async def close(self) -> None:
+        await asyncio.gather(*[stream.close() for stream in self.streams if stream is not None])
+        await self.channel.close()
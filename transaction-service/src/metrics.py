@@ -0,0 +1,34 @@
+# transaction-service/src/metrics.py
+"""
+Prometheus metrics for the transaction service.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+# Fraud scores have a budget of tens of milliseconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+FRAUD_SCORE_DURATION = Histogram(
+    "fraud_score_duration_seconds",
+    "Time to a fraud decision, by who made it (model, or rules after a fallback)",
+    ["source"],
+    buckets=LATENCY_BUCKETS,
+)
+FRAUD_FALLBACKS = Counter(
+    "fraud_score_fallbacks_total",
+    "Fraud decisions made by the rules because the model missed its budget (deadline), "
+    "could not be reached (unavailable) or refused the transaction (error)",
+    ["reason"],
+)
+VELOCITY_USERS = Gauge(
+    "velocity_users",
+    "Users with in-process velocity windows",
+)
+VELOCITY_EVICTIONS = Counter(
+    "velocity_evictions_total",
+    "Users dropped from the in-process velocity windows: idle past the longest window (ttl) or over VELOCITY_MAX_USERS (capacity)",
+    ["reason"],
+)
+VELOCITY_REDIS_ERRORS = Counter(
+    "velocity_redis_errors_total",
+    "Velocity window updates and reads that fell back to the in-process windows because Redis failed",
+)
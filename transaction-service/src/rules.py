@@ -0,0 +1,35 @@
+# transaction-service/src/rules.py
+"""
+Rule-based fraud decisions, used when the model can't answer within its
+budget. Each rule that fires adds its weight as an independent risk:
+score = 1 - prod(1 - weight), so a single strong signal or several weak
+ones reach the threshold. Features are those sent to fraud-ml-service;
+missing ones don't fire.
+"""
+from typing import Callable, Dict, List, Tuple
+
+Features = Dict[str, float]
+
+# (name, weight, predicate)
+RULES: List[Tuple[str, float, Callable[[Features], bool]]] = [
+    ("large_amount", 0.5, lambda f: f.get("amount", 0.0) >= 5000),
+    ("new_account_large_amount", 0.4, lambda f: f.get("account_age_days", 1e9) < 7 and f.get("amount", 0.0) >= 500),
+    ("foreign_risky_merchant", 0.4, lambda f: f.get("is_foreign", 0.0) >= 1 and f.get("merchant_risk", 0.0) >= 0.7),
+    ("burst_1h", 0.3, lambda f: f.get("tx_count_1h", 0.0) >= 10),
+    ("spend_24h", 0.3, lambda f: f.get("amount_sum_24h", 0.0) >= 10000),
+    ("many_merchants_24h", 0.2, lambda f: f.get("distinct_merchants_24h", 0.0) >= 8),
+    ("night_time", 0.1, lambda f: 0 <= f.get("hour_of_day", 12) < 5),
+]
+
+
+def rule_score(features: Features) -> Tuple[float, List[str]]:
+    """
+    Fraud score in [0, 1] and the names of the rules that fired
+    """
+    clean = 1.0
+    fired = []
+    for name, weight, predicate in RULES:
+        if predicate(features):
+            clean *= 1.0 - weight
+            fired.append(name)
+    return 1.0 - clean, fired
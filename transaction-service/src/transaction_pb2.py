@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: transaction.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11transaction.proto\x12\x0etransaction.v1\"\xbc\x01\n\x0cScoreRequest\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12<\n\x08\x66\x65\x61tures\x18\x02 \x03(\x0b\x32*.transaction.v1.ScoreRequest.FeaturesEntry\x12\x12\n\nrequest_id\x18\x03 \x01(\x04\x12\x11\n\tbudget_ms\x18\x04 \x01(\x01\x1a/\n\rFeaturesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\"\x9e\x01\n\rScoreResponse\x12\x16\n\x0etransaction_id\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\x04\x12\r\n\x05score\x18\x03 \x01(\x01\x12\x10\n\x08is_fraud\x18\x04 \x01(\x08\x12\x15\n\rmodel_version\x18\x05 \x01(\t\x12)\n\x05\x65rror\x18\x06 \x01(\x0b\x32\x1a.transaction.v1.ScoreError\"+\n\nScoreError\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0f\n\x07message\x18\x02 \x01(\t2\xb5\x01\n\x0c\x46raudScoring\x12O\n\x10ScoreTransaction\x12\x1c.transaction.v1.ScoreRequest\x1a\x1d.transaction.v1.ScoreResponse\x12T\n\x11ScoreTransactions\x12\x1c.transaction.v1.ScoreRequest\x1a\x1d.transaction.v1.ScoreResponse(\x01\x30\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'transaction_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  DESCRIPTOR._options = None
+  _SCOREREQUEST_FEATURESENTRY._options = None
+  _SCOREREQUEST_FEATURESENTRY._serialized_options = b'8\001'
+  _globals['_SCOREREQUEST']._serialized_start=38
+  _globals['_SCOREREQUEST']._serialized_end=226
+  _globals['_SCOREREQUEST_FEATURESENTRY']._serialized_start=179
+  _globals['_SCOREREQUEST_FEATURESENTRY']._serialized_end=226
+  _globals['_SCORERESPONSE']._serialized_start=229
+  _globals['_SCORERESPONSE']._serialized_end=387
+  _globals['_SCOREERROR']._serialized_start=389
+  _globals['_SCOREERROR']._serialized_end=432
+  _globals['_FRAUDSCORING']._serialized_start=435
+  _globals['_FRAUDSCORING']._serialized_end=616
+# @@protoc_insertion_point(module_scope)
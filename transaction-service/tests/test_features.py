@@ -0,0 +1,281 @@
+# transaction-service/tests/test_features.py
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from features import VELOCITY_SCRIPT, WINDOWS, SlidingWindow, VelocityStore
+
+T0 = 1_700_000_000.0  # A whole day, hour and minute
+
+
+def store_at(now: float, **kwargs) -> VelocityStore:
+    store = VelocityStore(**kwargs)
+    store.clock = lambda: now
+    return store
+
+
+class StubScript:
+    """Records every call; returns `values`, or raises `error`"""
+
+    def __init__(self, values=None, error=None):
+        self.values = values
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, keys, args):
+        self.calls.append((keys, args))
+        if self.error is not None:
+            raise self.error
+        return self.values
+
+
+class StubRedis:
+    def __init__(self, script):
+        self.script = script
+        self.registered = []
+
+    def register_script(self, source):
+        self.registered.append(source)
+        return self.script
+
+
+class TestVelocityStore:
+
+    def test_windows_aggregate_recent_transactions(self):
+        """Test counts, amount sums and distinct merchants per window"""
+        store = store_at(T0 + 7200)
+        store.record_local("u1", 10.0, "m1", ts=T0)           # 2 h ago: 24 h only
+        store.record_local("u1", 20.0, "m2", ts=T0 + 5400)    # 30 min ago: 1 h and 24 h
+        store.record_local("u1", 30.0, "m2", ts=T0 + 7170)    # 30 s ago: every window
+        features = store.record_local("u1", 40.0, "m3", ts=T0 + 7200)
+
+        assert features == {
+            "tx_count_1m": 2, "amount_sum_1m": 70.0, "distinct_merchants_1m": 2,
+            "tx_count_1h": 3, "amount_sum_1h": 90.0, "distinct_merchants_1h": 2,
+            "tx_count_24h": 4, "amount_sum_24h": 100.0, "distinct_merchants_24h": 3,
+        }
+        assert store.read_local("u1") == features
+        assert store.read_local("u2")["tx_count_24h"] == 0
+        assert list(features) == store.feature_names
+
+    def test_windows_slide(self):
+        """Test that transactions leave each window as time passes, merchants included"""
+        store = store_at(T0)
+        store.record_local("u1", 50.0, "m1", ts=T0)
+        store.record_local("u1", 25.0, "m2", ts=T0 + 30)
+
+        after_minute = store.read_local("u1", now=T0 + 61)
+        assert (after_minute["tx_count_1m"], after_minute["distinct_merchants_1m"]) == (1, 1)
+        assert after_minute["amount_sum_1m"] == 25.0
+        assert store.read_local("u1", now=T0 + 91)["tx_count_1m"] == 0
+        assert store.read_local("u1", now=T0 + 91)["tx_count_1h"] == 2
+        after_day = store.read_local("u1", now=T0 + 86400 + 900)
+        assert after_day == {name: 0 for name in store.feature_names}
+
+    def test_late_transaction_lands_in_its_bucket(self):
+        """Test that out-of-order transactions count in their own bucket and expire with it"""
+        store = store_at(T0 + 120)
+        store.record_local("u1", 1.0, ts=T0 + 120)
+        store.record_local("u1", 2.0, ts=T0 + 100)
+        store.record_local("u1", 4.0, ts=T0 + 100)
+        store.record_local("u1", 8.0, ts=T0)  # Outside the minute window, inside the hour
+        assert store.read_local("u1", now=T0 + 120)["amount_sum_1m"] == 7.0
+        assert store.read_local("u1", now=T0 + 120)["amount_sum_1h"] == 15.0
+        assert store.read_local("u1", now=T0 + 165)["amount_sum_1m"] == 1.0
+
+    def test_memory_is_bounded(self):
+        """Test that a window holds at most its bucket count and a capped number of merchants"""
+        store = store_at(T0 + 86400, max_merchants=5)
+        for i in range(5000):
+            store.record_local("u1", 1.0, f"m{i}", ts=T0 + i * 17.28)
+        windows = store._users["u1"][1]
+        for window, (_, _, buckets) in zip(windows, WINDOWS):
+            assert len(window.buckets) <= buckets
+            assert len(window.merchants) <= 5
+        assert store.read_local("u1")["distinct_merchants_24h"] == 5
+
+    def test_idle_and_excess_users_evicted(self):
+        """Test TTL eviction of users idle past the longest window, and the max_users cap"""
+        now = T0 + 100000
+        store = store_at(now, max_users=3)
+        store.record_local("idle", 1.0, ts=now - 90000)
+        for user in ("a", "b", "c", "d"):
+            store.record_local(user, 1.0, ts=now)
+        assert len(store) == 3
+        assert "idle" not in store._users and "a" not in store._users
+        assert store.read_local("d")["tx_count_1m"] == 1
+
+    def test_snapshot_and_restore(self, tmp_path):
+        """Test that windows survive a restart through a snapshot"""
+        path = str(tmp_path / "velocity.json")
+        store = store_at(T0)
+        store.record_local("u1", 10.0, "m1", ts=T0 - 3000)
+        store.record_local("u1", 5.5, "m2", ts=T0)
+        store.record_local("gone", 1.0, ts=T0 - 86000)
+        assert store.snapshot(path) == 2
+
+        restored = store_at(T0 + 600)
+        assert restored.restore(path) == 1
+        assert restored.read_local("u1") == store.read_local("u1", now=T0 + 600)
+        assert restored.read_local("u1")["tx_count_1h"] == 1
+        # Restored windows keep aggregating
+        assert restored.record_local("u1", 1.0, "m1")["distinct_merchants_24h"] == 2
+
+    def test_snapshot_async_matches_snapshot(self, tmp_path):
+        """Test that the chunked snapshot writes the same windows"""
+        store = store_at(T0)
+        for i in range(50):
+            store.record_local(f"u{i}", float(i), f"m{i % 7}", ts=T0 - i * 60)
+        assert asyncio.run(store.snapshot_async(str(tmp_path / "chunked.json"), chunk=8)) == 50
+
+        restored = store_at(T0)
+        assert restored.restore(str(tmp_path / "chunked.json")) == 50
+        for i in range(50):
+            assert restored.read_local(f"u{i}") == store.read_local(f"u{i}")
+
+    def test_snapshot_with_other_windows_ignored(self, tmp_path):
+        """Test that a snapshot taken with a different window layout is not loaded"""
+        path = str(tmp_path / "velocity.json")
+        store = store_at(T0, windows=[("5m", 300, 30)])
+        store.record_local("u1", 1.0, ts=T0)
+        store.snapshot(path)
+        assert store_at(T0).restore(path) == 0
+
+    @pytest.mark.parametrize("seconds,buckets", [(60, 60), (86400, 96)])
+    def test_window_totals_match_bucket_sums(self, seconds, buckets):
+        """Test that running totals always equal the sum over live buckets"""
+        window = SlidingWindow(seconds, buckets)
+        ts = T0
+        for i in range(2000):
+            ts += (i * 7919) % 97 * seconds / 1000
+            window.add(ts, float(i % 13), i % 31, 1000)
+            window.expire(ts)
+            assert window.count == sum(bucket[1] for bucket in window.buckets)
+            assert window.amount == pytest.approx(sum(bucket[2] for bucket in window.buckets))
+            assert set(window.merchants) == set().union(*[bucket[3] for bucket in window.buckets])
+
+
+class TestRedisVelocity:
+    """
+    The Redis backend against a stub: argument layout and the in-process fallback
+    """
+
+    def test_script_keys_and_arguments(self):
+        """Test the keys and arguments the script is called with, and how its result is parsed"""
+        script = StubScript(values=[b"2", b"70.5", b"1", b"3", b"90", b"2", b"4", b"100.25", b"3"])
+        redis = StubRedis(script)
+        store = store_at(T0, redis=redis)
+
+        features = asyncio.run(store.record("u1", 12.5, "m1", ts=T0 - 5))
+        asyncio.run(store.read("u1"))
+
+        assert redis.registered == [VELOCITY_SCRIPT]
+        base = "transaction-service:velocity:{u1}"
+        keys = [f"{base}:b", f"{base}:m:1m", f"{base}:m:1h", f"{base}:m:24h"]
+        windows = [60, 60, 3600, 60, 86400, 96]
+        assert script.calls == [
+            (keys, [repr(T0 - 5), "12.5", "m1", 1, 256, *windows]),
+            (keys, [repr(T0), "0.0", "", 0, 256, *windows]),
+        ]
+        assert features == {
+            "tx_count_1m": 2, "amount_sum_1m": 70.5, "distinct_merchants_1m": 1,
+            "tx_count_1h": 3, "amount_sum_1h": 90.0, "distinct_merchants_1h": 2,
+            "tx_count_24h": 4, "amount_sum_24h": 100.25, "distinct_merchants_24h": 3,
+        }
+        assert len(store) == 0
+
+    def test_redis_failure_falls_back_to_local_windows(self):
+        """Test that record and read use the in-process windows when Redis fails, and count the errors"""
+        store = store_at(T0, redis=StubRedis(StubScript(error=ConnectionError("Connection refused"))))
+
+        recorded = asyncio.run(store.record("u1", 10.0, "m1"))
+        read = asyncio.run(store.read("u1"))
+
+        assert recorded == read == store.read_local("u1")
+        assert read["tx_count_1m"] == 1 and read["distinct_merchants_1m"] == 1
+        assert store.redis_errors == 2
+        assert store.stats()["redis_errors"] == 2
+
+
+REDIS_URL = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+def with_redis(scenario, **kwargs):
+    """Run `scenario(store)` against a store on the Redis at TEST_REDIS_URL, or skip without one"""
+    aioredis = pytest.importorskip("redis.asyncio")
+
+    async def main():
+        client = aioredis.from_url(REDIS_URL)
+        try:
+            await client.ping()
+        except Exception:
+            await client.aclose()
+            pytest.skip(f"No Redis at {REDIS_URL}")
+        prefix = f"test:velocity:{uuid.uuid4().hex}:"
+        store = VelocityStore(redis=client, prefix=prefix, **kwargs)
+        try:
+            return await scenario(store)
+        finally:
+            keys = [key async for key in client.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await client.delete(*keys)
+            await store.close()
+
+    return asyncio.run(main())
+
+
+class TestRedisVelocityScript:
+    """
+    The Lua script against a real Redis (6.2+); skipped without one
+    """
+
+    def test_script_matches_local_windows(self):
+        """Test that the script aggregates a sequence, late transactions included, like the in-process windows"""
+        local = store_at(T0 + 7200)
+        transactions = [(10.0, "m1", T0), (20.0, "m2", T0 + 5400), (30.0, "m2", T0 + 7170),
+                        (40.0, "m3", T0 + 7200), (5.0, "m4", T0 + 7190)]
+
+        async def scenario(store):
+            store.clock = lambda: T0 + 7200
+            for amount, merchant, ts in transactions:
+                await store.record("u1", amount, merchant, ts=ts)
+            return await store.read("u1"), store.redis_errors
+
+        features, errors = with_redis(scenario)
+        for amount, merchant, ts in transactions:
+            local.record_local("u1", amount, merchant, ts=ts)
+        assert errors == 0
+        assert features == local.read_local("u1")
+
+    def test_late_transaction_keeps_merchant_last_seen(self):
+        """Test that a late transaction doesn't move a merchant's last seen back and expire it early"""
+        async def scenario(store):
+            store.clock = lambda: T0 + 100
+            await store.record("u1", 1.0, "m1", ts=T0 + 100)
+            await store.record("u1", 1.0, "m1", ts=T0 + 30)
+            store.clock = lambda: T0 + 120
+            return await store.read("u1")
+
+        assert with_redis(scenario)["distinct_merchants_1m"] == 1
+
+    def test_merchant_cap_matches_local_windows(self):
+        """Test that past the cap new merchants are not counted, while merchants already counted still are"""
+        local = store_at(T0, max_merchants=2)
+
+        async def scenario(store):
+            store.clock = lambda: T0
+            results = []
+            for i, merchant in enumerate(["m1", "m2", "m3", "m1"]):
+                results.append(await store.record("u1", 1.0, merchant, ts=T0 + i))
+            store.clock = lambda: T0 + 62  # Only the last m1 is left in the minute
+            results.append(await store.read("u1"))
+            return results
+
+        results = with_redis(scenario, max_merchants=2)
+        expected = [local.record_local("u1", 1.0, merchant, ts=T0 + i)
+                    for i, merchant in enumerate(["m1", "m2", "m3", "m1"])]
+        expected.append(local.read_local("u1", now=T0 + 62))
+        assert [r["distinct_merchants_1m"] for r in results] == [1, 2, 2, 2, 1]
+        assert results == expected
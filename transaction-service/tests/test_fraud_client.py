@@ -0,0 +1,196 @@
+# transaction-service/tests/test_fraud_client.py
+import asyncio
+
+import grpc
+import pytest
+
+from fraud_client import FraudScoringClient, ScoreStreamClosed
+from rules import rule_score
+from transaction_pb2 import ScoreError, ScoreResponse
+from transaction_pb2_grpc import FraudScoringServicer, add_FraudScoringServicer_to_server
+
+FEATURES = {
+    "amount": 950.0,
+    "hour_of_day": 3,
+    "merchant_risk": 0.8,
+    "is_foreign": 1,
+    "account_age_days": 12,
+    "tx_count_1h": 6,
+    "amount_sum_24h": 4200.0,
+    "distinct_merchants_24h": 5,
+}
+
+
+class FakeScorer(FraudScoringServicer):
+    """
+    Scores amount / 1000 after `delays[transaction_id]` seconds; transactions
+    without an amount are refused, like fraud-ml-service does for missing features
+    """
+
+    def __init__(self):
+        self.delays = {}
+        self.streams = 0
+
+    async def _score(self, request):
+        await asyncio.sleep(self.delays.get(request.transaction_id, 0.0))
+        score = request.features["amount"] / 1000.0
+        return ScoreResponse(
+            transaction_id=request.transaction_id,
+            request_id=request.request_id,
+            score=score,
+            is_fraud=score >= 0.5,
+            model_version="fake-v1",
+        )
+
+    async def ScoreTransaction(self, request, context):
+        if "amount" not in request.features:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Missing features: amount")
+        return await self._score(request)
+
+    async def ScoreTransactions(self, request_iterator, context):
+        self.streams += 1
+        responses = asyncio.Queue()
+
+        async def score_one(request):
+            if "amount" not in request.features:
+                responses.put_nowait(ScoreResponse(
+                    transaction_id=request.transaction_id,
+                    request_id=request.request_id,
+                    error=ScoreError(code=grpc.StatusCode.INVALID_ARGUMENT.value[0], message="Missing features: amount"),
+                ))
+            else:
+                responses.put_nowait(await self._score(request))
+
+        async def read():
+            tasks = [asyncio.create_task(score_one(request)) async for request in request_iterator]
+            await asyncio.gather(*tasks)
+            responses.put_nowait(None)
+
+        reader = asyncio.create_task(read())
+        while (response := await responses.get()) is not None:
+            yield response
+        await reader
+
+
+class TestFraudScoringClient:
+
+    def run(self, scenario, **client_kwargs):
+        """Start a fake fraud-ml-service and run `scenario(client, scorer)` against it"""
+        async def main():
+            scorer = FakeScorer()
+            server = grpc.aio.server()
+            add_FraudScoringServicer_to_server(scorer, server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            await server.start()
+            try:
+                async with FraudScoringClient(f"127.0.0.1:{port}", **client_kwargs) as client:
+                    return await scenario(client, scorer)
+            finally:
+                await server.stop(None)
+
+        return asyncio.run(main())
+
+    def test_stream_multiplexes_concurrent_scores(self):
+        """Test that concurrent scores share one stream and each gets its own, out-of-order, response"""
+        async def scenario(client, scorer):
+            for i in range(0, 50, 2):
+                scorer.delays[f"tx-{i}"] = 0.02
+            decisions = await asyncio.gather(*[
+                client.score(f"tx-{i}", {**FEATURES, "amount": float(i * 10)}) for i in range(50)
+            ])
+            return decisions, scorer.streams
+
+        decisions, streams = self.run(scenario, use_stream=True, streams=1, budget_ms=1000)
+        assert streams == 1
+        for i, decision in enumerate(decisions):
+            assert decision.transaction_id == f"tx-{i}"
+            assert decision.source == "model"
+            assert decision.model_version == "fake-v1"
+            assert decision.score == pytest.approx(i / 100)
+
+    def test_unary_scores(self):
+        """Test scoring with one ScoreTransaction call per score"""
+        async def scenario(client, scorer):
+            return await client.score("tx-1", FEATURES), scorer.streams
+
+        decision, streams = self.run(scenario, use_stream=False, budget_ms=1000)
+        assert streams == 0
+        assert decision.source == "model"
+        assert decision.score == pytest.approx(0.95)
+        assert decision.is_fraud
+
+    @pytest.mark.parametrize("use_stream", [True, False])
+    def test_slow_model_falls_back_to_rules(self, use_stream):
+        """Test that a score past its budget is decided by the rules, and later scores still reach the model"""
+        async def scenario(client, scorer):
+            scorer.delays["slow"] = 0.5
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            slow = await client.score("slow", FEATURES)
+            elapsed = loop.time() - start
+            return slow, elapsed, await client.score("fast", FEATURES)
+
+        slow, elapsed, fast = self.run(scenario, use_stream=use_stream, budget_ms=50)
+        assert elapsed < 0.4
+        assert slow.source == "rules"
+        assert slow.fallback_reason == "deadline"
+        assert slow.rules == ["foreign_risky_merchant", "night_time"]
+        assert slow.score == pytest.approx(rule_score(FEATURES)[0])
+        assert fast.source == "model"
+
+    @pytest.mark.parametrize("use_stream", [True, False])
+    def test_refused_transaction_falls_back_to_rules(self, use_stream):
+        """Test that a transaction the model refuses is decided by the rules"""
+        async def scenario(client, scorer):
+            features = {name: value for name, value in FEATURES.items() if name != "amount"}
+            return await client.score("tx-1", features), await client.score("tx-2", FEATURES)
+
+        refused, scored = self.run(scenario, use_stream=use_stream, budget_ms=1000)
+        assert refused.source == "rules"
+        assert refused.fallback_reason == "error"
+        assert scored.source == "model"
+
+    def test_ended_stream_fails_fast_and_is_replaced(self):
+        """Test that a score on a stream that has just ended fails at once, and the next score opens a new stream"""
+        async def scenario(client, scorer):
+            await client.score("tx-1", FEATURES)
+            # The stream ends after it was picked for a score, before the score is queued on it
+            stream = client._stream()
+            stream.call.cancel()
+            await asyncio.gather(stream.reader, return_exceptions=True)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            with pytest.raises(ScoreStreamClosed):
+                await stream.score("tx-2", FEATURES, timeout=5.0)
+            elapsed = loop.time() - start
+            return elapsed, await client.score("tx-3", FEATURES), scorer.streams
+
+        elapsed, decision, streams = self.run(scenario, use_stream=True, streams=1, budget_ms=1000)
+        assert elapsed < 0.1
+        assert decision.source == "model"
+        assert streams == 2
+
+    @pytest.mark.parametrize("use_stream", [True, False])
+    def test_unreachable_service_falls_back_to_rules(self, use_stream):
+        """Test that scores are still decided when fraud-ml-service is down"""
+        async def main():
+            async with FraudScoringClient("127.0.0.1:1", use_stream=use_stream, budget_ms=200) as client:
+                return await client.score("tx-1", {**FEATURES, "amount": 8000.0})
+
+        decision = asyncio.run(main())
+        assert decision.source == "rules"
+        assert decision.fallback_reason in ("unavailable", "deadline")
+        assert decision.is_fraud
+
+
+class TestRules:
+
+    def test_rule_score_combines_fired_rules(self):
+        """Test that fired rules combine as independent risks"""
+        score, fired = rule_score({"amount": 6000.0, "account_age_days": 2, "hour_of_day": 14})
+        assert fired == ["large_amount", "new_account_large_amount"]
+        assert score == pytest.approx(1 - 0.5 * 0.6)
+
+    def test_missing_features_do_not_fire(self):
+        """Test that an empty feature set scores zero"""
+        assert rule_score({}) == (0.0, [])
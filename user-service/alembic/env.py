@@ -11,10 +11,12 @@ import sys
 # os.path.dirname(__file__) gives 'user-service/alembic'
 # os.path.dirname(os.path.dirname(__file__)) gives 'user-service'
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Use abspath for robustness
+# The service modules import each other by bare name (as uvicorn runs them), so src/ must be importable too
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
 
 # Import your SQLAlchemy Base from your models and settings from your config
-from src.models import Base
-from src.config import settings # Assuming settings.DATABASE_URL is defined here
+from models import Base # models.User is declared on database.Base
+from config import settings # Assuming settings.DATABASE_URL is defined here
 
 # This is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
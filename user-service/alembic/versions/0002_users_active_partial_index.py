@@ -0,0 +1,46 @@
+"""partial index on active users for keyset pagination
+
+GET /users?active_only=true&pagination=keyset walks active users in id
+order; the partial index keeps that an index range scan without carrying
+inactive rows.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        # Build without locking out writes on a populated table
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_users_active_id", "users", ["id"],
+                postgresql_where=sa.text("is_active"),
+                postgresql_concurrently=True,
+            )
+    else:
+        op.create_index(
+            "ix_users_active_id", "users", ["id"],
+            sqlite_where=sa.text("is_active = 1"),
+        )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index("ix_users_active_id", table_name="users", postgresql_concurrently=True)
+    else:
+        op.drop_index("ix_users_active_id", table_name="users")
@@ -0,0 +1,35 @@
+"""index users.updated_at for incremental exports
+
+GET /users/export?updated_since=... filters on updated_at.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index("ix_users_updated_at", "users", ["updated_at"], postgresql_concurrently=True)
+    else:
+        op.create_index("ix_users_updated_at", "users", ["updated_at"])
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index("ix_users_updated_at", table_name="users", postgresql_concurrently=True)
+    else:
+        op.drop_index("ix_users_updated_at", table_name="users")
@@ -0,0 +1,37 @@
+"""index refresh_sessions.expires_at for pruning
+
+The session pruner deletes rows with expires_at < now.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_refresh_sessions_expires_at", "refresh_sessions", ["expires_at"], postgresql_concurrently=True
+            )
+    else:
+        op.create_index("ix_refresh_sessions_expires_at", "refresh_sessions", ["expires_at"])
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index("ix_refresh_sessions_expires_at", table_name="refresh_sessions", postgresql_concurrently=True)
+    else:
+        op.drop_index("ix_refresh_sessions_expires_at", table_name="refresh_sessions")
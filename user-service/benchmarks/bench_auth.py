@@ -0,0 +1,132 @@
+# user-service/benchmarks/bench_auth.py
+"""
+Per-request authentication overhead, before and after the token fast path.
+
+    python benchmarks/bench_auth.py --iterations 20000 --requests 2000
+
+Reports:
+- microseconds per token check: full jwt.decode vs TokenVerifier cache hit
+- microseconds per GET /auth/verify request with
+  baseline (no token cache, user loaded through AsyncUserCRUD and its cache),
+  token cache, and token cache + embedded claims (no DB hit)
+- microseconds to sign and to fully verify a token per algorithm (HS256, RS256, EdDSA)
+- milliseconds to renew an access token with POST /auth/login (password verify)
+  vs POST /auth/refresh (rotating refresh token, no hashing)
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import database_url, setup_app
+
+import httpx
+
+USER = {
+    "email": "bench@example.com",
+    "password": "benchpassword123",
+    "first_name": "Bench",
+    "last_name": "User",
+}
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 2)
+
+
+async def per_request_us(client: httpx.AsyncClient, headers: dict, requests: int) -> float:
+    await client.get("/auth/verify", headers=headers)  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get("/auth/verify", headers=headers)
+        assert response.status_code == 200, response.text
+    return round((time.perf_counter() - start) / requests * 1e6, 2)
+
+
+async def run(args) -> dict:
+    app = setup_app(database_url())
+
+    from cache import LRUCache
+    from config import settings
+    from hashing import password_hasher
+    from keys import KeyRing
+    from tokens import token_verifier
+    import main as service
+
+    # Renewal is measured with repeated logins; keep the login rate limit out of the way
+    service.login_limiter = None
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/register", json=USER)
+
+        async def login() -> str:
+            response = await client.post("/auth/login", json={"email": USER["email"], "password": USER["password"]})
+            return response.json()["access_token"]
+
+        token = await login()
+        token_verifier.verify(token)
+        results["decode_us"] = per_call_us(lambda: token_verifier.decode(token), args.iterations)
+        results["cached_verify_us"] = per_call_us(lambda: token_verifier.verify(token), args.iterations)
+
+        cache = token_verifier.cache
+        token_verifier.cache = None
+        settings.JWT_EMBED_CLAIMS = False
+        results["request_baseline_us"] = await per_request_us(
+            client, {"Authorization": f"Bearer {await login()}"}, args.requests
+        )
+
+        token_verifier.cache = cache or LRUCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+        results["request_token_cache_us"] = await per_request_us(
+            client, {"Authorization": f"Bearer {await login()}"}, args.requests
+        )
+
+        settings.JWT_EMBED_CLAIMS = True
+        results["request_embedded_claims_us"] = await per_request_us(
+            client, {"Authorization": f"Bearer {await login()}"}, args.requests
+        )
+
+        start = time.perf_counter()
+        for _ in range(args.renewals):
+            await login()
+        results["renew_login_ms"] = round((time.perf_counter() - start) / args.renewals * 1000, 2)
+
+        refresh_token = (await client.post(
+            "/auth/login", json={"email": USER["email"], "password": USER["password"]}
+        )).json()["refresh_token"]
+        start = time.perf_counter()
+        for _ in range(args.renewals):
+            response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+            assert response.status_code == 200, response.text
+            refresh_token = response.json()["refresh_token"]
+        results["renew_refresh_ms"] = round((time.perf_counter() - start) / args.renewals * 1000, 2)
+
+    claims = {"sub": "1", "exp": int(time.time()) + 600}
+    results["algorithms"] = {}
+    for keyring in [KeyRing.from_settings(), KeyRing.ephemeral("RS256"), KeyRing.ephemeral("EdDSA")]:
+        signed = keyring.sign(claims)
+        verifier = type(token_verifier)(keyring, cache_size=0)
+        results["algorithms"][keyring.algorithm] = {
+            "sign_us": per_call_us(lambda: keyring.sign(claims), args.iterations // 10),
+            "decode_us": per_call_us(lambda: verifier.decode(signed), args.iterations // 10),
+        }
+
+    password_hasher.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="token checks per function-level measurement")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint-level measurement")
+    parser.add_argument("--renewals", type=int, default=50, help="token renewals per login/refresh measurement")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# user-service/benchmarks/bench_bulk.py
+"""
+Rows/sec for importing users one /auth/register call at a time vs POST /users/bulk.
+
+    python benchmarks/bench_bulk.py --rows 5000 --batch 1000
+    python benchmarks/bench_bulk.py --rounds 12   # production bcrypt cost
+
+bcrypt dominates both paths at production cost, so by default the benchmark
+lowers it (--rounds 4) to show the difference in the database write path.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import database_url, setup_app
+
+import httpx
+
+
+def make_users(prefix: str, count: int) -> list:
+    return [
+        {"email": f"{prefix}{i}@example.com", "password": "benchpassword123", "first_name": "Bench", "last_name": "User"}
+        for i in range(count)
+    ]
+
+
+async def per_row(client: httpx.AsyncClient, users: list, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def register(user):
+        async with semaphore:
+            response = await client.post("/auth/register", json=user)
+            assert response.status_code == 201, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*[register(user) for user in users])
+    return time.perf_counter() - start
+
+
+async def bulk(client: httpx.AsyncClient, users: list, batch: int, headers: dict) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(users), batch):
+        response = await client.post("/users/bulk", json={"users": users[i:i + batch]}, headers=headers)
+        assert response.status_code == 200, response.text
+    return time.perf_counter() - start
+
+
+async def run(args) -> dict:
+    app = setup_app(database_url())
+
+    from config import settings
+    from hashing import HashPolicy, password_hasher
+
+    password_hasher.policy = HashPolicy(rounds=args.rounds)
+    settings.ADMIN_API_KEY = "bench-admin-key"
+    headers = {"X-Admin-Key": settings.ADMIN_API_KEY}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        per_row_seconds = await per_row(client, make_users("row", args.rows), args.concurrency)
+        bulk_seconds = await bulk(client, make_users("bulk", args.rows), args.batch, headers)
+        # Second pass over the same emails exercises the ON CONFLICT update path
+        upsert_seconds = await bulk(client, make_users("bulk", args.rows), args.batch, headers)
+
+    password_hasher.shutdown()
+    return {
+        "rows": args.rows,
+        "bcrypt_rounds": args.rounds,
+        "hash_workers": password_hasher.max_workers,
+        "per_row_rows_per_sec": round(args.rows / per_row_seconds),
+        "bulk_insert_rows_per_sec": round(args.rows / bulk_seconds),
+        "bulk_update_rows_per_sec": round(args.rows / upsert_seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000, help="records per /users/bulk request")
+    parser.add_argument("--concurrency", type=int, default=8, help="in-flight /auth/register calls")
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt cost for this run")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# user-service/benchmarks/bench_export.py
+"""
+Throughput and peak Python memory of GET /users/export at different table sizes.
+
+    python benchmarks/bench_export.py --rows 10000,100000,1000000
+    python benchmarks/bench_export.py --format csv --gzip
+
+Peak memory is measured with tracemalloc while the whole response is consumed;
+it should stay roughly constant as the row count grows. tracemalloc slows
+Python down noticeably, so treat rows/sec as relative numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from common import database_url, seed_users
+
+
+async def export_once(app, params: dict) -> dict:
+    # Drive the ASGI app directly: httpx's ASGI transport buffers the whole body,
+    # which would hide exactly the memory behaviour being measured
+    received = 0
+    request_sent = False
+    done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Starlette listens for a disconnect while streaming; only report one at the end
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/users/export",
+        "raw_path": b"/users/export",
+        "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"bench"), (b"x-admin-key", b"bench-admin-key")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    done.set()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "bytes": received, "peak_mib": round(peak / 2**20, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=lambda v: [int(r) for r in v.split(",")], default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    url = database_url()
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("ENVIRONMENT", None)
+    os.environ["ADMIN_API_KEY"] = "bench-admin-key"
+    from main import app
+
+    params = {"format": args.format, "gzip": str(args.gzip).lower()}
+    results = []
+    for rows in sorted(args.rows):
+        seed_users(url, rows)
+        result = asyncio.run(export_once(app, params))
+        result["rows"] = rows
+        result["rows_per_sec"] = round(rows / result["seconds"]) if result["seconds"] else None
+        results.append(result)
+    print(json.dumps({"format": args.format, "gzip": args.gzip, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
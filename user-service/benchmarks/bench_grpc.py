@@ -0,0 +1,153 @@
+# user-service/benchmarks/bench_grpc.py
+"""
+REST vs gRPC for user lookups.
+
+    python benchmarks/bench_grpc.py --users 10000 --calls 5000 --concurrency 32
+
+Starts the service with uvicorn in a subprocess (REST and gRPC on the same
+event loop, as deployed) and, for each protocol, reports:
+- sequential: latency of one lookup at a time
+- concurrent: lookups/sec with `--concurrency` calls in flight
+  (REST over a keep-alive HTTP/1.1 connection pool, gRPC over one HTTP/2 channel)
+- batch: time to fetch `--batch` users (REST: one GET per id, concurrently,
+  and one GET /users:batch; gRPC: one BatchGetUsers call)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from common import SRC_DIR, database_url, seed_users, summarize
+
+import grpc
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("service did not start")
+            await asyncio.sleep(0.2)
+
+
+async def measure(call, ids, concurrency: int) -> dict:
+    """
+    Run `call(id)` for every id with `concurrency` calls in flight
+    """
+    latencies = []
+    queue = list(ids)
+
+    async def worker():
+        while queue:
+            user_id = queue.pop()
+            start = time.perf_counter()
+            await call(user_id)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {"calls_per_sec": round(len(ids) / elapsed), **summarize(latencies)}
+
+
+async def run(args) -> dict:
+    import user_pb2
+    import user_pb2_grpc
+
+    url = database_url()
+    seed_users(url, args.users)
+    http_port, grpc_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": url,
+        "GRPC_PORT": str(grpc_port),
+        "USER_CACHE_ENABLED": "false" if args.no_cache else "true",
+        "LOG_LEVEL": "WARNING",
+    }
+    env.pop("ENVIRONMENT", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(http_port), "--log-level", "warning"],
+        cwd=SRC_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{http_port}"
+    ids = [random.randint(1, args.users) for _ in range(args.calls)]
+    batch = ids[:args.batch]
+    results = {}
+    try:
+        await wait_until_up(base_url)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client, \
+                grpc.aio.insecure_channel(f"127.0.0.1:{grpc_port}") as channel:
+            stub = user_pb2_grpc.UserServiceStub(channel)
+
+            async def rest_get(user_id):
+                response = await client.get(f"/users/{user_id}")
+                response.raise_for_status()
+                return response.json()
+
+            async def grpc_get(user_id):
+                return await stub.GetUser(user_pb2.GetUserRequest(id=user_id))
+
+            for name, call in (("rest", rest_get), ("grpc", grpc_get)):
+                await measure(call, ids[:200], args.concurrency)  # warm up connections and cache
+                results[name] = {
+                    "sequential": await measure(call, ids[:args.calls // 5], 1),
+                    "concurrent": await measure(call, ids, args.concurrency),
+                }
+
+            start = time.perf_counter()
+            await asyncio.gather(*[rest_get(user_id) for user_id in batch])
+            results["rest"]["batch_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+            start = time.perf_counter()
+            response = await client.get("/users:batch", params={"ids": ",".join(map(str, batch))})
+            results["rest"]["batch_endpoint_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            assert len(response.json()["results"]) == len(batch)
+
+            start = time.perf_counter()
+            response = await stub.BatchGetUsers(user_pb2.BatchGetUsersRequest(ids=batch))
+            results["grpc"]["batch_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            assert len(response.results) == len(batch)
+
+            sample = await rest_get(ids[0])
+            results["payload_bytes"] = {
+                "rest": len(json.dumps(sample)),
+                "grpc": (await grpc_get(ids[0])).ByteSize(),
+            }
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000, help="users seeded before measuring")
+    parser.add_argument("--calls", type=int, default=5000, help="lookups per concurrent measurement")
+    parser.add_argument("--concurrency", type=int, default=32, help="calls in flight")
+    parser.add_argument("--batch", type=int, default=100, help="ids per batch measurement")
+    parser.add_argument("--no-cache", action="store_true", help="disable the user cache so every lookup hits the database")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# user-service/benchmarks/bench_hashing.py
+"""
+Password hashing cost vs login capacity.
+
+    python benchmarks/bench_hashing.py --bcrypt-rounds 10,11,12,13 --argon2-time-cost 2,3,4
+
+For each setting, reports the median hash and verify time and the logins/sec
+one core sustains (one verify per login). Run it where the service runs (same
+CPU type and limit) for capacity planning: a pod serves about
+logins_per_sec_per_core x HASH_WORKERS logins/sec, fewer if its CPU limit
+is below HASH_WORKERS cores. `--target-ms` also prints what HASH_TARGET_MS
+calibration would pick on this machine.
+"""
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import common  # noqa: F401  (puts src/ on sys.path)
+
+from hashing import HashPolicy, calibrate, get_pwd_context, hash_time_ms, rounds_bounds
+
+PASSWORD = "benchpassword123"
+
+
+def verify_ms(policy: HashPolicy, samples: int) -> float:
+    pwd_context = get_pwd_context(policy)
+    hashed = pwd_context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        pwd_context.verify(PASSWORD, hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def verify_many(policy: HashPolicy, hashed: str, count: int) -> None:
+    pwd_context = get_pwd_context(policy)
+    for _ in range(count):
+        pwd_context.verify(PASSWORD, hashed)
+
+
+def parallel_logins_per_sec(policy: HashPolicy, workers: int, per_worker: int) -> float:
+    """
+    Verifies/sec with `workers` processes busy at once, to check that capacity scales with cores
+    """
+    hashed = get_pwd_context(policy).hash(PASSWORD)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(verify_many, [policy] * workers, [hashed] * workers, [1] * workers))  # start the workers
+        start = time.perf_counter()
+        list(executor.map(verify_many, [policy] * workers, [hashed] * workers, [per_worker] * workers))
+        return workers * per_worker / (time.perf_counter() - start)
+
+
+def measure(policy: HashPolicy, args) -> dict:
+    verify = verify_ms(policy, args.samples)
+    result = {
+        "setting": policy.describe(),
+        "hash_ms": round(hash_time_ms(policy, args.samples), 1),
+        "verify_ms": round(verify, 1),
+        "logins_per_sec_per_core": round(1000 / verify, 1),
+    }
+    if args.workers > 1:
+        result[f"logins_per_sec_{args.workers}_workers"] = round(
+            parallel_logins_per_sec(policy, args.workers, args.samples), 1
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bcrypt-rounds", default="10,11,12,13", help="comma-separated bcrypt costs")
+    parser.add_argument("--argon2-time-cost", default="2,3,4", help="comma-separated argon2 time costs ('' to skip)")
+    parser.add_argument("--argon2-memory-kib", type=int, default=65536, help="argon2 memory per hash")
+    parser.add_argument("--argon2-parallelism", type=int, default=1, help="argon2 lanes per hash")
+    parser.add_argument("--samples", type=int, default=5, help="hashes/verifies per measurement")
+    parser.add_argument("--workers", type=int, default=1, help="also measure this many worker processes at once")
+    parser.add_argument("--target-ms", type=float, default=0, help="also show the calibrated cost for this target")
+    args = parser.parse_args()
+
+    policies = [HashPolicy(rounds=int(rounds)) for rounds in args.bcrypt_rounds.split(",") if rounds]
+    argon2_costs = [int(cost) for cost in args.argon2_time_cost.split(",") if cost]
+    if argon2_costs:
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            print("argon2-cffi is not installed; skipping argon2")
+            argon2_costs = []
+    policies += [
+        HashPolicy("argon2", cost, args.argon2_memory_kib, args.argon2_parallelism) for cost in argon2_costs
+    ]
+
+    results = {"settings": [measure(policy, args) for policy in policies]}
+    if args.target_ms:
+        results["calibrated"] = {}
+        for base in {policy.scheme: policy for policy in policies}.values():
+            calibrated = calibrate(base, args.target_ms, *rounds_bounds(base.scheme))
+            results["calibrated"][base.scheme] = calibrated.describe()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
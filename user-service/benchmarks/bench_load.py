@@ -0,0 +1,271 @@
+# user-service/benchmarks/bench_load.py
+"""
+Load test of the main user-service endpoints, with results that can be
+compared between commits.
+
+    python benchmarks/bench_load.py run --concurrency 32 --duration 20 --output results/$(git rev-parse --short HEAD).json
+    python benchmarks/bench_load.py compare results/base.json results/head.json --threshold 10
+
+`run` starts the service with uvicorn in a subprocess against a throwaway
+SQLite file, or BENCH_DATABASE_URL (e.g. a local Postgres container:
+docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=password postgres:15-alpine),
+seeds `--users` users, then drives each scenario for `--duration` seconds
+with `--concurrency` requests in flight (closed loop: each virtual client
+sends its next request when the previous one returns):
+- register: POST /auth/register with a new email each time
+- login: POST /auth/login for one user
+- me: GET /users/me with a bearer token
+- user: GET /users/{id} for random ids
+- users_page: GET /users keyset pages of `--page-size` from random cursors
+Pass `--base-url` to load an already running service instead.
+
+For each scenario it reports requests, errors (non-2xx or transport
+failures), requests/sec and p50/p95/p99/max latency, as JSON.
+
+`compare` exits with status 1 when, for any scenario in both files,
+requests/sec dropped or p95/p99 grew by more than `--threshold` percent,
+or the error rate grew by more than a percentage point.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from common import SRC_DIR, database_url, seed_users, summarize
+
+import httpx
+
+from bench_grpc import free_port
+
+SCENARIOS = ["register", "login", "me", "user", "users_page"]
+
+USER = {
+    "email": "load@example.com",
+    "password": "loadpassword123",
+    "first_name": "Load",
+    "last_name": "Test",
+}
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("service did not become ready")
+
+
+async def drive(
+    send: Callable[[int], Awaitable[httpx.Response]], concurrency: int, duration: float, warmup: float
+) -> dict:
+    """
+    Call `send(n)` from `concurrency` virtual clients for `duration` seconds,
+    after `warmup` seconds whose requests are not counted
+    """
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def client_loop():
+        nonlocal errors
+        while True:
+            sent = time.perf_counter()
+            if sent >= deadline:
+                return
+            try:
+                ok = (await send(next(counter))).is_success
+            except httpx.HTTPError:
+                ok = False
+            if sent >= measure_from:
+                latencies.append(time.perf_counter() - sent)
+                errors += not ok
+
+    await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - measure_from
+    return {"requests": len(latencies), "errors": errors, "rps": round(len(latencies) / elapsed, 1), **summarize(latencies)}
+
+
+async def run_scenarios(client: httpx.AsyncClient, args) -> Dict[str, dict]:
+    from pagination import encode_cursor
+
+    await client.post("/auth/register", json=USER)
+    login = await client.post("/auth/login", json={"email": USER["email"], "password": USER["password"]})
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    run_id = int(time.time())
+
+    senders = {
+        "register": lambda n: client.post("/auth/register", json={
+            **USER, "email": f"load-{run_id}-{n}@example.com",
+        }),
+        "login": lambda n: client.post("/auth/login", json={"email": USER["email"], "password": USER["password"]}),
+        "me": lambda n: client.get("/users/me", headers=headers),
+        "user": lambda n: client.get(f"/users/{random.randint(1, args.users)}"),
+        "users_page": lambda n: client.get("/users", params={
+            "limit": args.page_size,
+            "cursor": encode_cursor(random.randint(0, max(0, args.users - args.page_size))),
+        }),
+    }
+    results = {}
+    for name in args.scenarios:
+        results[name] = await drive(senders[name], args.concurrency, args.duration, args.warmup)
+        print(f"{name}: {results[name]['rps']} req/s, p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    url = None
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        url = database_url()
+        seed_users(url, args.users)
+        port = free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": url,
+            "GRPC_ENABLED": "false",
+            "LOG_LEVEL": "WARNING",
+            # The login scenario deliberately repeats one user's login
+            "LOGIN_RATE_LIMIT_ENABLED": "false",
+        }
+        env.pop("ENVIRONMENT", None)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=SRC_DIR, env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            await wait_until_ready(client)
+            scenarios = await run_scenarios(client, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "target": args.base_url or url.split("://", 1)[0],
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "users": args.users,
+            "page_size": args.page_size,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """
+    Regressions of `current` against `baseline`, one message each
+    """
+    regressions = []
+    limit = threshold / 100.0
+    for name, base in baseline["scenarios"].items():
+        head = current["scenarios"].get(name)
+        if head is None:
+            continue
+        if head["rps"] < base["rps"] * (1 - limit):
+            regressions.append(f"{name}: rps {base['rps']} -> {head['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            if head[key] > base[key] * (1 + limit):
+                regressions.append(f"{name}: {key} {base[key]} -> {head[key]}")
+        base_errors = base["errors"] / max(base["requests"], 1)
+        head_errors = head["errors"] / max(head["requests"], 1)
+        if head_errors > base_errors + 0.01:
+            regressions.append(f"{name}: error rate {base_errors:.1%} -> {head_errors:.1%}")
+    return regressions
+
+
+def print_comparison(baseline: dict, current: dict) -> None:
+    print(f"{'scenario':<12} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, base in baseline["scenarios"].items():
+        head = current["scenarios"].get(name)
+        if head is None:
+            continue
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (head[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+            print(f"{name:<12} {key:<8} {base[key]:>10} {head[key]:>10} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="load the service and write results")
+    run_parser.add_argument("--scenarios", type=lambda v: v.split(","), default=SCENARIOS,
+                            help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    run_parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    run_parser.add_argument("--duration", type=float, default=20, help="measured seconds per scenario")
+    run_parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each scenario")
+    run_parser.add_argument("--users", type=int, default=10000, help="users seeded before measuring")
+    run_parser.add_argument("--page-size", type=int, default=100, help="limit for the users_page scenario")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run_parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    run_parser.add_argument("--base-url", help="load a running service instead of starting one")
+    run_parser.add_argument("--output", help="also write the JSON results to this file")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files; exit 1 on regression")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="allowed change in percent")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        print_comparison(baseline, current)
+        regressions = compare(baseline, current, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# user-service/benchmarks/bench_login_burst.py
+"""
+Latency of /health and /users/me while a burst of logins is running.
+
+    python benchmarks/bench_login_burst.py --logins 8 --duration 10
+    python benchmarks/bench_login_burst.py --inline   # old behaviour: bcrypt on the event loop
+
+Prints a JSON summary with p50/p95/p99 per endpoint.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import database_url, setup_app, summarize
+
+import httpx
+
+USER = {
+    "email": "bench@example.com",
+    "password": "benchpassword123",
+    "first_name": "Bench",
+    "last_name": "User",
+}
+
+
+async def login_loop(client: httpx.AsyncClient, deadline: float, samples: list, statuses: dict):
+    credentials = {"email": USER["email"], "password": USER["password"]}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/auth/login", json=credentials)
+        samples.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+async def probe_loop(client: httpx.AsyncClient, path: str, headers: dict, deadline: float, samples: list):
+    # Latency is measured from the intended send time, so event loop stalls that
+    # delay the probe itself are counted (like a kubelet probe would see them)
+    interval = 0.01
+    scheduled = time.perf_counter()
+    while scheduled < deadline:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get(path, headers=headers)
+        samples.append(time.perf_counter() - scheduled)
+        scheduled += interval
+
+
+async def run(args) -> dict:
+    app = setup_app(database_url())
+
+    from hashing import password_hasher
+
+    if args.inline:
+        # Reproduce the pre-executor behaviour: hash on the event loop thread
+        async def inline_submit(fn, *fn_args):
+            return fn(*fn_args)
+        password_hasher._submit = inline_submit
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/auth/register", json=USER)
+        login = await client.post("/auth/login", json={"email": USER["email"], "password": USER["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        deadline = time.perf_counter() + args.duration
+        login_samples, health_samples, me_samples = [], [], []
+        statuses = {}
+        await asyncio.gather(
+            *[login_loop(client, deadline, login_samples, statuses) for _ in range(args.logins)],
+            probe_loop(client, "/health", {}, deadline, health_samples),
+            probe_loop(client, "/users/me", headers, deadline, me_samples),
+        )
+
+    password_hasher.shutdown()
+    return {
+        "mode": "inline" if args.inline else "executor",
+        "concurrent_logins": args.logins,
+        "hash_workers": password_hasher.max_workers,
+        "login": summarize(login_samples),
+        "login_statuses": statuses,
+        "health": summarize(health_samples),
+        "users_me": summarize(me_samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login loops")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (baseline)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# user-service/benchmarks/bench_serialization.py
+"""
+GET /users page cost, previous vs current serialization path.
+
+    python benchmarks/bench_serialization.py --sizes 10,100,1000
+
+For each page size, reports the median milliseconds of
+- orm_models: select(User) entities -> UserResponse.model_validate per row ->
+  FastAPI response_model validation and serialization -> json.dumps
+  (what GET /users did before)
+- projected_orjson: select of the response columns as dicts -> orjson
+  (what GET /users does now)
+both with the query included (total_ms) and for encoding alone (encode_ms).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import List
+
+from common import database_url, seed_users
+
+
+async def median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+async def run(args) -> dict:
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from crud import AsyncUserCRUD
+    from database import AsyncSessionLocal, async_engine
+    from models import USER_RESPONSE_COLUMNS, UserResponse
+
+    crud = AsyncUserCRUD()
+    field = create_response_field(name="Response_get_users", type_=List[UserResponse])
+
+    async def encode_models(users) -> bytes:
+        content = [UserResponse.model_validate(user) for user in users]
+        return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    async def encode_rows(rows) -> bytes:
+        return ORJSONResponse(rows).body
+
+    results = []
+    async with AsyncSessionLocal() as db:
+        for size in args.sizes:
+            users = await crud.get_users(db, limit=size)
+            rows = await crud.get_user_rows(db, USER_RESPONSE_COLUMNS, limit=size)
+            assert json.loads(await encode_models(users)) == json.loads(await encode_rows(rows))
+
+            async def orm_models():
+                db.expunge_all()
+                await encode_models(await crud.get_users(db, limit=size))
+
+            async def projected_orjson():
+                await encode_rows(await crud.get_user_rows(db, USER_RESPONSE_COLUMNS, limit=size))
+
+            results.append({
+                "page_size": size,
+                "orm_models": {
+                    "total_ms": await median_ms(orm_models, args.repeat),
+                    "encode_ms": await median_ms(lambda: encode_models(users), args.repeat),
+                },
+                "projected_orjson": {
+                    "total_ms": await median_ms(projected_orjson, args.repeat),
+                    "encode_ms": await median_ms(lambda: encode_rows(rows), args.repeat),
+                },
+            })
+    await async_engine.dispose()
+    return {"results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",")], default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    url = database_url()
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("ENVIRONMENT", None)
+    seed_users(url, max(args.sizes))
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
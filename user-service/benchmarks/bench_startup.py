@@ -0,0 +1,107 @@
+# user-service/benchmarks/bench_startup.py
+"""
+Cold-start cost of the service.
+
+    python benchmarks/bench_startup.py --runs 5
+
+Reports, as medians over `--runs` fresh processes:
+- import_ms: `import main` in a new interpreter
+- health_ms: process start until GET /health answers
+- ready_ms: process start until GET /ready answers 200 (pool and hash workers warm)
+- first_login_ms: the first POST /auth/login once the service reports ready
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import SRC_DIR, database_url, seed_users
+
+import httpx
+
+from bench_grpc import free_port
+
+EMAIL = "user0@example.com"
+PASSWORD = "benchpassword123"
+
+
+def service_env(url: str) -> dict:
+    env = {**os.environ, "DATABASE_URL": url, "GRPC_ENABLED": "false", "LOG_LEVEL": "WARNING"}
+    env.pop("ENVIRONMENT", None)
+    return env
+
+
+def import_ms(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=SRC_DIR, env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def wait_for(client: httpx.Client, path: str, start: float, timeout: float = 60.0) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            if client.get(path).status_code == 200:
+                return (time.perf_counter() - start) * 1000
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{path} did not become ready")
+
+
+def start_service(env: dict) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SRC_DIR, env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            health = wait_for(client, "/health", start)
+            # Older builds have no /ready; fall back to /health
+            ready_path = "/ready" if client.get("/ready").status_code != 404 else "/health"
+            ready = wait_for(client, ready_path, start)
+            login_start = time.perf_counter()
+            response = client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            assert response.status_code == 200, response.text
+            first_login = (time.perf_counter() - login_start) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_ms": health, "ready_ms": ready, "first_login_ms": first_login}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    args = parser.parse_args()
+
+    url = database_url()
+    seed_users(url, 1)
+    # Give the seeded user a real password hash so the login exercises bcrypt
+    from passlib.context import CryptContext
+    from sqlalchemy import create_engine, update
+
+    from models import User
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(update(User).where(User.email == EMAIL).values(
+            password=CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+        ))
+    engine.dispose()
+
+    env = service_env(url)
+    imports = [import_ms(env) for _ in range(args.runs)]
+    starts = [start_service(env) for _ in range(args.runs)]
+    results = {"import_ms": round(statistics.median(imports), 1)}
+    for key in ("health_ms", "ready_ms", "first_login_ms"):
+        results[key] = round(statistics.median(run[key] for run in starts), 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# user-service/benchmarks/common.py
+"""
+Shared helpers for the user-service benchmarks.
+
+The benchmarks drive the FastAPI app in-process through httpx's ASGI
+transport, so they run offline against a throwaway SQLite file unless
+BENCH_DATABASE_URL points at a real database (e.g. a local Postgres container).
+"""
+import os
+import sys
+import tempfile
+from typing import Dict, List
+
+# Make the service modules importable the same way uvicorn sees them
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def database_url() -> str:
+    """
+    Database URL for a benchmark run: BENCH_DATABASE_URL or a fresh SQLite file
+    """
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return url
+    path = os.path.join(tempfile.mkdtemp(prefix="user-service-bench-"), "bench.db")
+    return f"sqlite:///{path}"
+
+
+def setup_app(url: str):
+    """
+    Import the app, point it at `url` and create the schema
+    """
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("ENVIRONMENT", None)
+
+    from sqlalchemy import create_engine
+
+    from main import app
+    from database import engine_options
+    from models import Base
+
+    # Schema is created with a short-lived sync engine; the app keeps its own async engine
+    engine = create_engine(url, **engine_options(url))
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return app
+
+
+def seed_users(url: str, rows: int, chunk: int = 10000) -> None:
+    """
+    Make sure the users table holds at least `rows` rows, inserting in chunks.
+    Every tenth user is inactive.
+    """
+    from datetime import datetime
+
+    from sqlalchemy import create_engine, func, insert, select
+
+    from database import engine_options
+    from models import Base, User
+
+    engine = create_engine(url, **engine_options(url))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(User)).scalar_one()
+        now = datetime.utcnow()
+        for start in range(existing, rows, chunk):
+            conn.execute(insert(User), [
+                {
+                    "email": f"user{i}@example.com",
+                    "password": "not-a-real-hash",
+                    "first_name": "Bench",
+                    "last_name": "User",
+                    "is_active": i % 10 != 0,
+                    "is_verified": False,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(start, min(start + chunk, rows))
+            ])
+    engine.dispose()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples`
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Latency summary in milliseconds for a list of durations in seconds
+    """
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
@@ -0,0 +1,244 @@
+# user-service/src/cache.py
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    In-process LRU cache with a per-entry TTL and hit/miss/eviction counters.
+    Not thread-safe; it is only used from the event loop thread.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__dt__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if "__dt__" in obj:
+        return datetime.fromisoformat(obj["__dt__"])
+    return obj
+
+
+class UserCache:
+    """
+    Read-through cache for user rows, keyed by id and by email.
+
+    Tier 1 is an in-process LRU, tier 2 is Redis when a client is given.
+    Redis failures are logged and treated as misses.
+
+    Stale reads after a write from this pod are prevented with a version
+    counter: every invalidation bumps it, and a reader only fills the cache
+    if no invalidation happened since it started its database read.
+    """
+
+    def __init__(self, local: LRUCache, redis: Any = None, prefix: str = "user-service:user:"):
+        self.local = local
+        self.redis = redis
+        self.prefix = prefix
+        self._version = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+
+    @classmethod
+    def from_settings(cls) -> Optional["UserCache"]:
+        if not settings.USER_CACHE_ENABLED:
+            return None
+        redis = None
+        if settings.REDIS_URL:
+            from redis import asyncio as aioredis
+            redis = aioredis.from_url(settings.REDIS_URL)
+        return cls(LRUCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS), redis)
+
+    @staticmethod
+    def id_key(user_id: int) -> str:
+        return f"id:{user_id}"
+
+    @staticmethod
+    def email_key(email: str) -> str:
+        return f"email:{email}"
+
+    def begin_read(self) -> int:
+        """
+        Token to pass to fill() after reading from the database
+        """
+        return self._version
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is not None or self.redis is None:
+            return value
+
+        version = self._version
+        try:
+            raw = await self.redis.get(self.prefix + key)
+        except Exception:
+            self.redis_errors += 1
+            logger.warning("User cache: Redis get failed", exc_info=True)
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        value = json.loads(raw, object_hook=_decode)
+        if version == self._version:
+            self.local.set(key, value)
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Like get() for several keys, with a single Redis round trip for the local misses
+        """
+        values = [self.local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if self.redis is None or not missing:
+            return values
+
+        version = self._version
+        try:
+            raws = await self.redis.mget([self.prefix + keys[i] for i in missing])
+        except Exception:
+            self.redis_errors += 1
+            logger.warning("User cache: Redis mget failed", exc_info=True)
+            return values
+
+        for i, raw in zip(missing, raws):
+            if raw is None:
+                self.redis_misses += 1
+                continue
+            self.redis_hits += 1
+            values[i] = json.loads(raw, object_hook=_decode)
+            if version == self._version:
+                self.local.set(keys[i], values[i])
+        return values
+
+    async def fill(self, data: Dict[str, Any], version: int) -> None:
+        """
+        Store a user row under its id and email keys, unless it was
+        invalidated while the row was being read
+        """
+        await self.fill_many([data], version)
+
+    async def fill_many(self, rows: List[Dict[str, Any]], version: int) -> None:
+        """
+        fill() for several user rows, with a single Redis round trip
+        """
+        if version != self._version:
+            return
+        keys = []
+        for data in rows:
+            for key in (self.id_key(data["id"]), self.email_key(data["email"])):
+                self.local.set(key, data)
+                keys.append(key)
+
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for data in rows:
+                raw = json.dumps(data, default=_encode)
+                pipe.set(self.prefix + self.id_key(data["id"]), raw, ex=int(self.local.ttl))
+                pipe.set(self.prefix + self.email_key(data["email"]), raw, ex=int(self.local.ttl))
+            await pipe.execute()
+            # An invalidation may have run while we were writing to Redis
+            if version != self._version:
+                await self.redis.delete(*[self.prefix + key for key in keys])
+        except Exception:
+            self.redis_errors += 1
+            logger.warning("User cache: Redis set failed", exc_info=True)
+
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        """
+        Drop entries after a write; call once the write has been committed
+        """
+        keys = list(keys)
+        self._version += 1
+        for key in keys:
+            self.local.delete(key)
+
+        if self.redis is None or not keys:
+            return
+        try:
+            await self.redis.delete(*[self.prefix + key for key in keys])
+        except Exception:
+            self.redis_errors += 1
+            logger.warning("User cache: Redis delete failed", exc_info=True)
+
+    def clear(self) -> None:
+        self._version += 1
+        self.local.clear()
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"local": self.local.stats()}
+        if self.redis is not None:
+            stats["redis"] = {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+            }
+        return stats
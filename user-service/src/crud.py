@@ -1,8 +1,16 @@
 # user-service/src/crud.py
+from sqlalchemy import ColumnElement, Insert, Integer, Select, any_, bindparam, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from models import User # Assuming models.py is in the same directory or accessible in PYTHONPATH
-from typing import List, Optional, Dict, Any
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
+from models import RefreshSession, User # Assuming models.py is in the same directory or accessible in PYTHONPATH
+from cache import UserCache
+from outbox import USER_CREATED, USER_DEACTIVATED, USER_DELETED, USER_VERIFIED, user_event
+from metrics import DB_READS
+from replicas import ReplicaRouter
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, TypeVar
+from datetime import datetime
 
 class UserCRUD:
     """
@@ -16,6 +24,8 @@ class UserCRUD:
         try:
             db_user = User(**user_data)
             db.add(db_user)
+            db.flush()
+            db.add(user_event(USER_CREATED, db_user))
             db.commit()
             db.refresh(db_user)
             return db_user
@@ -35,11 +45,15 @@ class UserCRUD:
         """
         return db.query(User).filter(User.email == email).first()
 
-    def get_users(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
+    def get_users(self, db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[User]:
         """
-        Get a list of users with pagination
+        Get a list of users with pagination.
+        With `after_id` set, keyset pagination is used and `skip` is ignored.
         """
-        return db.query(User).offset(skip).limit(limit).all()
+        query = db.query(User)
+        if after_id is not None:
+            return query.filter(User.id > after_id).order_by(User.id).limit(limit).all()
+        return query.order_by(User.id).offset(skip).limit(limit).all()
 
     def update_user(self, db: Session, user_id: int, user_data: Dict[str, Any]) -> Optional[User]:
         """
@@ -49,9 +63,13 @@ class UserCRUD:
         if not db_user:
             return None
 
+        before = _event_state(db_user)
         for field, value in user_data.items():
             if hasattr(db_user, field) and value is not None:
                 setattr(db_user, field, value)
+        if user_data.get("is_active") is False:
+            db.execute(_revoke_sessions(user_id))
+        db.add_all(_transition_events(before, db_user))
 
         try:
             db.commit()
@@ -69,15 +87,21 @@ class UserCRUD:
         if not db_user:
             return False
 
+        db.execute(_revoke_sessions(user_id))
+        db.add(user_event(USER_DELETED, db_user))
         db.delete(db_user)
         db.commit()
         return True
 
-    def get_active_users(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
+    def get_active_users(self, db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[User]:
         """
-        Get active users
+        Get active users.
+        With `after_id` set, keyset pagination is used and `skip` is ignored.
         """
-        return db.query(User).filter(User.is_active == True).offset(skip).limit(limit).all()
+        query = db.query(User).filter(User.is_active == True)
+        if after_id is not None:
+            return query.filter(User.id > after_id).order_by(User.id).limit(limit).all()
+        return query.order_by(User.id).offset(skip).limit(limit).all()
 
     def verify_user(self, db: Session, user_id: int) -> Optional[User]:
         """
@@ -89,4 +113,476 @@ class UserCRUD:
         """
         Deactivate a user
         """
-        return self.update_user(db, user_id, {"is_active": False})
\ No newline at end of file
+        return self.update_user(db, user_id, {"is_active": False})
+
+
+def _revoke_sessions(*user_ids: int):
+    # Explicit rather than relying on ON DELETE CASCADE, which SQLite doesn't enforce by default
+    return delete(RefreshSession).where(RefreshSession.user_id.in_(user_ids))
+
+
+def _event_state(user: User) -> Dict[str, Any]:
+    return {"is_active": user.is_active, "is_verified": user.is_verified}
+
+
+def _transition_events(before: Dict[str, Any], user: User) -> List[Any]:
+    """
+    Outbox events for an update, from the user's state before and after it;
+    rewriting a flag to its current value emits nothing
+    """
+    events = []
+    if before["is_active"] and not user.is_active:
+        events.append(user_event(USER_DEACTIVATED, user))
+    if not before["is_verified"] and user.is_verified:
+        events.append(user_event(USER_VERIFIED, user))
+    return events
+
+
+def _bulk_deactivated(results: List[Dict[str, Any]], returned: Dict[str, Any], before: Dict[str, Any]) -> List[str]:
+    """
+    Emails of the users a bulk upsert chunk deactivated: active before it, inactive after
+    """
+    return [
+        result["email"] for result in results
+        if result["status"] == "updated"
+        and before[result["email"]].is_active
+        and not returned[result["email"]].is_active
+    ]
+
+
+def _bulk_events(results: List[Dict[str, Any]], returned: Dict[str, Any], deactivated: List[str]) -> List[Any]:
+    """
+    Outbox events for a bulk upsert chunk, from the rows it returned:
+    user.created for inserted users, and user.deactivated for the users
+    it deactivated
+    """
+    events = []
+    deactivated = set(deactivated)
+    for result in results:
+        row = returned.get(result["email"])
+        if row is None:
+            continue
+        if result["status"] == "created":
+            events.append(user_event(USER_CREATED, dict(row._mapping)))
+        elif result["email"] in deactivated:
+            events.append(user_event(USER_DEACTIVATED, dict(row._mapping)))
+    return events
+
+
+def _paginate(stmt: Select, skip: int, limit: int, after_id: Optional[int]) -> Select:
+    """
+    Apply keyset pagination on `id` when `after_id` is given, offset pagination otherwise.
+    Keyset pages cost the same at any depth; offset pages scan and discard `skip` rows.
+    """
+    if after_id is not None:
+        return stmt.where(User.id > after_id).order_by(User.id).limit(limit)
+    return stmt.order_by(User.id).offset(skip).limit(limit)
+
+
+def _ids_criterion(dialect: str, user_ids: List[int]) -> ColumnElement:
+    """
+    `id = ANY(:ids)` on Postgres: a single array parameter, so the statement text
+    (and its cached plan) is the same for any number of ids. IN (...) elsewhere.
+    """
+    unique_ids = list(dict.fromkeys(user_ids))
+    if dialect == "postgresql":
+        return User.id == any_(bindparam("user_ids", unique_ids, type_=postgresql.ARRAY(Integer)))
+    return User.id.in_(unique_ids)
+
+
+def _export_query(columns: List[str], updated_since: Optional[datetime]) -> Select:
+    """
+    Column-projected query for exports, in id order
+    """
+    stmt = select(*[getattr(User, column) for column in columns]).order_by(User.id)
+    if updated_since is not None:
+        stmt = stmt.where(User.updated_at >= updated_since)
+    return stmt
+
+
+# Columns a bulk record may overwrite when it matches an existing email
+BULK_UPDATE_COLUMNS = ["password", "first_name", "last_name", "phone", "is_active"]
+
+
+def _existing_users(records: List[Dict[str, Any]]) -> Select:
+    """
+    (email, id, is_active) of the records' users that already exist, locked
+    until the chunk commits on Postgres so their state can't change meanwhile
+    """
+    emails = [record["email"] for record in records]
+    return select(User.email, User.id, User.is_active).where(User.email.in_(emails)).with_for_update()
+
+
+def _bulk_statements(dialect: str, records: List[Dict[str, Any]], update_existing: bool) -> Iterator[Insert]:
+    """
+    One upsert per set of columns the records set, so an existing user only
+    gets the fields its record carries: leaving out is_active doesn't
+    reactivate a deactivated user, and leaving out phone doesn't clear it.
+    Records usually all set the same columns, which makes this one statement.
+    """
+    if not update_existing:
+        yield _bulk_insert(dialect, records, None)
+        return
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for record in records:
+        columns = tuple(column for column in BULK_UPDATE_COLUMNS if column in record)
+        groups.setdefault(columns, []).append(record)
+    for columns, group in groups.items():
+        yield _bulk_insert(dialect, group, list(columns))
+
+
+def _bulk_insert(dialect: str, records: List[Dict[str, Any]], update_columns: Optional[List[str]]) -> Insert:
+    """
+    Multi-row INSERT ... ON CONFLICT (email) for Postgres or SQLite, returning
+    (id, email, is_active, is_verified) of the rows written. Existing users get
+    `update_columns` overwritten, or are left alone when it is None.
+    """
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+
+    now = datetime.utcnow()
+    rows = [
+        {"phone": None, "is_active": True, **record, "is_verified": False, "created_at": now, "updated_at": now}
+        for record in records
+    ]
+    stmt = insert(User).values(rows)
+    if update_columns is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={**{column: stmt.excluded[column] for column in update_columns}, "updated_at": now},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[User.email])
+    return stmt.returning(User.id, User.email, User.is_active, User.is_verified)
+
+
+def _bulk_results(
+    records: List[Dict[str, Any]],
+    existing: Dict[str, int],
+    written: Dict[str, int],
+    update_existing: bool
+) -> List[Dict[str, Any]]:
+    results = []
+    for record in records:
+        email = record["email"]
+        if email in existing:
+            status = "updated" if update_existing else "skipped"
+        else:
+            status = "created" if email in written else "skipped"
+        results.append({"email": email, "status": status, "id": written.get(email, existing.get(email))})
+    return results
+
+
+def _cacheable(user: User) -> Dict[str, Any]:
+    """
+    Column values of a user for the cache; the password hash is never cached
+    """
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key != "password"
+    }
+
+
+T = TypeVar("T")
+
+
+class AsyncUserCRUD:
+    """
+    Async CRUD class for user database operations, used by the API so that
+    queries don't block the event loop.
+
+    With a UserCache, get_user and get_user_by_email read through the cache and
+    every write invalidates the affected entries once committed. Users served
+    from the cache are detached and have no password hash; pass use_cache=False
+    where the hash or a fresh row is needed.
+
+    With a ReplicaRouter, read-only methods run on a replica in their own
+    session (falling back to `db` on the primary if the replica fails), unless
+    called with use_replica=False or reading a user written in the last few
+    seconds. Writes always use `db`.
+    """
+
+    def __init__(self, cache: Optional[UserCache] = None, router: Optional[ReplicaRouter] = None):
+        self.cache = cache
+        self.router = router
+
+    async def _read(
+        self,
+        db: AsyncSession,
+        query: Callable[[AsyncSession], Awaitable[T]],
+        keys: Iterable[str] = (),
+        use_replica: bool = True
+    ) -> T:
+        replica = self.router.pick(keys) if self.router and use_replica else None
+        if replica is not None:
+            try:
+                async with replica.sessionmaker() as replica_db:
+                    result = await query(replica_db)
+                DB_READS.labels("replica").inc()
+                return result
+            except (OperationalError, InterfaceError, OSError) as e:
+                self.router.mark_unhealthy(replica, e)
+        DB_READS.labels("primary").inc()
+        return await query(db)
+
+    async def _fetch_user(self, db: AsyncSession, criterion: Any) -> Optional[User]:
+        result = await db.execute(select(User).where(criterion))
+        return result.scalars().first()
+
+    async def _read_through(
+        self, db: AsyncSession, key: str, criterion: Any, use_cache: bool, use_replica: bool = True
+    ) -> Optional[User]:
+        async def fetch(session: AsyncSession) -> Optional[User]:
+            return await self._fetch_user(session, criterion)
+
+        if self.cache is None or not use_cache:
+            return await self._read(db, fetch, [key], use_replica)
+
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return User(**cached)
+
+        version = self.cache.begin_read()
+        db_user = await self._read(db, fetch, [key], use_replica)
+        if db_user:
+            await self.cache.fill(_cacheable(db_user), version)
+        return db_user
+
+    async def _invalidate(self, user_ids: List[int], emails: List[str]) -> None:
+        keys = [UserCache.id_key(user_id) for user_id in user_ids]
+        keys += [UserCache.email_key(email) for email in emails]
+        # Pin reads to the primary before the cache can be refilled, so a lagging
+        # replica can't put the old row back into the cache
+        if self.router:
+            self.router.mark_written(keys)
+        if self.cache is not None:
+            await self.cache.invalidate(keys)
+
+    async def create_user(self, db: AsyncSession, user_data: Dict[str, Any]) -> User:
+        """
+        Create a new user
+        """
+        try:
+            db_user = User(**user_data)
+            db.add(db_user)
+            await db.flush()  # Assigns the id the event carries
+            db.add(user_event(USER_CREATED, db_user))
+            await db.commit()
+            await db.refresh(db_user)
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError("User with this email already exists")
+        if self.router:
+            self.router.mark_written([UserCache.id_key(db_user.id), UserCache.email_key(db_user.email)])
+        return db_user
+
+    async def get_user(
+        self, db: AsyncSession, user_id: int, use_cache: bool = True, use_replica: bool = True
+    ) -> Optional[User]:
+        """
+        Get user by ID
+        """
+        return await self._read_through(db, UserCache.id_key(user_id), User.id == user_id, use_cache, use_replica)
+
+    async def get_user_by_email(
+        self, db: AsyncSession, email: str, use_cache: bool = True, use_replica: bool = True
+    ) -> Optional[User]:
+        """
+        Get user by email
+        """
+        return await self._read_through(db, UserCache.email_key(email), User.email == email, use_cache, use_replica)
+
+    async def get_users_by_ids(self, db: AsyncSession, user_ids: List[int], use_cache: bool = True) -> List[Optional[User]]:
+        """
+        Get many users with at most one query; one entry per requested id, in
+        request order, None if missing. Cached users are served from the cache
+        and only the rest are read from the database.
+        """
+        found: Dict[int, User] = {}
+        missing = list(dict.fromkeys(user_ids))
+        if self.cache is not None and use_cache and missing:
+            cached = await self.cache.get_many([UserCache.id_key(user_id) for user_id in missing])
+            for user_id, data in zip(missing, cached):
+                if data is not None:
+                    found[user_id] = User(**data)
+            missing = [user_id for user_id in missing if user_id not in found]
+
+        if missing:
+            async def fetch(session: AsyncSession) -> List[User]:
+                stmt = select(User).where(_ids_criterion(session.get_bind().dialect.name, missing))
+                return list((await session.execute(stmt)).scalars())
+
+            version = self.cache.begin_read() if self.cache is not None else 0
+            db_users = await self._read(db, fetch, [UserCache.id_key(user_id) for user_id in missing])
+            found.update((user.id, user) for user in db_users)
+            if self.cache is not None and use_cache and db_users:
+                await self.cache.fill_many([_cacheable(user) for user in db_users], version)
+
+        return [found.get(user_id) for user_id in user_ids]
+
+    async def get_users(self, db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[User]:
+        """
+        Get a list of users with pagination.
+        With `after_id` set, keyset pagination is used and `skip` is ignored.
+        """
+        async def fetch(session: AsyncSession) -> List[User]:
+            result = await session.execute(_paginate(select(User), skip, limit, after_id))
+            return list(result.scalars().all())
+
+        return await self._read(db, fetch)
+
+    async def update_user(self, db: AsyncSession, user_id: int, user_data: Dict[str, Any]) -> Optional[User]:
+        """
+        Update user information
+        """
+        db_user = await self._fetch_user(db, User.id == user_id)
+        if not db_user:
+            return None
+
+        old_email = db_user.email
+        before = _event_state(db_user)
+        for field, value in user_data.items():
+            if hasattr(db_user, field) and value is not None:
+                setattr(db_user, field, value)
+        # A deactivated user can't refresh; existing access tokens still run until they expire
+        if user_data.get("is_active") is False:
+            await db.execute(_revoke_sessions(user_id))
+        # Committed with the change itself, so an event exists exactly when the change does
+        db.add_all(_transition_events(before, db_user))
+
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError("Update failed due to constraint violation")
+
+        await self._invalidate([user_id], [old_email, db_user.email])
+        await db.refresh(db_user)
+        return db_user
+
+    async def delete_user(self, db: AsyncSession, user_id: int) -> bool:
+        """
+        Delete a user
+        """
+        db_user = await self._fetch_user(db, User.id == user_id)
+        if not db_user:
+            return False
+
+        await db.execute(_revoke_sessions(user_id))
+        db.add(user_event(USER_DELETED, db_user))
+        await db.delete(db_user)
+        await db.commit()
+        await self._invalidate([user_id], [db_user.email])
+        return True
+
+    async def get_active_users(self, db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[User]:
+        """
+        Get active users.
+        With `after_id` set, keyset pagination is used and `skip` is ignored.
+        """
+        async def fetch(session: AsyncSession) -> List[User]:
+            stmt = select(User).where(User.is_active == True)
+            result = await session.execute(_paginate(stmt, skip, limit, after_id))
+            return list(result.scalars().all())
+
+        return await self._read(db, fetch)
+
+    async def get_user_rows(
+        self,
+        db: AsyncSession,
+        columns: List[str],
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        active_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        get_users / get_active_users selecting only `columns`, as plain dicts.
+        Skips building ORM objects (identity map, attribute state) for rows
+        that are only going to be encoded.
+        """
+        async def fetch(session: AsyncSession) -> List[Dict[str, Any]]:
+            stmt = select(*[getattr(User, column) for column in columns])
+            if active_only:
+                stmt = stmt.where(User.is_active == True)
+            result = await session.execute(_paginate(stmt, skip, limit, after_id))
+            return [dict(row) for row in result.mappings()]
+
+        return await self._read(db, fetch)
+
+    async def get_user_ids_by_email(self, db: AsyncSession, emails: List[str]) -> Dict[str, int]:
+        """
+        Map the given emails to user ids, for those that exist
+        """
+        rows = await db.execute(select(User.email, User.id).where(User.email.in_(emails)))
+        return {email: user_id for email, user_id in rows}
+
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        records: List[Dict[str, Any]],
+        update_existing: bool = True,
+        chunk_size: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert or update many users with multi-row INSERT ... ON CONFLICT (email)
+        statements, one transaction per chunk. Passwords must already be hashed.
+        Returns {"email", "status", "id"} per record, in input order.
+        """
+        results = []
+        dialect = db.get_bind().dialect.name
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            was_active = {row.email: row for row in await db.execute(_existing_users(chunk))}
+            existing = {email: row.id for email, row in was_active.items()}
+            returned = {}
+            for statement in _bulk_statements(dialect, chunk, update_existing):
+                returned.update({row.email: row for row in await db.execute(statement)})
+            written = {email: row.id for email, row in returned.items()}
+            chunk_results = _bulk_results(chunk, existing, written, update_existing)
+            # Deactivated users can't refresh, as with update_user
+            deactivated = _bulk_deactivated(chunk_results, returned, was_active)
+            if deactivated:
+                await db.execute(_revoke_sessions(*[returned[email].id for email in deactivated]))
+            db.add_all(_bulk_events(chunk_results, returned, deactivated))
+            await db.commit()
+            if update_existing and existing:
+                await self._invalidate(list(existing.values()), list(existing))
+            results.extend(chunk_results)
+        return results
+
+    async def stream_users(
+        self,
+        db: AsyncSession,
+        columns: List[str],
+        updated_since: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over users as dicts of `columns`, fetched from a server-side
+        cursor `batch_size` rows at a time so memory stays flat
+        """
+        stmt = _export_query(columns, updated_since).execution_options(yield_per=batch_size)
+        result = await db.stream(stmt)
+        # Iterate per partition: every async fetch crosses the greenlet bridge, so
+        # doing it once per batch rather than once per row matters at this volume
+        async for partition in result.mappings().partitions():
+            for row in partition:
+                yield dict(row)
+
+    async def verify_user(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """
+        Verify a user
+        """
+        return await self.update_user(db, user_id, {"is_verified": True})
+
+    async def deactivate_user(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """
+        Deactivate a user
+        """
+        return await self.update_user(db, user_id, {"is_active": False})
@@ -1,8 +1,17 @@
 # user-service/src/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from typing import Any, AsyncIterator, Dict
+import asyncio
 import os
+import uuid
+
+from config import settings
+from metrics import InstrumentedAsyncPool, instrument_pool
+from replicas import Replica, ReplicaRouter
 
 # Database settings
 DATABASE_URL = os.getenv(
@@ -14,17 +23,120 @@ DATABASE_URL = os.getenv(
 if os.getenv("ENVIRONMENT") == "development":
     DATABASE_URL = "sqlite:///./users.db"
 
-engine = create_engine(DATABASE_URL)
+def make_async_url(url: str) -> str:
+    """
+    Translate a sync database URL to the matching async driver
+    (asyncpg for Postgres, aiosqlite for SQLite)
+    """
+    scheme, _, rest = url.partition("://")
+    if scheme in ("postgresql", "postgres", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme in ("sqlite", "sqlite+pysqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    Connection pool options from settings. SQLite uses its own pool classes,
+    which don't accept the sizing arguments.
+
+    In pgbouncer mode (transaction pooling) PgBouncer owns the pool, so every
+    checkout opens a fresh client connection (NullPool), and asyncpg must not
+    cache or reuse named prepared statements, since consecutive transactions
+    may land on different server connections.
+    """
+    if url.startswith("sqlite"):
+        return {}
+    if settings.DB_POOL_MODE == "pgbouncer":
+        options: Dict[str, Any] = {"poolclass": NullPool}
+        if "+asyncpg" in url:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return options
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+ASYNC_DATABASE_URL = make_async_url(DATABASE_URL)
+
+# Sync engine, kept for schema management and scripts
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def async_engine_options(url: str) -> Dict[str, Any]:
+    """
+    engine_options() plus a pool that reports checkout wait times
+    """
+    options = engine_options(url)
+    if options and "poolclass" not in options:
+        options["poolclass"] = InstrumentedAsyncPool
+    return options
+
+# Async engine used by the API
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_options(ASYNC_DATABASE_URL))
+instrument_pool(async_engine.pool)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Optional read replicas, used by AsyncUserCRUD for read-only queries
+replica_router = ReplicaRouter(
+    [
+        Replica(f"replica-{i}", create_async_engine(make_async_url(url), **async_engine_options(make_async_url(url))))
+        for i, url in enumerate(settings.DATABASE_REPLICA_URLS)
+    ],
+    sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
+    max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+)
+
 Base = declarative_base()
 
-def get_db():
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open `connections` connections at once and return them to the pool, so the
+    first requests after startup don't pay for connection setup
+    """
+    results = await asyncio.gather(*[engine.connect() for _ in range(connections)], return_exceptions=True)
+    await asyncio.gather(*[conn.close() for conn in results if not isinstance(conn, BaseException)])
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    """
+    Current state of the engine's connection pool
+    """
+    pool = engine.pool
+    stats: Dict[str, Any] = {"mode": settings.DB_POOL_MODE, "pool_class": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        stats.update({
+            "size": pool.size(),
+            "timeout": pool.timeout(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # Negative while fewer than `size` connections are open
+            "overflow": max(0, pool.overflow()),
+        })
+    return stats
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get an async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_sync_db():
     """
-    Dependency to get a database session
+    Dependency to get a sync database session
     """
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
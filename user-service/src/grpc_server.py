@@ -0,0 +1,113 @@
+# user-service/src/grpc_server.py
+import logging
+from typing import Callable, Optional, Tuple
+
+import grpc
+import jwt
+from google.protobuf.timestamp_pb2 import Timestamp
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import user_pb2
+import user_pb2_grpc
+from config import settings
+from crud import AsyncUserCRUD
+from database import AsyncSessionLocal
+from models import User
+from tokens import TokenVerifier, token_verifier
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value) -> Optional[Timestamp]:
+    if value is None:
+        return None
+    ts = Timestamp()
+    ts.FromDatetime(value)
+    return ts
+
+
+def user_to_proto(user: User) -> user_pb2.User:
+    return user_pb2.User(
+        id=user.id,
+        email=user.email,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        phone=user.phone,
+        is_active=user.is_active,
+        is_verified=user.is_verified,
+        created_at=_timestamp(user.created_at),
+        updated_at=_timestamp(user.updated_at),
+    )
+
+
+class UserServicer(user_pb2_grpc.UserServiceServicer):
+    """
+    gRPC user lookups. Uses the same AsyncUserCRUD (and so the same user
+    cache) as the REST API, with one session per call.
+    """
+
+    def __init__(
+        self,
+        crud: AsyncUserCRUD,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        verifier: TokenVerifier = token_verifier
+    ):
+        self.crud = crud
+        self.session_factory = session_factory
+        self.verifier = verifier
+
+    async def GetUser(self, request, context):
+        async with self.session_factory() as db:
+            user = await self.crud.get_user(db, request.id)
+        if not user:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "User not found")
+        return user_pb2.GetUserResponse(user=user_to_proto(user))
+
+    async def BatchGetUsers(self, request, context):
+        if len(request.ids) > settings.BATCH_MAX_IDS:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"At most {settings.BATCH_MAX_IDS} ids per call")
+        async with self.session_factory() as db:
+            users = await self.crud.get_users_by_ids(db, list(request.ids))
+        return user_pb2.BatchGetUsersResponse(results=[
+            user_pb2.UserResult(id=user_id, found=True, user=user_to_proto(user)) if user
+            else user_pb2.UserResult(id=user_id, found=False)
+            for user_id, user in zip(request.ids, users)
+        ])
+
+    async def ValidateToken(self, request, context):
+        # Same rules as GET /auth/verify
+        try:
+            payload = self.verifier.verify(request.token)
+        except jwt.PyJWTError:
+            return user_pb2.ValidateTokenResponse(valid=False)
+        if payload.get("sub") is None:
+            return user_pb2.ValidateTokenResponse(valid=False)
+
+        if settings.JWT_EMBED_CLAIMS and "is_active" in payload and "is_verified" in payload:
+            return user_pb2.ValidateTokenResponse(
+                valid=True,
+                user_id=int(payload["sub"]),
+                is_active=payload["is_active"],
+                is_verified=payload["is_verified"],
+            )
+
+        async with self.session_factory() as db:
+            user = await self.crud.get_user(db, int(payload["sub"]))
+        if not user:
+            return user_pb2.ValidateTokenResponse(valid=False)
+        return user_pb2.ValidateTokenResponse(
+            valid=True, user_id=user.id, is_active=user.is_active, is_verified=user.is_verified
+        )
+
+
+async def start_grpc_server(servicer: UserServicer, address: Optional[str] = None) -> Tuple[grpc.aio.Server, int]:
+    """
+    Start a grpc.aio server on the running event loop, next to the FastAPI app.
+    Returns the started server and the port it is bound to.
+    """
+    server = grpc.aio.server(maximum_concurrent_rpcs=settings.GRPC_MAX_CONCURRENT_RPCS or None)
+    user_pb2_grpc.add_UserServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port(address or f"{settings.HOST}:{settings.GRPC_PORT}")
+    await server.start()
+    logger.info("gRPC server listening on port %s", port)
+    return server, port
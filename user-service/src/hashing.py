@@ -0,0 +1,369 @@
+# user-service/src/hashing.py
+import asyncio
+import dataclasses
+import logging
+import math
+import os
+import secrets
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_PENDING
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Calibration never goes past this many argon2 passes
+ARGON2_MAX_TIME_COST = 20
+
+
+@dataclass(frozen=True)
+class HashPolicy:
+    """
+    Password scheme and cost. It travels with every hashing job, so the worker
+    processes always use the cost the parent settled on (possibly calibrated).
+    """
+    scheme: str = "bcrypt"
+    rounds: int = 12  # bcrypt log2 rounds, or argon2 time cost
+    memory_kib: int = 65536  # argon2 only
+    parallelism: int = 1  # argon2 only
+    # None: a stored hash with any other cost is rehashed on login. Calibrated
+    # costs may differ by one between pods, so they only upgrade weaker hashes,
+    # leaving those up to max_rounds alone instead of rehashing back and forth
+    max_rounds: Optional[int] = None
+
+    @classmethod
+    def from_settings(cls) -> "HashPolicy":
+        if settings.PASSWORD_SCHEME == "argon2":
+            return cls(
+                scheme="argon2",
+                rounds=max(settings.ARGON2_TIME_COST, settings.ARGON2_MIN_TIME_COST),
+                memory_kib=settings.ARGON2_MEMORY_KIB,
+                parallelism=settings.ARGON2_PARALLELISM,
+            )
+        if settings.PASSWORD_SCHEME != "bcrypt":
+            raise ValueError(f"Unsupported PASSWORD_SCHEME {settings.PASSWORD_SCHEME!r}")
+        return cls(rounds=max(settings.BCRYPT_ROUNDS, settings.BCRYPT_MIN_ROUNDS))
+
+    def describe(self) -> str:
+        if self.scheme == "argon2":
+            return f"argon2 time_cost={self.rounds} memory_kib={self.memory_kib} parallelism={self.parallelism}"
+        return f"bcrypt rounds={self.rounds}"
+
+
+def rounds_bounds(scheme: str) -> Tuple[int, int]:
+    """
+    Configured (floor, ceiling) for calibrating `scheme`
+    """
+    if scheme == "argon2":
+        return settings.ARGON2_MIN_TIME_COST, ARGON2_MAX_TIME_COST
+    return settings.BCRYPT_MIN_ROUNDS, settings.BCRYPT_MAX_ROUNDS
+
+
+# passlib and its hash backends are only needed where hashing runs (the worker
+# processes), so they are loaded on first use instead of at import
+_pwd_contexts: Dict[HashPolicy, "CryptContext"] = {}
+
+
+def _argon2_available() -> bool:
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_pwd_context(policy: Optional[HashPolicy] = None) -> "CryptContext":
+    """
+    CryptContext hashing with `policy` (default: from settings). Hashes of the
+    other supported scheme still verify and are marked for update.
+    """
+    policy = policy or HashPolicy.from_settings()
+    context = _pwd_contexts.get(policy)
+    if context is None:
+        from passlib.context import CryptContext
+
+        options: Dict[str, Any] = {f"{policy.scheme}__rounds": policy.rounds}
+        if policy.max_rounds is not None:
+            options[f"{policy.scheme}__max_rounds"] = policy.max_rounds
+        if policy.scheme == "argon2":
+            options.update(argon2__memory_cost=policy.memory_kib, argon2__parallelism=policy.parallelism)
+            schemes = ["argon2", "bcrypt"]
+        else:
+            schemes = ["bcrypt", "argon2"] if _argon2_available() else ["bcrypt"]
+        context = _pwd_contexts[policy] = CryptContext(schemes=schemes, deprecated="auto", **options)
+    return context
+
+
+def hash_password(password: str, policy: Optional[HashPolicy] = None) -> str:
+    """
+    Hash a password (runs inside the hashing worker processes)
+    """
+    return get_pwd_context(policy).hash(password)
+
+
+def check_password(plain_password: str, hashed_password: str, policy: Optional[HashPolicy] = None) -> bool:
+    """
+    Verify a password against its hash (runs inside the hashing worker processes)
+    """
+    return get_pwd_context(policy).verify(plain_password, hashed_password)
+
+
+def verify_and_update(
+    plain_password: str, hashed_password: str, policy: Optional[HashPolicy] = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if it matches but the hash uses another scheme or
+    cost than `policy`, rehash it in the same job. Returns (valid, new_hash or None).
+    """
+    return get_pwd_context(policy).verify_and_update(plain_password, hashed_password)
+
+
+def hash_passwords(passwords: List[str], policy: Optional[HashPolicy] = None) -> List[str]:
+    """
+    Hash a batch of passwords in one worker job
+    """
+    pwd_context = get_pwd_context(policy)
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def warm_up_worker(policy: Optional[HashPolicy] = None) -> int:
+    """
+    Load passlib and the hash backend in a worker process
+    """
+    get_pwd_context(policy).hash("warm-up")
+    return os.getpid()
+
+
+def hash_time_ms(policy: HashPolicy, samples: int = 3) -> float:
+    """
+    Median time to hash one password with `policy` on this machine
+    """
+    pwd_context = get_pwd_context(policy)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        pwd_context.hash("calibration-password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def calibrate(base: HashPolicy, target_ms: float, min_rounds: int, max_rounds: int, samples: int = 3) -> HashPolicy:
+    """
+    Highest cost between `min_rounds` (the security floor) and `max_rounds`
+    whose hash time on this machine stays within `target_ms`. The floor wins
+    when even it is slower than the target.
+    """
+    rounds = min_rounds
+    while rounds < max_rounds and hash_time_ms(dataclasses.replace(base, rounds=rounds + 1), samples) <= target_ms:
+        rounds += 1
+    return dataclasses.replace(base, rounds=rounds, max_rounds=max_rounds)
+
+
+def cpu_limit() -> int:
+    """
+    Number of CPUs this process may use, honouring the container CPU quota.
+    A 500m limit counts as one CPU.
+    """
+    # cgroup v2
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class HasherSaturatedError(Exception):
+    """
+    Raised when the hashing executor already has its maximum number of jobs queued
+    """
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for password hashing and verification.
+
+    bcrypt and argon2 are deliberately slow, so they must not run on the event
+    loop thread. Jobs beyond `max_workers + queue_depth` are rejected with
+    HasherSaturatedError instead of piling up behind each other.
+
+    With `target_ms`, warm_up() replaces the policy's cost with the one that
+    takes about that long on the worker processes (see calibrate()).
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        queue_depth: int = 16,
+        policy: Optional[HashPolicy] = None,
+        target_ms: float = 0
+    ):
+        self.max_workers = max_workers or cpu_limit()
+        self.queue_depth = queue_depth
+        self.policy = policy or HashPolicy.from_settings()
+        self.target_ms = target_ms
+        # (policy, hash of a random password) for fake_verify()
+        self._dummy: Optional[Tuple[HashPolicy, str]] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_depth
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _submit(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self._pending >= self.capacity:
+            raise HasherSaturatedError("Password hashing capacity exhausted")
+        return await self._run(operation, fn, *args)
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        self._pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            self._executor = None
+            raise
+        finally:
+            PASSWORD_HASH_DURATION.labels(operation).observe(time.perf_counter() - start)
+            PASSWORD_HASH_PENDING.dec()
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password without blocking the event loop
+        """
+        return await self._submit("hash", hash_password, password, self.policy)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password without blocking the event loop
+        """
+        return await self._submit("verify", check_password, plain_password, hashed_password, self.policy)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and get a replacement hash when the stored one is
+        weaker than (or, for a fixed cost, different from) the current policy
+        """
+        return await self._submit("verify", verify_and_update, plain_password, hashed_password, self.policy)
+
+    async def fake_verify(self, plain_password: str) -> None:
+        """
+        Verify `plain_password` against a hash nobody has the password for,
+        at the current cost. Used for unknown emails, so they take as long
+        as a wrong password and timing doesn't reveal which emails exist.
+        """
+        if self._dummy is None or self._dummy[0] != self.policy:
+            policy = self.policy
+            self._dummy = (policy, await self._submit("hash", hash_password, secrets.token_urlsafe(16), policy))
+        await self._submit("verify", verify_and_update, plain_password, self._dummy[1], self._dummy[0])
+
+    async def hash_many(self, passwords: List[str], batch_size: int = 16) -> List[str]:
+        """
+        Hash many passwords across all workers. Work is sent in small batches with
+        at most one batch per worker in flight, so logins queued meanwhile are
+        served between batches instead of waiting for the whole import.
+        Results are returned in input order.
+        """
+        if not passwords:
+            return []
+
+        batches = [passwords[i:i + batch_size] for i in range(0, len(passwords), batch_size)]
+        slots = min(self.max_workers, len(batches))
+        # Reject up front rather than failing half way through
+        if self._pending + slots > self.capacity:
+            raise HasherSaturatedError("Password hashing capacity exhausted")
+
+        semaphore = asyncio.Semaphore(slots)
+
+        async def run_batch(batch: List[str]) -> List[str]:
+            async with semaphore:
+                return await self._run("hash_batch", hash_passwords, batch, self.policy)
+
+        results = await asyncio.gather(*[run_batch(batch) for batch in batches])
+        return [hashed for batch in results for hashed in batch]
+
+    async def warm_up(self) -> None:
+        """
+        Calibrate the cost if configured, then start every worker process and
+        load the hash backend in it, so the first logins don't pay for process
+        start-up and imports
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if self.target_ms:
+            # Measured in a worker: that is where hashing runs, under the same CPU limit
+            min_rounds, max_rounds = rounds_bounds(self.policy.scheme)
+            self.policy = await loop.run_in_executor(
+                executor, calibrate, self.policy, self.target_ms, min_rounds, max_rounds
+            )
+            logger.info("Password hashing calibrated to %s for a %d ms target", self.policy.describe(), self.target_ms)
+        # One job per worker; each takes long enough that no worker picks up two
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, warm_up_worker, self.policy) for _ in range(self.max_workers)
+        ])
+        self._dummy = (self.policy, await self._run("hash", hash_password, secrets.token_urlsafe(16), self.policy))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.HASH_WORKERS or None,
+    queue_depth=settings.HASH_QUEUE_DEPTH,
+    target_ms=settings.HASH_TARGET_MS,
+)
+
+
+if __name__ == "__main__":
+    # Calibration mode: print the cost that takes about TARGET_MS here (run it
+    # where the service runs, e.g. kubectl exec), to pin it in the deployment:
+    # python src/hashing.py 250
+    import sys
+
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    base = HashPolicy.from_settings()
+    policy = calibrate(base, target, *rounds_bounds(base.scheme))
+    setting = "ARGON2_TIME_COST" if policy.scheme == "argon2" else "BCRYPT_ROUNDS"
+    print(f"{setting}={policy.rounds}  # {hash_time_ms(policy):.0f} ms per hash, {policy.describe()}")
@@ -0,0 +1,181 @@
+# user-service/src/keys.py
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from config import settings
+from metrics import JWT_DURATION, timed
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "EdDSA")
+
+
+@dataclass
+class SigningKey:
+    kid: str
+    private_key: Any
+    public_key: Any
+
+
+def generate_private_key(algorithm: str) -> Any:
+    """
+    New private key for `algorithm` (RSA 2048 for RS*, Ed25519 for EdDSA)
+    """
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class KeyRing:
+    """
+    Keys used to sign and verify access tokens.
+
+    With an HS* algorithm the shared SECRET_KEY is used as before and no kid is
+    set. With RS256/EdDSA the private keys are read from JWT_KEYS_DIR, one
+    `<kid>.pem` file each. The active key (JWT_ACTIVE_KID, or the last kid in
+    sort order) signs new tokens; every key in the directory still verifies
+    and is published on the JWKS endpoint, so rotating is: add the new key
+    file, and remove the old one once tokens signed with it have expired.
+    The directory is re-read at most every JWT_KEYS_RELOAD_SECONDS.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        keys: List[SigningKey],
+        active_kid: Optional[str] = None,
+        directory: Optional[str] = None
+    ):
+        self.algorithm = algorithm
+        self.directory = directory
+        self._set_keys(keys, active_kid)
+        self._loaded_mtime = self._directory_mtime()
+        self._checked_at = time.monotonic()
+
+    @property
+    def symmetric(self) -> bool:
+        return self.algorithm.startswith("HS")
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        algorithm = settings.ALGORITHM
+        if algorithm.startswith("HS"):
+            return cls(algorithm, [SigningKey("", settings.SECRET_KEY, settings.SECRET_KEY)])
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+        if settings.JWT_KEYS_DIR:
+            return cls(algorithm, load_keys(settings.JWT_KEYS_DIR), settings.JWT_ACTIVE_KID, settings.JWT_KEYS_DIR)
+
+        # Fine for a single local process; replicas would each sign with a different key
+        logger.warning("JWT_KEYS_DIR is not set; signing with an ephemeral %s key", algorithm)
+        return cls.ephemeral(algorithm)
+
+    @classmethod
+    def ephemeral(cls, algorithm: str) -> "KeyRing":
+        private_key = generate_private_key(algorithm)
+        return cls(algorithm, [SigningKey(uuid.uuid4().hex, private_key, private_key.public_key())])
+
+    def _set_keys(self, keys: List[SigningKey], active_kid: Optional[str]) -> None:
+        if not keys:
+            raise ValueError("No JWT signing keys found")
+        self._keys = {key.kid: key for key in keys}
+        if active_kid is None:
+            active_kid = sorted(self._keys)[-1]
+        if active_kid not in self._keys:
+            raise ValueError(f"Active JWT key {active_kid!r} not found")
+        self.active = self._keys[active_kid]
+
+    def _directory_mtime(self) -> Optional[float]:
+        if not self.directory:
+            return None
+        try:
+            return os.stat(self.directory).st_mtime
+        except OSError:
+            return None
+
+    def maybe_reload(self) -> None:
+        """
+        Pick up added or removed key files; a failed reload keeps the current keys
+        """
+        if not self.directory or time.monotonic() - self._checked_at < settings.JWT_KEYS_RELOAD_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        mtime = self._directory_mtime()
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            self._set_keys(load_keys(self.directory), settings.JWT_ACTIVE_KID)
+            self._loaded_mtime = mtime
+            logger.info("Reloaded JWT keys, active kid %s", self.active.kid)
+        except (OSError, ValueError):
+            logger.exception("Reloading JWT keys failed; keeping the current keys")
+
+    @timed(JWT_DURATION, "encode")
+    def sign(self, claims: Dict[str, Any]) -> str:
+        self.maybe_reload()
+        headers = {"kid": self.active.kid} if self.active.kid else None
+        return jwt.encode(claims, self.active.private_key, algorithm=self.algorithm, headers=headers)
+
+    def verification_key(self, token: str) -> Any:
+        """
+        Key to check `token` with, chosen by its kid header. Raises jwt.InvalidTokenError
+        """
+        if self.symmetric:
+            return self.active.public_key
+        self.maybe_reload()
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return key.public_key
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Public keys as a JWK Set; empty for shared-secret algorithms
+        """
+        if self.symmetric:
+            return {"keys": []}
+        self.maybe_reload()
+        to_jwk = OKPAlgorithm.to_jwk if self.algorithm == "EdDSA" else RSAAlgorithm.to_jwk
+        return {
+            "keys": [
+                {**to_jwk(key.public_key, as_dict=True), "kid": kid, "use": "sig", "alg": self.algorithm}
+                for kid, key in sorted(self._keys.items())
+            ]
+        }
+
+
+def load_keys(directory: str) -> List[SigningKey]:
+    """
+    Read every `<kid>.pem` private key in `directory`
+    """
+    keys = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".pem"):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        keys.append(SigningKey(name[:-len(".pem")], private_key, private_key.public_key()))
+    return keys
+
+
+if __name__ == "__main__":
+    # Print a new PEM private key, e.g. python src/keys.py EdDSA > keys/2026-10-17.pem
+    import sys
+
+    new_key = generate_private_key(sys.argv[1] if len(sys.argv) > 1 else "RS256")
+    sys.stdout.write(new_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode())
@@ -1,27 +1,141 @@
 # user-service/src/main.py
-from fastapi import FastAPI, HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
+import logging
 import os
+import secrets
+import hashlib
+import json
+import math
 from datetime import datetime, timedelta
 import jwt
-from passlib.context import CryptContext
 
-from models import User, UserCreate, UserUpdate, UserResponse, LoginRequest, TokenResponse
-from database import get_db, engine, Base
-from crud import UserCRUD
+from models import (
+    User, UserCreate, UserUpdate, UserResponse, UserPage, LoginRequest, RefreshRequest, TokenResponse, TokenClaims,
+    UserBatchResponse, BulkUserRequest, BulkUserResult, BulkUserResponse, USER_RESPONSE_COLUMNS
+)
+from database import get_db, async_engine, AsyncSessionLocal, replica_router, Base, pool_stats, warm_up_pool
+from crud import AsyncUserCRUD
 from config import settings
+from hashing import check_password, hash_password, password_hasher, HasherSaturatedError
+from cache import UserCache
+from ratelimit import LoginRateLimiter, RateLimitedError
+from outbox import OutboxRelay
+from sessions import RefreshTokenError, SessionStore
+from tokens import token_verifier
+from grpc_server import UserServicer, start_grpc_server
+import metrics
+from pagination import encode_cursor, decode_cursor
+from export import EXPORT_COLUMNS, ndjson_chunks, csv_chunks, gzip_chunks
+
+logger = logging.getLogger(__name__)
+
+user_cache = UserCache.from_settings()
+user_crud = AsyncUserCRUD(cache=user_cache, router=replica_router)
+login_limiter = LoginRateLimiter.from_settings()
+session_store = SessionStore(timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+grpc_server = None
+outbox_relay = None
+# Startup work that must finish before /ready reports ready
+readiness = {"database": False, "password_hasher": False}
+background_tasks = set()
+
+async def warm_up_database():
+    # Retried until the database is reachable; /health stays green meanwhile so
+    # the pod isn't restarted, but it receives no traffic until this succeeds
+    connections = settings.DB_POOL_SIZE if settings.DB_POOL_WARMUP and settings.DB_POOL_MODE == "queue" else 1
+    delay = 0.5
+    while True:
+        try:
+            await warm_up_pool(async_engine, connections)
+            break
+        except Exception:
+            logger.warning("Database warm-up failed, retrying in %.1fs", delay, exc_info=True)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+    readiness["database"] = True
+
+async def warm_up_password_hasher():
+    await password_hasher.warm_up()
+    readiness["password_hasher"] = True
+
+async def warm_up_validation():
+    # The first email validation loads idna tables; do it off the request path
+    await asyncio.to_thread(
+        UserCreate, email="warm-up@example.com", password="warm-up-password", first_name="Warm", last_name="Up"
+    )
+
+async def prune_refresh_sessions(interval: float):
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                pruned = await session_store.prune(db)
+            if pruned:
+                logger.info("Pruned %d expired refresh sessions", pruned)
+        except Exception:
+            logger.warning("Pruning refresh sessions failed, retrying in %.0fs", interval, exc_info=True)
+        await asyncio.sleep(interval)
+
+def start_background_task(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global grpc_server, outbox_relay
+    # The schema is owned by Alembic (alembic upgrade head); creating it here is
+    # only for local development and tests, and races when several pods start
+    if settings.AUTO_CREATE_SCHEMA:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    start_background_task(warm_up_database())
+    start_background_task(warm_up_password_hasher())
+    start_background_task(warm_up_validation())
+    if replica_router:
+        start_background_task(replica_router.run_health_checks(settings.DB_REPLICA_HEALTH_INTERVAL_SECONDS))
+    if settings.REFRESH_SESSION_PRUNE_INTERVAL_SECONDS > 0:
+        start_background_task(prune_refresh_sessions(settings.REFRESH_SESSION_PRUNE_INTERVAL_SECONDS))
+    outbox_relay = OutboxRelay.from_settings(AsyncSessionLocal)
+    if outbox_relay:
+        start_background_task(outbox_relay.run())
+    # Runs on the same event loop as the REST API and shares its CRUD layer and cache
+    if settings.GRPC_ENABLED:
+        grpc_server, _ = await start_grpc_server(UserServicer(user_crud))
+
+    yield
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+    for task in list(background_tasks):
+        task.cancel()
+    if grpc_server is not None:
+        await grpc_server.stop(settings.GRPC_SHUTDOWN_GRACE_SECONDS)
+    password_hasher.shutdown()
+    if user_cache:
+        await user_cache.close()
+    if login_limiter:
+        await login_limiter.close()
+    if outbox_relay:
+        await outbox_relay.close()
+    await async_engine.dispose()
+    await replica_router.dispose()
+    metrics.mark_process_dead()
 
 app = FastAPI(
     title="User Service",
     description="Microservice for user management and authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -33,16 +147,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight requests
+app.add_middleware(metrics.PrometheusMiddleware)
+
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-user_crud = UserCRUD()
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+@app.exception_handler(HasherSaturatedError)
+async def hasher_saturated_handler(request: Request, exc: HasherSaturatedError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service is busy, please retry"},
+        headers={"Retry-After": str(settings.HASH_RETRY_AFTER_SECONDS)}
+    )
+
+@app.exception_handler(RateLimitedError)
+async def rate_limited_handler(request: Request, exc: RateLimitedError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many login attempts, please retry later"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -51,97 +183,354 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = token_verifier.keyring.sign(to_encode)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def token_claims(user: User) -> dict:
+    """
+    Claims for a user's access token; user state is only embedded when JWT_EMBED_CLAIMS is on
+    """
+    claims = {"sub": str(user.id)}
+    if settings.JWT_EMBED_CLAIMS:
+        claims.update({"is_active": user.is_active, "is_verified": user.is_verified})
+    return claims
+
+# async so it runs on the event loop: no threadpool hop, and the token cache
+# is only ever touched from one thread
+async def verify_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials"
-            )
-        return user_id
+        payload = token_verifier.verify(credentials.credentials)
     except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    return payload
+
+async def verify_token(payload: dict = Depends(verify_payload)) -> str:
+    return payload["sub"]
+
+def verify_admin(api_key: Optional[str] = Depends(admin_key_header)):
+    # Admin endpoints are disabled unless ADMIN_API_KEY is configured
+    if not settings.ADMIN_API_KEY or not api_key or not secrets.compare_digest(api_key, settings.ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "user-service"}
 
+@app.get("/ready")
+async def readiness_check():
+    if not all(readiness.values()):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "starting", "checks": readiness}
+        )
+    return {"status": "ready", "checks": readiness}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    # Sync route: aggregating worker files in multiprocess mode does file I/O
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    # Other services fetch this once and verify tokens locally (e.g. jwt.PyJWKClient)
+    body = json.dumps(token_verifier.keyring.jwks(), separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user with similar email exists
-    existing_user = user_crud.get_user_by_email(db, user.email)
+    existing_user = await user_crud.get_user_by_email(db, user.email, use_cache=False, use_replica=False)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Hash the password
-    hashed_password = get_password_hash(user.password)
-    user_data = user.dict()
+    # Hash the password (off the event loop)
+    hashed_password = await password_hasher.hash(user.password)
+    user_data = user.model_dump()
     user_data["password"] = hashed_password
     
     # Create new user
-    db_user = user_crud.create_user(db, user_data)
-    return UserResponse.from_orm(db_user)
+    db_user = await user_crud.create_user(db, user_data)
+    return UserResponse.model_validate(db_user)
 
 @app.post("/auth/login", response_model=TokenResponse)
-async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
-    # Find user
-    user = user_crud.get_user_by_email(db, login_data.email)
-    if not user or not verify_password(login_data.password, user.password):
+async def login_user(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    # Before any query or hashing, so a flood of attempts stays cheap. Behind a
+    # proxy, run uvicorn with --forwarded-allow-ips so request.client is the caller
+    if login_limiter:
+        await login_limiter.check(request.client.host if request.client else None, login_data.email)
+
+    # Find user (the cache holds no password hashes; replicas may lag behind a registration)
+    user = await user_crud.get_user_by_email(db, login_data.email, use_cache=False, use_replica=False)
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(login_data.password, user.password)
+    else:
+        # Costs the same as a wrong password, so response time doesn't reveal unknown emails
+        await password_hasher.fake_verify(login_data.password)
+        valid, new_hash = False, None
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+
+    # The stored hash uses an older scheme or cost; only now do we have the password to upgrade it
+    if new_hash:
+        await user_crud.update_user(db, user.id, {"password": new_hash})
     
-    # Create token
+    # Create tokens; the refresh token lets the client renew the access token without a password verify
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
+    refresh_token = await session_store.create(db, user.id)
+    metrics.TOKENS_ISSUED.labels("password").inc()
     
-    return TokenResponse(access_token=access_token, token_type="bearer")
+    return TokenResponse(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+@app.post("/auth/refresh", response_model=TokenResponse)
+async def refresh_access_token(refresh: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    # Costs a session lookup and update and a (usually cached) user read; no password hashing
+    try:
+        user_id, refresh_token = await session_store.rotate(db, refresh.refresh_token)
+    except RefreshTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+    user = await user_crud.get_user(db, user_id)
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
+    access_token = create_access_token(
+        data=token_claims(user), expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    metrics.TOKENS_ISSUED.labels("refresh").inc()
+    return TokenResponse(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+@app.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(refresh: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    # Ends the refresh session; the current access token stays valid until it expires
+    try:
+        await session_store.revoke(db, refresh.refresh_token)
+    except RefreshTokenError:
+        pass
+
+@app.get("/admin/cache", dependencies=[Depends(verify_admin)])
+async def cache_stats():
+    return user_cache.stats() if user_cache else {"enabled": False}
+
+@app.get("/admin/rate-limit", dependencies=[Depends(verify_admin)])
+async def rate_limit_stats():
+    return login_limiter.stats() if login_limiter else {"enabled": False}
+
+@app.get("/admin/pool", dependencies=[Depends(verify_admin)])
+async def database_pool_stats():
+    return {**pool_stats(async_engine), "replicas": replica_router.stats()}
+
+@app.post("/users/bulk", response_model=BulkUserResponse, dependencies=[Depends(verify_admin)])
+async def bulk_upsert_users(request: BulkUserRequest, db: AsyncSession = Depends(get_db)):
+    if len(request.users) > settings.BULK_MAX_RECORDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_RECORDS} records per request"
+        )
+
+    # Validate each record on its own; only the first occurrence of an email is written
+    results: List[Optional[BulkUserResult]] = [None] * len(request.users)
+    valid = []
+    seen = set()
+    for index, record in enumerate(request.users):
+        try:
+            user = UserCreate(**record)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results[index] = BulkUserResult(index=index, email=record.get("email"), status="invalid", error=error)
+            continue
+        if user.email in seen:
+            results[index] = BulkUserResult(index=index, email=user.email, status="duplicate", error="Email repeated in request")
+            continue
+        seen.add(user.email)
+        valid.append((index, user))
+
+    # In insert mode existing users are left alone, so don't pay for hashing their passwords
+    if request.mode == "insert" and valid:
+        existing = await user_crud.get_user_ids_by_email(db, [user.email for _, user in valid])
+        for index, user in valid:
+            if user.email in existing:
+                results[index] = BulkUserResult(index=index, email=user.email, status="skipped", id=existing[user.email])
+        valid = [(index, user) for index, user in valid if user.email not in existing]
+
+    hashed_passwords = await password_hasher.hash_many([user.password for _, user in valid])
+    records = [
+        # Only the fields the record sets, so an upsert doesn't reset the others to defaults
+        {**user.model_dump(exclude_unset=True), "password": hashed_password}
+        for (_, user), hashed_password in zip(valid, hashed_passwords)
+    ]
+    outcomes = await user_crud.bulk_upsert(
+        db, records, update_existing=request.mode == "upsert", chunk_size=settings.BULK_CHUNK_SIZE
+    )
+    for (index, _), outcome in zip(valid, outcomes):
+        results[index] = BulkUserResult(index=index, **outcome)
+
+    counts = {status_name: 0 for status_name in ("created", "updated", "skipped")}
+    for result in results:
+        if result.status in counts:
+            counts[result.status] += 1
+    return BulkUserResponse(
+        **counts,
+        failed=len(results) - sum(counts.values()),
+        results=results
+    )
+
+@app.get("/auth/verify", response_model=TokenClaims)
+async def verify_access_token(payload: dict = Depends(verify_payload), db: AsyncSession = Depends(get_db)):
+    # Fast path for internal callers: with embedded claims there is no DB hit at all
+    if settings.JWT_EMBED_CLAIMS and "is_active" in payload and "is_verified" in payload:
+        return TokenClaims(id=int(payload["sub"]), is_active=payload["is_active"], is_verified=payload["is_verified"])
+
+    user = await user_crud.get_user(db, int(payload["sub"]))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    return TokenClaims(id=user.id, is_active=user.is_active, is_verified=user.is_verified)
 
 @app.get("/users/me", response_model=UserResponse)
-async def get_current_user(current_user_id: str = Depends(verify_token), db: Session = Depends(get_db)):
-    user = user_crud.get_user(db, int(current_user_id))
+async def get_current_user(current_user_id: str = Depends(verify_token), db: AsyncSession = Depends(get_db)):
+    user = await user_crud.get_user(db, int(current_user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return UserResponse.from_orm(user)
+    return UserResponse.model_validate(user)
+
+@app.get("/users", response_model=Union[UserPage, List[UserResponse]])
+async def get_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    pagination: Literal["offset", "keyset"] = "offset",
+    cursor: Optional[str] = None,
+    active_only: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    # Rows are selected column by column and encoded straight to JSON: the columns
+    # match UserResponse, so building and re-validating models per row is skipped.
+    # response_model above only documents the shape
+
+    # Offset mode (a plain list) is kept for existing clients
+    if pagination == "offset" and cursor is None:
+        rows = await user_crud.get_user_rows(db, USER_RESPONSE_COLUMNS, skip=skip, limit=limit, active_only=active_only)
+        return ORJSONResponse(rows)
+
+    # Keyset mode: fetch one extra row to know whether there is a next page
+    try:
+        after_id = decode_cursor(cursor) or 0
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    rows = await user_crud.get_user_rows(
+        db, USER_RESPONSE_COLUMNS, limit=limit + 1, after_id=after_id, active_only=active_only
+    )
+    next_cursor = encode_cursor(rows[limit - 1]["id"]) if len(rows) > limit else None
+    return ORJSONResponse({"items": rows[:limit], "next_cursor": next_cursor})
+
+@app.get("/users:batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user ids"),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        user_ids = [int(user_id) for user_id in ids.split(",") if user_id.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if len(user_ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_IDS} ids per request"
+        )
+
+    users = await user_crud.get_users_by_ids(db, user_ids)
+    # Encoded directly like GET /users; response_model only documents the shape
+    return ORJSONResponse({"results": [
+        {
+            "id": user_id,
+            "found": user is not None,
+            "user": {column: getattr(user, column) for column in USER_RESPONSE_COLUMNS} if user else None,
+        }
+        for user_id, user in zip(user_ids, users)
+    ]})
+
+@app.get("/users/export", dependencies=[Depends(verify_admin)])
+async def export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    updated_since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # Rows are streamed from a server-side cursor, so memory use doesn't grow with
+    # the table. The session stays open until the response has been sent.
+    rows = user_crud.stream_users(
+        db, EXPORT_COLUMNS, updated_since=updated_since, batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    if format == "csv":
+        body, media_type = csv_chunks(rows), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(rows), "application/x-ndjson"
 
-@app.get("/users", response_model=List[UserResponse])
-async def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = user_crud.get_users(db, skip=skip, limit=limit)
-    return [UserResponse.from_orm(user) for user in users]
+    headers = {"Content-Disposition": f'attachment; filename="users.{format}"'}
+    if gzip:
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
 
 @app.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = user_crud.get_user(db, user_id)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await user_crud.get_user(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return UserResponse.from_orm(user)
+    return UserResponse.model_validate(user)
 
 @app.put("/users/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int, 
     user_update: UserUpdate, 
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check access (user can only edit their own information)
     if int(current_user_id) != user_id:
@@ -150,21 +539,21 @@ async def update_user(
             detail="Not enough permissions"
         )
     
-    user = user_crud.get_user(db, user_id)
+    user = await user_crud.get_user(db, user_id, use_replica=False)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    updated_user = user_crud.update_user(db, user_id, user_update.dict(exclude_unset=True))
-    return UserResponse.from_orm(updated_user)
+    updated_user = await user_crud.update_user(db, user_id, user_update.model_dump(exclude_unset=True))
+    return UserResponse.model_validate(updated_user)
 
 @app.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Check access
     if int(current_user_id) != user_id:
@@ -173,14 +562,14 @@ async def delete_user(
             detail="Not enough permissions"
         )
     
-    user = user_crud.get_user(db, user_id)
+    user = await user_crud.get_user(db, user_id, use_replica=False)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user_crud.delete_user(db, user_id)
+    await user_crud.delete_user(db, user_id)
 
 if __name__ == "__main__":
     uvicorn.run(
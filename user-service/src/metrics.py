@@ -0,0 +1,233 @@
+# user-service/src/metrics.py
+"""
+Prometheus metrics for the user service.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers (it must exist before they start); /metrics
+then aggregates all of them. Without it the default in-process registry is used.
+"""
+import functools
+import os
+import time
+from typing import Any, Callable
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from starlette.routing import Match
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Sub-millisecond buckets for cache hits and JWT checks, up to seconds for bcrypt and slow queries
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_READS = Counter(
+    "db_reads_total",
+    "Read-only CRUD queries by where they ran",
+    ["target"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connections held by the pool (open) and lent to sessions (checked_out)",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Password hashing and verification time, including the wait for a hashing worker",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Hashing jobs running or queued",
+    multiprocess_mode="livesum",
+)
+JWT_DURATION = Histogram(
+    "jwt_duration_seconds",
+    "JWT signing and full verification time",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+TOKENS_ISSUED = Counter(
+    "auth_tokens_issued_total",
+    "Access tokens issued, by grant: password (a login, with a password verify) or refresh (no hashing)",
+    ["grant"],
+)
+LOGIN_RATE_LIMITED = Counter(
+    "login_rate_limited_total",
+    "Login attempts rejected by the rate limiter, by the limit that was exhausted",
+    ["limit"],
+)
+OUTBOX_PUBLISHED = Counter(
+    "outbox_events_published_total",
+    "User events published from the outbox",
+)
+OUTBOX_PUBLISH_FAILURES = Counter(
+    "outbox_publish_failures_total",
+    "Outbox relay batches that failed and will be retried",
+)
+TOKEN_CACHE_HITS = Counter(
+    "jwt_cache_hits_total",
+    "Token verifications answered from the token cache",
+)
+
+
+def render() -> bytes:
+    """
+    Current metrics in the Prometheus text format, aggregated across workers in multiprocess mode
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """
+    Drop this worker's live gauges from the shared directory; call on shutdown
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def timed(histogram: Histogram, operation: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator recording the wall time of a sync function under `operation`
+    """
+    child = histogram.labels(operation)
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _route_template(scope: dict) -> str:
+    # Label by route template ("/users/{user_id}"), never the raw path, to keep cardinality bounded
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording per-route latency and in-flight requests.
+    Latency runs until the last body chunk is sent, so streaming responses are
+    measured in full.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
+            in_progress.dec()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        operation = "OTHER"
+    DB_QUERY_DURATION.labels(operation).observe(elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # after_cursor_execute doesn't run for a failed statement
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for (or opened) a connection
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_pool(pool: Pool) -> None:
+    """
+    Keep the db_pool_connections gauges in step with `pool`
+    """
+    open_connections = DB_POOL_CONNECTIONS.labels("open")
+    checked_out = DB_POOL_CONNECTIONS.labels("checked_out")
+    event.listen(pool, "connect", lambda *_: open_connections.inc())
+    event.listen(pool, "close", lambda *_: open_connections.dec())
+    event.listen(pool, "close_detached", lambda *_: open_connections.dec())
+    event.listen(pool, "checkout", lambda *_: checked_out.inc())
+    event.listen(pool, "checkin", lambda *_: checked_out.dec())
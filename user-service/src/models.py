@@ -1,11 +1,10 @@
 # user-service/src/models.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from pydantic import BaseModel, EmailStr, validator
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, text
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
-Base = declarative_base()
+from database import Base
 
 # SQLAlchemy Models
 class User(Base):
@@ -20,7 +19,42 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        # Partial index for keyset pages over active users (see alembic 0002)
+        Index(
+            "ix_users_active_id", "id",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1"),
+        ),
+    )
+
+class RefreshSession(Base):
+    """
+    One login session: the hash of its current refresh token, replaced on every refresh
+    """
+    __tablename__ = "refresh_sessions"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class OutboxEvent(Base):
+    """
+    A user event waiting to be published, written in the same transaction as
+    the change it describes; the outbox relay publishes and deletes it
+    """
+    __tablename__ = "user_events_outbox"
+
+    id = Column(Integer, primary_key=True)  # Publish order, and the event id consumers dedupe on
+    event_type = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=False)  # No foreign key: user.deleted outlives the user
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 # Pydantic Models for API
 class UserBase(BaseModel):
@@ -33,13 +67,15 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
     
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password(cls, v):
         if len(v) < 8:
             raise ValueError('Password must be at least 8 characters long')
         return v
     
-    @validator('first_name', 'last_name')
+    @field_validator('first_name', 'last_name')
+    @classmethod
     def validate_names(cls, v):
         if len(v.strip()) < 2:
             raise ValueError('Name must be at least 2 characters long')
@@ -51,13 +87,16 @@ class UserUpdate(BaseModel):
     phone: Optional[str] = None
     is_active: Optional[bool] = None
     
-    @validator('first_name', 'last_name')
+    @field_validator('first_name', 'last_name')
+    @classmethod
     def validate_names(cls, v):
         if v is not None and len(v.strip()) < 2:
             raise ValueError('Name must be at least 2 characters long')
         return v.strip().title() if v else v
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     email: str
     first_name: str
@@ -68,13 +107,54 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+# Columns selected for list endpoints, which encode rows directly instead of building UserResponse objects
+USER_RESPONSE_COLUMNS: List[str] = list(UserResponse.model_fields)
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+class UserBatchResult(BaseModel):
+    id: int
+    found: bool
+    user: Optional[UserResponse] = None
+
+class UserBatchResponse(BaseModel):
+    # One result per requested id, in request order
+    results: List[UserBatchResult]
+
+class BulkUserRequest(BaseModel):
+    # Records are validated one by one so a bad record doesn't fail the batch
+    users: List[Dict[str, Any]]
+    mode: Literal["upsert", "insert"] = "upsert"
+
+class BulkUserResult(BaseModel):
+    index: int
+    email: Optional[str] = None
+    status: Literal["created", "updated", "skipped", "duplicate", "invalid"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkUserResponse(BaseModel):
+    created: int
+    updated: int
+    skipped: int
+    failed: int
+    results: List[BulkUserResult]
 
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+class TokenClaims(BaseModel):
+    id: int
+    is_active: bool
+    is_verified: bool
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenResponse(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+    refresh_token: Optional[str] = None
\ No newline at end of file
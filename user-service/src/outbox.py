@@ -0,0 +1,236 @@
+# user-service/src/outbox.py
+"""
+User events for the rest of the platform, through a transactional outbox.
+
+AsyncUserCRUD/UserCRUD add an OutboxEvent row in the same transaction as the
+user change it describes, so an event exists exactly when the change was
+committed. OutboxRelay then publishes the rows in id order, in batches, and
+deletes them. Published events look like
+
+    {"event_id": 42, "type": "user.deactivated", "user_id": 7,
+     "occurred_at": "2026-10-17T14:00:00.123456",
+     "data": {"id": 7, "email": "...", "is_active": false, "is_verified": true}}
+
+Delivery is at least once: a crash between publishing a batch and deleting
+it publishes the batch again, so consumers dedupe on event_id. `data` is the
+user's state after the change, so applying events to a local cache is
+idempotent as well.
+
+Ordering is by event_id only, and event_id is not commit order: the id is
+taken when the row is inserted, so a transaction that commits late can have
+its event published after events with higher ids. Consumers must not treat
+the highest event_id seen as a watermark.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from metrics import OUTBOX_PUBLISHED, OUTBOX_PUBLISH_FAILURES
+from models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+USER_CREATED = "user.created"
+USER_VERIFIED = "user.verified"
+USER_DEACTIVATED = "user.deactivated"
+USER_DELETED = "user.deleted"
+
+# User fields carried in every event
+EVENT_FIELDS = ("id", "email", "is_active", "is_verified")
+
+# Postgres advisory lock key held while a relay publishes a batch ("user_out")
+RELAY_LOCK_KEY = 0x757365725F6F7574
+
+
+def user_event(event_type: str, user: Any) -> OutboxEvent:
+    """
+    Outbox row for an event about `user` (a User, or a dict with EVENT_FIELDS)
+    """
+    if isinstance(user, dict):
+        data = {field: user[field] for field in EVENT_FIELDS}
+    else:
+        data = {field: getattr(user, field) for field in EVENT_FIELDS}
+    return OutboxEvent(event_type=event_type, user_id=data["id"], payload=json.dumps(data))
+
+
+def envelope(event: OutboxEvent) -> Dict[str, Any]:
+    """
+    The published form of an outbox row
+    """
+    return {
+        "event_id": event.id,
+        "type": event.event_type,
+        "user_id": event.user_id,
+        "occurred_at": event.created_at.isoformat(),
+        "data": json.loads(event.payload),
+    }
+
+
+class FilePublisher:
+    """
+    Appends events to a file as NDJSON; the local stand-in for a broker
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, lines: str) -> None:
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(event) + "\n" for event in events)
+        await asyncio.to_thread(self._append, lines)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisStreamPublisher:
+    """
+    Adds events to a Redis stream (one XADD per event, one round trip per
+    batch), trimmed to about `maxlen` entries
+    """
+
+    def __init__(self, redis: Any, stream: str, maxlen: int):
+        self.redis = redis
+        self.stream = stream
+        self.maxlen = maxlen
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(self.stream, {"event": json.dumps(event)}, maxlen=self.maxlen, approximate=True)
+        await pipe.execute()
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+class KafkaPublisher:
+    """
+    Sends events to a Kafka topic keyed by user id, so each user's events land
+    on one partition in the order published. aiokafka is imported on first use.
+    """
+
+    def __init__(self, bootstrap_servers: str, topic: str):
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.producer = None
+
+    async def publish(self, events: List[Dict[str, Any]]) -> None:
+        if self.producer is None:
+            from aiokafka import AIOKafkaProducer
+            producer = AIOKafkaProducer(
+                bootstrap_servers=self.bootstrap_servers, acks="all", enable_idempotence=True, linger_ms=5
+            )
+            await producer.start()
+            self.producer = producer
+        # Queue the whole batch, then wait for every acknowledgement
+        sent = [
+            await self.producer.send(self.topic, json.dumps(event).encode(), key=str(event["user_id"]).encode())
+            for event in events
+        ]
+        await asyncio.gather(*sent)
+
+    async def close(self) -> None:
+        if self.producer is not None:
+            await self.producer.stop()
+
+
+def publisher_from_settings() -> Any:
+    if settings.OUTBOX_PUBLISHER == "file":
+        return FilePublisher(settings.OUTBOX_FILE_PATH)
+    if settings.OUTBOX_PUBLISHER == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("OUTBOX_PUBLISHER=redis needs REDIS_URL")
+        from redis import asyncio as aioredis
+        return RedisStreamPublisher(
+            aioredis.from_url(settings.REDIS_URL), settings.OUTBOX_REDIS_STREAM, settings.OUTBOX_STREAM_MAXLEN
+        )
+    if settings.OUTBOX_PUBLISHER == "kafka":
+        return KafkaPublisher(settings.KAFKA_BOOTSTRAP_SERVERS, settings.OUTBOX_KAFKA_TOPIC)
+    raise ValueError(f"Unknown OUTBOX_PUBLISHER: {settings.OUTBOX_PUBLISHER}")
+
+
+class OutboxRelay:
+    """
+    Publishes outbox events in batches of up to `batch_size`, oldest first,
+    and deletes them once the publisher has accepted them.
+
+    Every worker and pod can run a relay. On Postgres a batch is published
+    under a transaction-scoped advisory lock, so only one relay publishes at
+    a time; the others find the lock taken and wait for the next poll. Each
+    batch is in event_id order, but an event committed after its batch was
+    read goes out in a later one, behind higher ids (see the module docstring).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        publisher: Any,
+        batch_size: int = 500,
+        interval: float = 1.0
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.interval = interval
+
+    async def _acquire(self, db: AsyncSession) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return True
+        result = await db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RELAY_LOCK_KEY})
+        return bool(result.scalar())
+
+    async def run_once(self) -> int:
+        """
+        Publish one batch; returns the number of events published
+        """
+        async with self.session_factory() as db:
+            if not await self._acquire(db):
+                return 0
+            events = list((await db.execute(
+                select(OutboxEvent).order_by(OutboxEvent.id).limit(self.batch_size)
+            )).scalars())
+            if not events:
+                return 0
+            await self.publisher.publish([envelope(event) for event in events])
+            await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events])))
+            await db.commit()
+        OUTBOX_PUBLISHED.inc(len(events))
+        return len(events)
+
+    async def run(self) -> None:
+        """
+        Publish until cancelled: straight on after a full batch, otherwise
+        after `interval` seconds
+        """
+        while True:
+            try:
+                published = await self.run_once()
+            except Exception:
+                OUTBOX_PUBLISH_FAILURES.inc()
+                logger.warning("Publishing user events failed, retrying in %.1fs", self.interval, exc_info=True)
+                published = 0
+            if published < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        await self.publisher.close()
+
+    @classmethod
+    def from_settings(cls, session_factory: async_sessionmaker) -> Optional["OutboxRelay"]:
+        if not settings.OUTBOX_RELAY_ENABLED:
+            return None
+        return cls(
+            session_factory,
+            publisher_from_settings(),
+            settings.OUTBOX_BATCH_SIZE,
+            settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        )
@@ -0,0 +1,31 @@
+# user-service/src/pagination.py
+import base64
+import binascii
+import json
+from typing import Optional
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Build an opaque cursor pointing after the row with id `last_id`
+    """
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Return the id a cursor points after, or None for the first page.
+    Raises ValueError for a malformed cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Invalid pagination cursor")
+    return last_id
@@ -0,0 +1,181 @@
+# user-service/src/ratelimit.py
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from metrics import LOGIN_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+# Token bucket in one round trip: refill for the time elapsed, take a token if
+# there is one, and expire the bucket once it would be full again anyway.
+# Returns the seconds until a token is available (0 = allowed) as a string,
+# since Lua numbers are truncated to integers on the way out
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+def _digest(key: str) -> int:
+    # 8-byte digest instead of the email/IP string: compact, and no plain
+    # emails in memory dumps or Redis
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class RateLimitedError(Exception):
+    """
+    Raised when a login attempt is over its rate limit
+    """
+
+    def __init__(self, retry_after: float, limit: str):
+        super().__init__(f"Too many login attempts ({limit})")
+        self.retry_after = retry_after
+        self.limit = limit
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key: `capacity` attempts at once, refilled at
+    `per_second`.
+
+    Buckets live in process, at most `max_keys` of them in least recently used
+    order (a dropped bucket starts full again), or in Redis when a client is
+    given so the limit holds across pods. Redis failures are logged and fall
+    back to the in-process buckets.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: float,
+        per_second: float,
+        max_keys: int = 100000,
+        redis: Any = None,
+        prefix: str = "user-service:ratelimit:"
+    ):
+        self.name = name
+        self.capacity = capacity
+        self.per_second = per_second
+        self.max_keys = max_keys
+        self.redis = redis
+        self.prefix = f"{prefix}{name}:"
+        # digest -> (tokens, last refill); dict order is recency order
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT) if redis is not None else None
+        self.redis_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire_local(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Take a token for `key`; returns 0 if allowed, else seconds until one is available
+        """
+        now = time.monotonic() if now is None else now
+        digest = _digest(key)
+        tokens, updated = self._buckets.pop(digest, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.per_second
+        self._buckets[digest] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+        return retry_after
+
+    async def acquire(self, key: str) -> float:
+        """
+        acquire_local(), against the shared buckets in Redis when configured
+        """
+        if self._script is not None:
+            try:
+                result = await self._script(
+                    keys=[f"{self.prefix}{_digest(key):016x}"],
+                    args=[self.capacity, self.per_second, time.time()],
+                )
+                return float(result)
+            except Exception:
+                self.redis_errors += 1
+                logger.warning("Rate limiter %s: Redis failed, using in-process buckets", self.name, exc_info=True)
+        return self.acquire_local(key)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"keys": len(self._buckets), "max_keys": self.max_keys}
+        if self.redis is not None:
+            stats["redis_errors"] = self.redis_errors
+        return stats
+
+
+class LoginRateLimiter:
+    """
+    Login attempts limited per client IP and per email. Checked before the
+    user lookup and password verify, so a flood of attempts costs neither a
+    query nor a hash.
+    """
+
+    def __init__(self, by_ip: TokenBucketLimiter, by_email: TokenBucketLimiter, redis: Any = None):
+        self.by_ip = by_ip
+        self.by_email = by_email
+        self.redis = redis
+
+    @classmethod
+    def from_settings(cls) -> Optional["LoginRateLimiter"]:
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return None
+        redis = None
+        if settings.LOGIN_RATE_LIMIT_BACKEND == "redis":
+            if not settings.REDIS_URL:
+                raise ValueError("LOGIN_RATE_LIMIT_BACKEND=redis needs REDIS_URL")
+            from redis import asyncio as aioredis
+            redis = aioredis.from_url(settings.REDIS_URL)
+        max_keys = settings.LOGIN_RATE_LIMIT_MAX_KEYS
+        return cls(
+            TokenBucketLimiter("ip", settings.LOGIN_IP_BURST, settings.LOGIN_IP_PER_MINUTE / 60, max_keys, redis),
+            TokenBucketLimiter("email", settings.LOGIN_EMAIL_BURST, settings.LOGIN_EMAIL_PER_MINUTE / 60, max_keys, redis),
+            redis,
+        )
+
+    async def check(self, ip: Optional[str], email: str) -> None:
+        """
+        Count one login attempt; raises RateLimitedError when either limit is exhausted
+        """
+        for limiter, key in ((self.by_ip, ip), (self.by_email, email.lower())):
+            if key is None:
+                continue
+            retry_after = await limiter.acquire(key)
+            if retry_after:
+                LOGIN_RATE_LIMITED.labels(limiter.name).inc()
+                raise RateLimitedError(retry_after, limiter.name)
+
+    def clear(self) -> None:
+        self.by_ip.clear()
+        self.by_email.clear()
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ip": self.by_ip.stats(), "email": self.by_email.stats()}
@@ -0,0 +1,121 @@
+# user-service/src/replicas.py
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Seconds behind the primary: 0 once everything received has been replayed
+# (an idle primary would otherwise look like growing lag), 0 on a primary
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """
+    Picks where a read-only query runs: the next healthy replica in round-robin
+    order, or the primary when there are no healthy replicas or the rows being
+    read were written recently.
+
+    Read-your-writes: writers call mark_written() with the cache-style keys
+    they touched (id:<n>, email:<e>); reads of those keys go to the primary for
+    `sticky_seconds`, which should exceed the expected replication lag. The
+    window is tracked per process.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        sticky_seconds: float = 10.0,
+        max_lag_seconds: float = 10.0,
+        max_sticky_keys: int = 100000
+    ):
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self._next = itertools.count()
+        self._recent_writes = LRUCache(max_sticky_keys, sticky_seconds)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def mark_written(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._recent_writes.set(key, True)
+
+    def pick(self, keys: Iterable[str] = ()) -> Optional[Replica]:
+        """
+        Replica for a read of `keys`, or None to read from the primary
+        """
+        if not self.replicas or any(self._recent_writes.get(key) for key in keys):
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def mark_unhealthy(self, replica: Replica, error: BaseException) -> None:
+        if replica.healthy:
+            logger.warning("Replica %s marked unhealthy: %s", replica.name, error)
+        replica.healthy = False
+        replica.last_error = str(error)
+
+    async def check(self, replica: Replica, timeout: float = 2.0) -> None:
+        """
+        Probe one replica; it is healthy if it answers within `timeout` and,
+        on Postgres, is less than max_lag_seconds behind the primary
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                async with replica.engine.connect() as conn:
+                    if conn.dialect.name == "postgresql":
+                        replica.lag = float((await conn.execute(REPLICA_LAG_QUERY)).scalar_one())
+                    else:
+                        await conn.execute(text("SELECT 1"))
+                        replica.lag = 0.0
+        except Exception as e:
+            self.mark_unhealthy(replica, e)
+            return
+
+        if replica.lag > self.max_lag_seconds:
+            self.mark_unhealthy(replica, RuntimeError(f"replication lag {replica.lag:.1f}s"))
+            return
+        if not replica.healthy:
+            logger.info("Replica %s is healthy again", replica.name)
+        replica.healthy = True
+        replica.last_error = None
+
+    async def run_health_checks(self, interval: float) -> None:
+        """
+        Probe all replicas every `interval` seconds until cancelled
+        """
+        while True:
+            await asyncio.gather(*[self.check(replica) for replica in self.replicas])
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag, "last_error": replica.last_error}
+            for replica in self.replicas
+        ]
@@ -0,0 +1,113 @@
+# user-service/src/sessions.py
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import RefreshSession
+
+
+class RefreshTokenError(Exception):
+    """
+    Raised for an unknown, expired, revoked or reused refresh token
+    """
+
+
+def _split(token: str) -> Tuple[str, str]:
+    session_id, _, secret = token.partition(".")
+    if not session_id or not secret:
+        raise RefreshTokenError("Malformed refresh token")
+    return session_id, secret
+
+
+def _hash(secret: str) -> str:
+    # The secret is 256 random bits, so a fast hash is enough; no password hashing
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+class SessionStore:
+    """
+    Refresh token sessions in the refresh_sessions table.
+
+    A refresh token is "<session id>.<secret>"; only a hash of the current
+    secret is stored. Every refresh replaces the secret (rotation), so a
+    token works once. Presenting an already rotated token means it was
+    copied, and the session is revoked for both parties.
+    """
+
+    def __init__(self, ttl: timedelta):
+        self.ttl = ttl
+
+    async def create(self, db: AsyncSession, user_id: int) -> str:
+        """
+        Start a session for `user_id`; returns its first refresh token
+        """
+        session_id, secret = secrets.token_urlsafe(16), secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        db.add(RefreshSession(
+            id=session_id,
+            user_id=user_id,
+            token_hash=_hash(secret),
+            created_at=now,
+            last_used_at=now,
+            expires_at=now + self.ttl,
+        ))
+        await db.commit()
+        return f"{session_id}.{secret}"
+
+    async def rotate(self, db: AsyncSession, token: str) -> Tuple[int, str]:
+        """
+        Exchange a refresh token for a new one; returns (user_id, new token)
+        """
+        session_id, secret = _split(token)
+        session = (await db.execute(
+            select(RefreshSession).where(RefreshSession.id == session_id)
+        )).scalar_one_or_none()
+        if session is None:
+            raise RefreshTokenError("Unknown refresh token")
+        if session.expires_at <= datetime.utcnow():
+            await self.revoke_session(db, session_id)
+            raise RefreshTokenError("Refresh token expired")
+        if not hmac.compare_digest(session.token_hash, _hash(secret)):
+            await self.revoke_session(db, session_id)
+            raise RefreshTokenError("Refresh token reused")
+
+        # Conditional on the old hash, so of two concurrent refreshes with the same token only one wins
+        new_secret = secrets.token_urlsafe(32)
+        result = await db.execute(
+            update(RefreshSession)
+            .where(RefreshSession.id == session_id, RefreshSession.token_hash == session.token_hash)
+            .values(token_hash=_hash(new_secret), last_used_at=datetime.utcnow())
+        )
+        await db.commit()
+        if result.rowcount != 1:
+            await self.revoke_session(db, session_id)
+            raise RefreshTokenError("Refresh token reused")
+        return session.user_id, f"{session_id}.{new_secret}"
+
+    async def revoke(self, db: AsyncSession, token: str) -> None:
+        """
+        End the session a refresh token belongs to (logout)
+        """
+        session_id, secret = _split(token)
+        await db.execute(
+            delete(RefreshSession).where(RefreshSession.id == session_id, RefreshSession.token_hash == _hash(secret))
+        )
+        await db.commit()
+
+    async def revoke_session(self, db: AsyncSession, session_id: str) -> None:
+        await db.execute(delete(RefreshSession).where(RefreshSession.id == session_id))
+        await db.commit()
+
+    async def prune(self, db: AsyncSession) -> int:
+        """
+        Delete expired sessions; returns how many. Abandoned sessions are never
+        presented again, so nothing else removes their rows
+        """
+        result = await db.execute(delete(RefreshSession).where(RefreshSession.expires_at < datetime.utcnow()))
+        await db.commit()
+        return result.rowcount
@@ -0,0 +1,57 @@
+# user-service/src/tokens.py
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+
+from cache import LRUCache
+from config import settings
+from keys import KeyRing
+from metrics import JWT_DURATION, TOKEN_CACHE_HITS, timed
+
+
+class TokenVerifier:
+    """
+    Verifies access tokens and remembers recently verified ones, so repeated
+    calls with the same token skip signature checking. Entries never outlive
+    the token's `exp`. Invalid tokens are never cached.
+    """
+
+    def __init__(self, keyring: KeyRing, cache_size: int = 10000, max_ttl: float = 300.0):
+        self.keyring = keyring
+        self.max_ttl = max_ttl
+        self.cache: Optional[LRUCache] = LRUCache(cache_size, max_ttl) if cache_size > 0 else None
+
+    @timed(JWT_DURATION, "decode")
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Full signature and expiry check. Raises jwt.PyJWTError
+        """
+        key = self.keyring.verification_key(token)
+        return jwt.decode(token, key, algorithms=[self.keyring.algorithm])
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Return the token's claims, from the cache when possible. Raises jwt.PyJWTError
+        """
+        if self.cache is None:
+            return self.decode(token)
+
+        claims = self.cache.get(token)
+        if claims is not None:
+            TOKEN_CACHE_HITS.inc()
+            return claims
+
+        claims = self.decode(token)
+        exp = claims.get("exp")
+        ttl = self.max_ttl if exp is None else min(self.max_ttl, exp - time.time())
+        if ttl > 0:
+            self.cache.set(token, claims, ttl)
+        return claims
+
+
+token_verifier = TokenVerifier(
+    KeyRing.from_settings(),
+    cache_size=settings.TOKEN_CACHE_SIZE,
+    max_ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: user.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nuser.proto\x12\x07user.v1\x1a\x1fgoogle/protobuf/timestamp.proto\"\xee\x01\n\x04User\x12\n\n\x02id\x18\x01 \x01(\x03\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x12\n\nfirst_name\x18\x03 \x01(\t\x12\x11\n\tlast_name\x18\x04 \x01(\t\x12\x12\n\x05phone\x18\x05 \x01(\tH\x00\x88\x01\x01\x12\x11\n\tis_active\x18\x06 \x01(\x08\x12\x13\n\x0bis_verified\x18\x07 \x01(\x08\x12.\n\ncreated_at\x18\x08 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12.\n\nupdated_at\x18\t \x01(\x0b\x32\x1a.google.protobuf.TimestampB\x08\n\x06_phone\"\x1c\n\x0eGetUserRequest\x12\n\n\x02id\x18\x01 \x01(\x03\".\n\x0fGetUserResponse\x12\x1b\n\x04user\x18\x01 \x01(\x0b\x32\r.user.v1.User\"#\n\x14\x42\x61tchGetUsersRequest\x12\x0b\n\x03ids\x18\x01 \x03(\x03\"D\n\nUserResult\x12\n\n\x02id\x18\x01 \x01(\x03\x12\r\n\x05\x66ound\x18\x02 \x01(\x08\x12\x1b\n\x04user\x18\x03 \x01(\x0b\x32\r.user.v1.User\"=\n\x15\x42\x61tchGetUsersResponse\x12$\n\x07results\x18\x01 \x03(\x0b\x32\x13.user.v1.UserResult\"%\n\x14ValidateTokenRequest\x12\r\n\x05token\x18\x01 \x01(\t\"_\n\x15ValidateTokenResponse\x12\r\n\x05valid\x18\x01 \x01(\x08\x12\x0f\n\x07user_id\x18\x02 \x01(\x03\x12\x11\n\tis_active\x18\x03 \x01(\x08\x12\x13\n\x0bis_verified\x18\x04 \x01(\x08\x32\xeb\x01\n\x0bUserService\x12<\n\x07GetUser\x12\x17.user.v1.GetUserRequest\x1a\x18.user.v1.GetUserResponse\x12N\n\rBatchGetUsers\x12\x1d.user.v1.BatchGetUsersRequest\x1a\x1e.user.v1.BatchGetUsersResponse\x12N\n\rValidateToken\x12\x1d.user.v1.ValidateTokenRequest\x1a\x1e.user.v1.ValidateTokenResponseb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'user_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  DESCRIPTOR._options = None
+  _globals['_USER']._serialized_start=57
+  _globals['_USER']._serialized_end=295
+  _globals['_GETUSERREQUEST']._serialized_start=297
+  _globals['_GETUSERREQUEST']._serialized_end=325
+  _globals['_GETUSERRESPONSE']._serialized_start=327
+  _globals['_GETUSERRESPONSE']._serialized_end=373
+  _globals['_BATCHGETUSERSREQUEST']._serialized_start=375
+  _globals['_BATCHGETUSERSREQUEST']._serialized_end=410
+  _globals['_USERRESULT']._serialized_start=412
+  _globals['_USERRESULT']._serialized_end=480
+  _globals['_BATCHGETUSERSRESPONSE']._serialized_start=482
+  _globals['_BATCHGETUSERSRESPONSE']._serialized_end=543
+  _globals['_VALIDATETOKENREQUEST']._serialized_start=545
+  _globals['_VALIDATETOKENREQUEST']._serialized_end=582
+  _globals['_VALIDATETOKENRESPONSE']._serialized_start=584
+  _globals['_VALIDATETOKENRESPONSE']._serialized_end=679
+  _globals['_USERSERVICE']._serialized_start=682
+  _globals['_USERSERVICE']._serialized_end=917
+# @@protoc_insertion_point(module_scope)
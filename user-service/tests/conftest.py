@@ -0,0 +1,8 @@
+# user-service/tests/conftest.py
+import os
+import sys
+
+# The app imports its modules top-level (`from config import settings`), as it
+# does when run from src/. Tests import them the same way so every module is
+# loaded once; `src.models` next to `models` would define the tables twice.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,96 @@
+# user-service/tests/test_grpc.py
+import asyncio
+import time
+
+import grpc
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from database import Base
+from crud import AsyncUserCRUD
+from grpc_server import UserServicer, start_grpc_server
+from tokens import token_verifier
+from user_pb2 import BatchGetUsersRequest, GetUserRequest, ValidateTokenRequest
+from user_pb2_grpc import UserServiceStub
+
+TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_grpc.db"
+
+
+class TestUserGrpc:
+
+    def run(self, scenario):
+        """Start a server on a free port, create two users and run `scenario(stub, users)`"""
+        async def main():
+            engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            crud = AsyncUserCRUD()
+
+            users = []
+            async with session_factory() as db:
+                for name in ("alice", "bob"):
+                    users.append(await crud.create_user(db, {
+                        "email": f"{name}@example.com",
+                        "password": "not-a-real-hash",
+                        "first_name": name.title(),
+                        "last_name": "Doe",
+                    }))
+
+            server, port = await start_grpc_server(UserServicer(crud, session_factory), "127.0.0.1:0")
+            try:
+                async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+                    await scenario(UserServiceStub(channel), users)
+            finally:
+                await server.stop(None)
+                await engine.dispose()
+
+        asyncio.run(main())
+
+    def test_get_user(self):
+        """Test fetching a single user"""
+        async def scenario(stub, users):
+            response = await stub.GetUser(GetUserRequest(id=users[0].id))
+            assert response.user.email == "alice@example.com"
+            assert response.user.is_active is True
+            assert not response.user.HasField("phone")
+            assert response.user.created_at.ToDatetime() == users[0].created_at
+
+        self.run(scenario)
+
+    def test_get_user_not_found(self):
+        """Test that a missing user is NOT_FOUND"""
+        async def scenario(stub, users):
+            with pytest.raises(grpc.aio.AioRpcError) as exc_info:
+                await stub.GetUser(GetUserRequest(id=999))
+            assert exc_info.value.code() == grpc.StatusCode.NOT_FOUND
+
+        self.run(scenario)
+
+    def test_batch_get_users_keeps_request_order(self):
+        """Test batch results are in request order with not-found markers"""
+        async def scenario(stub, users):
+            ids = [users[1].id, 999, users[0].id]
+            response = await stub.BatchGetUsers(BatchGetUsersRequest(ids=ids))
+            assert [result.id for result in response.results] == ids
+            assert [result.found for result in response.results] == [True, False, True]
+            assert response.results[0].user.email == "bob@example.com"
+            assert not response.results[1].HasField("user")
+
+        self.run(scenario)
+
+    def test_validate_token(self):
+        """Test token validation for valid and invalid tokens"""
+        async def scenario(stub, users):
+            token = token_verifier.keyring.sign({"sub": str(users[0].id), "exp": int(time.time()) + 60})
+            response = await stub.ValidateToken(ValidateTokenRequest(token=token))
+            assert response.valid is True
+            assert response.user_id == users[0].id
+            assert response.is_verified is False
+
+            response = await stub.ValidateToken(ValidateTokenRequest(token="invalid_token"))
+            assert response.valid is False
+
+        self.run(scenario)
@@ -1,13 +1,27 @@
 # user-service/tests/test_main.py
+import asyncio
+import json
+import time
+
+import jwt
 import pytest
 from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from src.main import app
-from src.database import get_db, Base
-from src.models import User
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
+
+from main import app
+from database import get_db, Base, pool_stats, warm_up_pool
+from models import User
+from hashing import HashPolicy, calibrate, password_hasher
+from config import settings
+from main import login_limiter, readiness, session_store, user_cache, user_crud
+from outbox import FilePublisher, OutboxRelay
+from ratelimit import TokenBucketLimiter
+from replicas import Replica, ReplicaRouter
+from tokens import token_verifier
+from keys import KeyRing
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -17,14 +31,14 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The API uses async sessions; each TestClient request runs on its own event
+# loop, so connections must not be pooled across requests
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
 
@@ -43,6 +57,8 @@ class TestUserService:
         # Clear previous data
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
+        user_cache.clear()
+        login_limiter.clear()
 
     def test_health_check(self):
         """Test health check"""
@@ -166,6 +182,140 @@ class TestUserService:
         data = response.json()
         assert len(data) == 2
         assert data[0]["email"] in [u["email"] for u in users]
+        # Rows are encoded directly; they must match the UserResponse model exactly
+        assert data[0] == client.get(f"/users/{data[0]['id']}").json()
+        assert "password" not in data[0]
+
+    def test_get_users_keyset_pagination(self):
+        """Test walking the user list with cursors"""
+        emails = [f"user{i}@example.com" for i in range(3)]
+        for email in emails:
+            client.post("/auth/register", json={
+                "email": email, "password": "password123", "first_name": "User", "last_name": "Keyset"
+            })
+
+        response = client.get("/users", params={"pagination": "keyset", "limit": 2})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert [u["email"] for u in first_page["items"]] == emails[:2]
+        assert first_page["next_cursor"]
+
+        response = client.get("/users", params={"cursor": first_page["next_cursor"], "limit": 2})
+        second_page = response.json()
+        assert [u["email"] for u in second_page["items"]] == emails[2:]
+        assert second_page["next_cursor"] is None
+
+    def test_get_users_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = client.get("/users", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_export_users_ndjson(self, monkeypatch):
+        """Test streaming all users as NDJSON"""
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "test-admin-key")
+        headers = {"X-Admin-Key": "test-admin-key"}
+        for i in range(3):
+            client.post("/auth/register", json={
+                "email": f"user{i}@example.com", "password": "password123", "first_name": "User", "last_name": "Export"
+            })
+
+        response = client.get("/users/export", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["email"] for row in rows] == [f"user{i}@example.com" for i in range(3)]
+        assert all("password" not in row for row in rows)
+
+    def test_export_users_csv_gzip(self, monkeypatch):
+        """Test gzip-compressed CSV export with an updated_since filter"""
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "test-admin-key")
+        headers = {"X-Admin-Key": "test-admin-key"}
+        client.post("/auth/register", json={
+            "email": "test@example.com", "password": "password123", "first_name": "John", "last_name": "Doe"
+        })
+
+        response = client.get("/users/export", params={"format": "csv", "gzip": "true"}, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        lines = response.text.splitlines()
+        assert lines[0].startswith("id,email,")
+        assert "test@example.com" in lines[1]
+
+        response = client.get("/users/export", params={"updated_since": "2999-01-01T00:00:00"}, headers=headers)
+        assert response.status_code == 200
+        assert response.text == ""
+
+    def test_bulk_upsert_users(self, monkeypatch):
+        """Test bulk creating and updating users with per-record statuses"""
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "test-admin-key")
+        headers = {"X-Admin-Key": "test-admin-key"}
+        client.post("/auth/register", json={
+            "email": "existing@example.com", "password": "password123", "first_name": "Old", "last_name": "Name"
+        })
+
+        users = [
+            {"email": "new@example.com", "password": "password123", "first_name": "New", "last_name": "User"},
+            {"email": "existing@example.com", "password": "newpassword123", "first_name": "Renamed", "last_name": "User"},
+            {"email": "bad@example.com", "password": "short", "first_name": "Bad", "last_name": "User"},
+            {"email": "new@example.com", "password": "password123", "first_name": "Again", "last_name": "User"},
+        ]
+        response = client.post("/users/bulk", json={"users": users}, headers=headers)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert [r["status"] for r in data["results"]] == ["created", "updated", "invalid", "duplicate"]
+        assert (data["created"], data["updated"], data["failed"]) == (1, 1, 2)
+        assert data["results"][0]["id"] is not None
+
+        # Updated records take the new password and fields
+        login_response = client.post("/auth/login", json={"email": "existing@example.com", "password": "newpassword123"})
+        assert login_response.status_code == 200
+        response = client.get(f"/users/{data['results'][1]['id']}")
+        assert response.json()["first_name"] == "Renamed"
+
+        # Insert mode leaves existing users alone
+        response = client.post("/users/bulk", json={"users": users[:1], "mode": "insert"}, headers=headers)
+        assert response.json()["results"][0]["status"] == "skipped"
+
+        # Only inserted users produce events
+        with engine.connect() as conn:
+            events = conn.exec_driver_sql("SELECT event_type, user_id FROM user_events_outbox ORDER BY id").all()
+        assert events == [("user.created", 1), ("user.created", data["results"][0]["id"])]
+
+    def test_bulk_upsert_requires_admin_key(self):
+        """Test that bulk import is rejected without the admin key"""
+        response = client.post("/users/bulk", json={"users": []})
+        assert response.status_code == 403
+
+    def test_bulk_upsert_deactivation(self, monkeypatch):
+        """Test that bulk updates keep unset fields, and deactivate like PUT does"""
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "test-admin-key")
+        headers = {"X-Admin-Key": "test-admin-key"}
+        tokens = self.login()
+        record = {"email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"}
+
+        # Deactivating revokes refresh sessions and emits one event, however often it is repeated
+        for _ in range(2):
+            response = client.post("/users/bulk", json={"users": [{**record, "is_active": False}]}, headers=headers)
+            assert response.json()["results"][0]["status"] == "updated"
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+        # A record without is_active leaves the user inactive
+        client.post("/users/bulk", json={"users": [{**record, "first_name": "Jane"}]}, headers=headers)
+        user = client.get(f"/users/{response.json()['results'][0]['id']}").json()
+        assert (user["first_name"], user["is_active"]) == ("Jane", False)
+
+        with engine.connect() as conn:
+            events = conn.exec_driver_sql("SELECT event_type FROM user_events_outbox ORDER BY id").scalars().all()
+            assert events == ["user.created", "user.deactivated"]
+            assert conn.exec_driver_sql("SELECT COUNT(*) FROM refresh_sessions").scalar_one() == 0
+
+    def test_export_users_requires_admin_key(self, monkeypatch):
+        """Test that the export is rejected without the admin key"""
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "test-admin-key")
+        assert client.get("/users/export").status_code == 403
+        assert client.get("/users/export", headers={"X-Admin-Key": "wrong"}).status_code == 403
 
     def test_update_user(self):
         """Test updating user information"""
@@ -199,6 +349,52 @@ class TestUserService:
         assert data["first_name"] == "Jane"
         assert data["phone"] == "+9876543210"
 
+    def test_get_user_is_cached_and_invalidated_on_update(self):
+        """Test that user reads are cached and never stale after an update"""
+        register_response = client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        })
+        user_id = register_response.json()["id"]
+        token = client.post("/auth/login", json={
+            "email": "test@example.com", "password": "testpassword123"
+        }).json()["access_token"]
+
+        hits = user_cache.local.hits
+        assert client.get(f"/users/{user_id}").json()["first_name"] == "John"
+        assert client.get(f"/users/{user_id}").json()["first_name"] == "John"
+        assert user_cache.local.hits == hits + 1
+
+        headers = {"Authorization": f"Bearer {token}"}
+        client.put(f"/users/{user_id}", json={"first_name": "Jane"}, headers=headers)
+        assert client.get(f"/users/{user_id}").json()["first_name"] == "Jane"
+        assert client.get("/users/me", headers=headers).json()["first_name"] == "Jane"
+
+    def test_get_users_batch(self):
+        """Test batch lookup keeps request order, marks missing ids and uses the cache"""
+        ids = []
+        for name in ("alice", "bob"):
+            response = client.post("/auth/register", json={
+                "email": f"{name}@example.com", "password": "testpassword123", "first_name": name, "last_name": "Doe"
+            })
+            ids.append(response.json()["id"])
+
+        client.get(f"/users/{ids[0]}")  # warm the cache for the first user
+        hits = user_cache.local.hits
+        response = client.get(f"/users:batch?ids={ids[1]},999,{ids[0]}")
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["id"] for result in results] == [ids[1], 999, ids[0]]
+        assert [result["found"] for result in results] == [True, False, True]
+        assert results[0]["user"]["email"] == "bob@example.com"
+        assert results[1]["user"] is None
+        assert user_cache.local.hits == hits + 1
+
+    def test_get_users_batch_limits(self, monkeypatch):
+        """Test batch lookup rejects bad ids and too many ids"""
+        assert client.get("/users:batch?ids=1,abc").status_code == 400
+        monkeypatch.setattr(settings, "BATCH_MAX_IDS", 2)
+        assert client.get("/users:batch?ids=1,2,3").status_code == 400
+
     def test_delete_user(self):
         """Test deleting a user"""
         # Register and log in
@@ -227,6 +423,327 @@ class TestUserService:
         response_get = client.get(f"/users/{user_id}") # Corrected from response to response_get
         assert response_get.status_code == 404
 
+    def test_register_when_hasher_saturated(self, monkeypatch):
+        """Test that a saturated hashing pool sheds load with 503"""
+        monkeypatch.setattr(password_hasher, "queue_depth", -password_hasher.max_workers)
+
+        response = client.post("/auth/register", json={
+            "email": "test@example.com",
+            "password": "testpassword123",
+            "first_name": "John",
+            "last_name": "Doe"
+        })
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+    def test_login_rehashes_outdated_hash(self, monkeypatch):
+        """Test that a login upgrades a hash made with another cost"""
+        monkeypatch.setattr(password_hasher, "policy", HashPolicy(rounds=4))
+        client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        })
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT password FROM users").scalar_one().startswith("$2b$04$")
+
+        monkeypatch.setattr(password_hasher, "policy", HashPolicy(rounds=5))
+        login = {"email": "test@example.com", "password": "testpassword123"}
+        assert client.post("/auth/login", json=login).status_code == 200
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT password FROM users").scalar_one().startswith("$2b$05$")
+        assert client.post("/auth/login", json=login).status_code == 200
+
+    def login(self, email="test@example.com", password="testpassword123"):
+        client.post("/auth/register", json={"email": email, "password": password, "first_name": "John", "last_name": "Doe"})
+        return client.post("/auth/login", json={"email": email, "password": password}).json()
+
+    def test_refresh_rotates_token(self):
+        """Test that a refresh token works once and a reused one ends the session"""
+        first = self.login()["refresh_token"]
+
+        response = client.post("/auth/refresh", json={"refresh_token": first})
+        assert response.status_code == 200
+        second = response.json()["refresh_token"]
+        assert second != first
+        me = client.get("/users/me", headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+        assert me.json()["email"] == "test@example.com"
+
+        # Replaying the first token revokes the session, so the second stops working too
+        assert client.post("/auth/refresh", json={"refresh_token": first}).status_code == 401
+        assert client.post("/auth/refresh", json={"refresh_token": second}).status_code == 401
+        assert client.post("/auth/refresh", json={"refresh_token": "garbage"}).status_code == 401
+
+    def test_refresh_revoked_on_logout_deactivate_and_delete(self):
+        """Test that logout, deactivation and deletion end refresh sessions"""
+        tokens = self.login()
+        assert client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+        tokens = self.login()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        user_id = client.get("/users/me", headers=headers).json()["id"]
+        assert client.put(f"/users/{user_id}", json={"is_active": False}, headers=headers).status_code == 200
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+        tokens = self.login("other@example.com")
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        user_id = client.get("/users/me", headers=headers).json()["id"]
+        assert client.delete(f"/users/{user_id}", headers=headers).status_code == 204
+        assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT COUNT(*) FROM refresh_sessions").scalar_one() == 0
+
+    def test_expired_refresh_sessions_pruned(self):
+        """Test that pruning deletes expired sessions and keeps live ones"""
+        expired = self.login()["refresh_token"]
+        live = self.login("other@example.com")["refresh_token"]
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "UPDATE refresh_sessions SET expires_at = '2000-01-01 00:00:00.000000' WHERE id = ?",
+                (expired.split(".")[0],),
+            )
+
+        async def prune():
+            async with TestingSessionLocal() as db:
+                return await session_store.prune(db)
+        assert asyncio.run(prune()) == 1
+        assert client.post("/auth/refresh", json={"refresh_token": live}).status_code == 200
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT COUNT(*) FROM refresh_sessions").scalar_one() == 1
+
+    def test_user_changes_recorded_in_outbox_and_relayed(self, tmp_path):
+        """Test that user changes write outbox events and the relay publishes and removes them"""
+        tokens = self.login()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        user_id = client.get("/users/me", headers=headers).json()["id"]
+
+        async def verify():
+            async with TestingSessionLocal() as db:
+                await user_crud.verify_user(db, user_id)
+                await user_crud.verify_user(db, user_id)
+        asyncio.run(verify())
+        assert client.put(f"/users/{user_id}", json={"is_active": False}, headers=headers).status_code == 200
+        assert client.put(f"/users/{user_id}", json={"is_active": False}, headers=headers).status_code == 200
+        assert client.delete(f"/users/{user_id}", headers=headers).status_code == 204
+
+        path = tmp_path / "events.ndjson"
+        relay = OutboxRelay(TestingSessionLocal, FilePublisher(str(path)), batch_size=3)
+        assert asyncio.run(relay.run_once()) == 3
+        assert asyncio.run(relay.run_once()) == 1
+        assert asyncio.run(relay.run_once()) == 0
+
+        events = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [e["type"] for e in events] == ["user.created", "user.verified", "user.deactivated", "user.deleted"]
+        assert [e["event_id"] for e in events] == sorted(e["event_id"] for e in events)
+        assert {e["user_id"] for e in events} == {user_id}
+        assert events[2]["data"] == {"id": user_id, "email": "test@example.com", "is_active": False, "is_verified": True}
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT COUNT(*) FROM user_events_outbox").scalar_one() == 0
+
+    def test_login_rate_limited_per_email(self, monkeypatch):
+        """Test that attempts over the email limit get 429 before any password check"""
+        monkeypatch.setattr(login_limiter.by_email, "capacity", 2)
+        login = {"email": "victim@example.com", "password": "wrongpassword"}
+        assert client.post("/auth/login", json=login).status_code == 401
+        assert client.post("/auth/login", json=login).status_code == 401
+
+        verifications = REGISTRY.get_sample_value("password_hash_duration_seconds_count", {"operation": "verify"})
+        response = client.post("/auth/login", json=login)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert REGISTRY.get_sample_value("password_hash_duration_seconds_count", {"operation": "verify"}) == verifications
+        # Other emails are still allowed
+        assert client.post("/auth/login", json={**login, "email": "other@example.com"}).status_code == 401
+
+    def test_token_bucket_refills_and_stays_bounded(self):
+        """Test token refill, Retry-After and the bucket count limit"""
+        limiter = TokenBucketLimiter("test", capacity=2, per_second=0.5, max_keys=3)
+        assert limiter.acquire_local("a", now=0) == 0
+        assert limiter.acquire_local("a", now=0) == 0
+        assert limiter.acquire_local("a", now=0) == 2.0
+        assert limiter.acquire_local("a", now=2) == 0
+
+        for key in ("b", "c", "d"):
+            limiter.acquire_local(key, now=2)
+        assert len(limiter) == 3
+
+    def test_calibrate_stays_within_bounds(self):
+        """Test that calibration never goes below the floor or above the ceiling"""
+        assert calibrate(HashPolicy(), target_ms=0, min_rounds=5, max_rounds=7).rounds == 5
+        policy = calibrate(HashPolicy(), target_ms=10000, min_rounds=4, max_rounds=6, samples=1)
+        assert (policy.rounds, policy.max_rounds) == (6, 6)
+
+    def test_verify_access_token(self):
+        """Test token introspection and the verified-token cache"""
+        client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        })
+        token = client.post("/auth/login", json={
+            "email": "test@example.com", "password": "testpassword123"
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        token_verifier.cache.clear()
+        hits = token_verifier.cache.hits
+        response = client.get("/auth/verify", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["is_active"] is True
+        assert response.json()["is_verified"] is False
+        client.get("/auth/verify", headers=headers)
+        assert token_verifier.cache.hits == hits + 1
+
+    def test_verify_access_token_with_embedded_claims(self, monkeypatch):
+        """Test that embedded claims are trusted without loading the user"""
+        monkeypatch.setattr(settings, "JWT_EMBED_CLAIMS", True)
+        register_response = client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        })
+        token = client.post("/auth/login", json={
+            "email": "test@example.com", "password": "testpassword123"
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Remove the row behind the service's back: the token alone must be enough
+        Base.metadata.drop_all(bind=engine)
+        response = client.get("/auth/verify", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"id": register_response.json()["id"], "is_active": True, "is_verified": False}
+
+    def test_jwks_empty_for_shared_secret(self):
+        """Test that HS256 publishes no keys"""
+        response = client.get("/.well-known/jwks.json")
+        assert response.status_code == 200
+        assert response.json() == {"keys": []}
+
+    @pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+    def test_asymmetric_tokens_verify_against_jwks(self, monkeypatch, algorithm):
+        """Test that tokens carry a kid and verify with the published public key"""
+        monkeypatch.setattr(token_verifier, "keyring", KeyRing.ephemeral(algorithm))
+        client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        })
+        token = client.post("/auth/login", json={
+            "email": "test@example.com", "password": "testpassword123"
+        }).json()["access_token"]
+
+        response = client.get("/.well-known/jwks.json")
+        assert response.status_code == 200
+        assert "max-age" in response.headers["cache-control"]
+        jwks = response.json()
+        assert len(jwks["keys"]) == 1
+        assert jwt.get_unverified_header(token)["kid"] == jwks["keys"][0]["kid"]
+        public_key = jwt.PyJWK(jwks["keys"][0]).key
+        assert jwt.decode(token, public_key, algorithms=[algorithm])["sub"]
+
+        not_modified = client.get("/.well-known/jwks.json", headers={"If-None-Match": response.headers["etag"]})
+        assert not_modified.status_code == 304
+
+        response = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+    def test_metrics(self):
+        """Test that /metrics reports route, database, hashing and JWT timings"""
+        client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        })
+        client.post("/auth/login", json={"email": "test@example.com", "password": "testpassword123"})
+        client.get("/users/999")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        body = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}",status="404"}' in body
+        assert 'http_requests_in_progress{method="GET",route="/metrics"} 1.0' in body
+        assert 'db_query_duration_seconds_count{operation="SELECT"}' in body
+        assert 'password_hash_duration_seconds_count{operation="verify"}' in body
+        assert 'jwt_duration_seconds_count{operation="encode"}' in body
+
+    def test_readiness_waits_for_warm_up(self, monkeypatch):
+        """Test /ready stays 503 until the pool and the hash backend are warm"""
+        monkeypatch.setitem(readiness, "database", True)
+        monkeypatch.setitem(readiness, "password_hasher", False)
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["checks"] == {"database": True, "password_hasher": False}
+
+        monkeypatch.setitem(readiness, "password_hasher", True)
+        assert client.get("/ready").status_code == 200
+
+    def test_lifespan_warms_up_before_ready(self, monkeypatch):
+        """Test startup creates the schema only on opt-in and /ready turns green after warm-up"""
+        monkeypatch.setattr(settings, "AUTO_CREATE_SCHEMA", False)
+        monkeypatch.setattr(settings, "GRPC_ENABLED", False)
+        monkeypatch.setattr(settings, "OUTBOX_RELAY_ENABLED", False)
+        monkeypatch.setitem(readiness, "database", False)
+        monkeypatch.setitem(readiness, "password_hasher", False)
+        # Warm up the test database rather than whatever DATABASE_URL names
+        monkeypatch.setattr("main.async_engine", async_engine)
+        with TestClient(app) as lifespan_client:
+            for _ in range(100):
+                if lifespan_client.get("/ready").status_code == 200:
+                    break
+                time.sleep(0.1)
+            assert lifespan_client.get("/ready").json()["checks"] == {"database": True, "password_hasher": True}
+
+    def test_warm_up_pool_opens_connections(self):
+        """Test warm-up leaves the requested number of idle connections in the pool"""
+        async def warm_up():
+            pool_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=AsyncAdaptedQueuePool, pool_size=3)
+            try:
+                await warm_up_pool(pool_engine, 3)
+                return pool_stats(pool_engine)
+            finally:
+                await pool_engine.dispose()
+
+        stats = asyncio.run(warm_up())
+        assert stats["checked_in"] == 3
+        assert stats["checked_out"] == 0
+
+    def test_pool_stats_requires_admin_key(self, monkeypatch):
+        """Test the pool stats endpoint is admin only"""
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "admin-key")
+        assert client.get("/admin/pool").status_code == 403
+        response = client.get("/admin/pool", headers={"X-Admin-Key": "admin-key"})
+        assert response.status_code == 200
+        assert response.json()["mode"] == "queue"
+
+    def test_reads_routed_to_replica_with_read_your_writes(self, monkeypatch):
+        """Test reads go to a replica except right after a write, and fall back when it fails"""
+        # A "replica" that still has an old copy of the user
+        replica_engine = create_engine("sqlite:///./test_replica.db")
+        User.metadata.drop_all(bind=replica_engine)
+        User.metadata.create_all(bind=replica_engine)
+        with replica_engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [{
+                "id": 1, "email": "test@example.com", "password": "x", "first_name": "Stale", "last_name": "Doe"
+            }])
+        replica_engine.dispose()
+        router = ReplicaRouter(
+            [Replica("replica-0", create_async_engine("sqlite+aiosqlite:///./test_replica.db", poolclass=NullPool))],
+            sticky_seconds=60,
+        )
+        monkeypatch.setattr(user_crud, "router", router)
+
+        user_id = client.post("/auth/register", json={
+            "email": "test@example.com", "password": "testpassword123", "first_name": "John", "last_name": "Doe"
+        }).json()["id"]
+        assert user_id == 1
+
+        # Just written: read from the primary
+        assert client.get(f"/users/{user_id}").json()["first_name"] == "John"
+
+        # Once the window has passed, reads go to the replica
+        router._recent_writes.clear()
+        user_cache.clear()
+        assert client.get(f"/users/{user_id}").json()["first_name"] == "Stale"
+
+        # A failing replica is marked unhealthy and the read is served by the primary
+        router.replicas[0].sessionmaker = async_sessionmaker(
+            create_async_engine("sqlite+aiosqlite:////nonexistent/replica.db", poolclass=NullPool)
+        )
+        user_cache.clear()
+        assert client.get(f"/users/{user_id}").json()["first_name"] == "John"
+        assert router.replicas[0].healthy is False
+
     def test_unauthorized_access(self):
         """Test unauthorized access"""
         response = client.get("/users/me")